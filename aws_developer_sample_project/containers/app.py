@@ -1,5 +1,8 @@
 from flask import Flask,request,render_template
+from json_encoder import dumps
 import products_db
+import response_cache
+from utils import create_success_response,create_json_response,create_error_response,json_array_chunks,create_json_streaming_response,create_ndjson_streaming_response
 
 app = Flask(__name__)
 
@@ -8,23 +11,70 @@ app = Flask(__name__)
 def index():
     return render_template("index.html")
 
+@app.route("/healthz")
+def healthz():
+    # for the health checks, does not render the template or call DynamoDB
+    return "ok", 200, {'Cache-Control': 'no-store'}
+
+max_limit=1000
+
+def parse_limit(limit):
+    if limit is None:
+        return max_limit
+    if not limit.isdigit() or not 0 < int(limit) <= max_limit:
+        raise ValueError(f'limit must be a number between 1 and {max_limit}')
+    return int(limit)
+
 @app.route("/products",methods=['GET'])
 def query_products():
     category = request.args.get('category')
-    if category:
-        return products_db.get_products_by_category(category)
-    return products_db.get_all_products()
+    group=f'category:{category}' if category else 'products'
+    query=response_cache.query_key(request.args)
+    cached=response_cache.get(group, query)
+    if cached is not None:
+        return create_json_response(200, cached)
+    generation=response_cache.generation(group)
+    if 'limit' in request.args or 'next' in request.args:
+        # /products?limit=50&next=<token> returns one page at a time
+        try:
+            limit=parse_limit(request.args.get('limit'))
+            products,next_token=products_db.get_products_page(category, limit, request.args.get('next'))
+        except ValueError as e:
+            return create_error_response(400, str(e))
+        body=dumps({'items': products, 'next': next_token})
+        response_cache.store(group, query, body, generation)
+        return create_json_response(200, body)
+    # stream the whole listing page by page instead of building it in memory
+    pages=products_db.category_pages(category) if category else products_db.scan_pages()
+    chunks=json_array_chunks(products_db.iterate_products(pages))
+    return create_json_streaming_response(200, response_cache.cache_chunks(group, query, chunks, generation))
+
+max_segments=16
+
+@app.route("/products/export",methods=['GET'])
+def export_products():
+    segments=request.args.get('segments') or str(products_db.scan_segments)
+    if not segments.isdigit() or not 0 < int(segments) <= max_segments:
+        return create_error_response(400, f'segments must be a number between 1 and {max_segments}')
+    return create_ndjson_streaming_response(200, products_db.parallel_scan(int(segments)))
 
 @app.route("/products/<id>",methods=['GET'])
 def get_product(id):
+    cached=response_cache.get(f'product:{id}')
+    if cached is not None:
+        return create_json_response(200, cached)
+    generation=response_cache.generation(f'product:{id}')
     product=products_db.get_product(id)
     if not product:
         return "Product not found", 404
-    return product
+    body=dumps(product)
+    response_cache.store(f'product:{id}', '', body, generation)
+    return create_json_response(200, body)
 
 @app.route("/products/<id>",methods=['DELETE'])
 def delete_product(id):
     product=products_db.delete_product(id)
+    response_cache.invalidate(*response_cache.product_groups(product or {'id': id}))
     return product
 
 
@@ -32,6 +82,7 @@ def delete_product(id):
 def insert_product():
     item = request.get_json()
     inserted=products_db.insert_product(item)
+    response_cache.invalidate(*response_cache.product_groups(inserted))
     return inserted, 201
 
 from utils import create_options_response   
@@ -0,0 +1,123 @@
+"""Asynchronous variant of app.py, with Quart and async_products_db.
+
+A request waiting on DynamoDB does not hold a thread, so one process keeps
+hundreds of requests in flight. Run it with an ASGI server, for example
+APP_MODULE=async_app:app GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker
+(see gunicorn.conf.py).
+"""
+from quart import Quart, request, render_template, Response
+import async_products_db as products_db
+from json_encoder import dumps
+
+app = Quart(__name__)
+
+access_control_headers= {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Methods': 'GET, POST, PUT, DELETE, OPTIONS',
+    'Access-Control-Allow-Headers': 'Content-Type, Authorization'
+}
+headers={**access_control_headers, 'Content-Type': 'application/json'}
+
+def create_success_response(status_code, data):
+    return Response(dumps(data), status_code, headers)
+
+def create_error_response(status_code, message):
+    return Response(dumps({
+        'error': message,
+        'statusCode': status_code
+        }), status_code, headers)
+
+def create_streaming_response(status_code, items):
+    """Streams an async iterable of items as a JSON array, one item at a time"""
+    async def generate():
+        separator='['
+        async for item in items:
+            yield separator+dumps(item)
+            separator=','
+        yield ']' if separator==',' else '[]'
+    return Response(generate(), status_code, headers)
+
+def create_ndjson_streaming_response(status_code, items):
+    """Streams an async iterable of items with one JSON document per line (NDJSON)"""
+    async def generate():
+        async for item in items:
+            yield dumps(item)+'\n'
+    return Response(generate(), status_code, {**access_control_headers, 'Content-Type': 'application/x-ndjson'})
+
+@app.before_serving
+async def open_table():
+    await products_db.open_table()
+
+@app.after_serving
+async def close_table():
+    await products_db.close_table()
+
+@app.route("/")
+async def index():
+    return await render_template("index.html")
+
+@app.route("/healthz")
+async def healthz():
+    return "ok", 200, {'Cache-Control': 'no-store'}
+
+max_limit=1000
+
+def parse_limit(limit):
+    if limit is None:
+        return max_limit
+    if not limit.isdigit() or not 0 < int(limit) <= max_limit:
+        raise ValueError(f'limit must be a number between 1 and {max_limit}')
+    return int(limit)
+
+@app.route("/products",methods=['GET'])
+async def query_products():
+    category = request.args.get('category')
+    if 'ids' in request.args:
+        # /products?ids=a,b,c, the batches of 100 are requested concurrently
+        ids=[product_id for product_id in request.args['ids'].split(',') if product_id]
+        if not 0 < len(ids) <= max_limit:
+            return create_error_response(400, f'ids must have between 1 and {max_limit} ids')
+        return create_success_response(200, await products_db.get_products(ids))
+    if 'limit' in request.args or 'next' in request.args:
+        # /products?limit=50&next=<token> returns one page at a time
+        try:
+            limit=parse_limit(request.args.get('limit'))
+            products,next_token=await products_db.get_products_page(category, limit, request.args.get('next'))
+        except ValueError as e:
+            return create_error_response(400, str(e))
+        return create_success_response(200, {'items': products, 'next': next_token})
+    # stream the whole listing page by page, the next page is read while one is sent
+    pages=products_db.category_pages(category) if category else products_db.scan_pages()
+    return create_streaming_response(200, products_db.iterate_products(pages))
+
+max_segments=16
+
+@app.route("/products/export",methods=['GET'])
+async def export_products():
+    segments=request.args.get('segments') or str(products_db.scan_segments)
+    if not segments.isdigit() or not 0 < int(segments) <= max_segments:
+        return create_error_response(400, f'segments must be a number between 1 and {max_segments}')
+    return create_ndjson_streaming_response(200, products_db.parallel_scan(int(segments)))
+
+@app.route("/products/<id>",methods=['GET'])
+async def get_product(id):
+    product=await products_db.get_product(id)
+    if not product:
+        return "Product not found", 404
+    return create_success_response(200, product)
+
+@app.route("/products/<id>",methods=['DELETE'])
+async def delete_product(id):
+    product=await products_db.delete_product(id)
+    return create_success_response(200, product)
+
+@app.route("/products", methods=['POST'])
+async def insert_product():
+    item = await request.get_json()
+    inserted=await products_db.insert_product(item)
+    return create_success_response(201, inserted)
+
+@app.route("/products", methods=['OPTIONS'])
+@app.route("/products/<id>", methods=['OPTIONS'])
+async def options():
+    return '', 200, access_control_headers
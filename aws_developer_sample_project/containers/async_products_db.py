@@ -0,0 +1,164 @@
+"""Asynchronous products_db for async_app.py, using aioboto3.
+
+One aioboto3 resource is opened when the app starts and shared by all the
+requests of the process. Its HTTP connection pool (MAX_POOL_CONNECTIONS)
+limits how many DynamoDB calls are in flight, not the number of threads.
+"""
+import aioboto3
+import asyncio
+import boto3.dynamodb.conditions
+import os
+import uuid
+from botocore.config import Config
+from contextlib import AsyncExitStack
+from products_db import VersionConflict, update_arguments, encode_page_token, decode_page_token
+
+table_name=os.environ.get('PRODUCTS_TABLE_NAME') or 'Products'
+config=Config(
+   max_pool_connections=int(os.environ.get('MAX_POOL_CONNECTIONS') or 200),
+   tcp_keepalive=True
+)
+session=aioboto3.Session()
+exit_stack=None
+table=None
+
+async def open_table():
+   """Opens the DynamoDB resource, call it once the event loop runs"""
+   global exit_stack, table
+   exit_stack=AsyncExitStack()
+   resource=await exit_stack.enter_async_context(session.resource('dynamodb', config=config))
+   table=await resource.Table(table_name)
+
+async def close_table():
+   global exit_stack, table
+   if exit_stack:
+      await exit_stack.aclose()
+   exit_stack=None
+   table=None
+
+async def get_product(product_id):
+   return (await table.get_item(Key={'id': product_id})).get('Item')
+
+# BatchGetItem takes at most 100 keys
+batch_size=100
+batch_get_attempts=5
+
+async def get_batch(keys):
+   """Same retries as products_db.get_products: throttled keys come back
+   unprocessed and are asked again with exponential backoff"""
+   items=[]
+   request_items={table_name: {'Keys': keys}}
+   for attempt in range(batch_get_attempts):
+      response=await table.meta.client.batch_get_item(RequestItems=request_items)
+      items.extend(response['Responses'].get(table_name, []))
+      request_items=response.get('UnprocessedKeys')
+      if not request_items:
+         return items
+      await asyncio.sleep(0.05 * 2**attempt)
+   raise RuntimeError(f"Could not get {len(request_items[table_name]['Keys'])} products after {batch_get_attempts} attempts")
+
+async def get_products(product_ids):
+   """Products with the given ids, in the same order; the batches are requested concurrently"""
+   keys=[{'id': product_id} for product_id in dict.fromkeys(product_ids)]
+   batches=await asyncio.gather(*[get_batch(keys[i:i+batch_size]) for i in range(0, len(keys), batch_size)])
+   products={item['id']: item for batch in batches for item in batch}
+   return [products[product_id] for product_id in dict.fromkeys(product_ids) if product_id in products]
+
+async def upsert_product(product_id, fields, expected_version=None):
+   try:
+      inserted=await table.update_item(**update_arguments(product_id, fields, expected_version))
+   except table.meta.client.exceptions.ConditionalCheckFailedException:
+      raise VersionConflict(f"Product {product_id} is not at version {expected_version}")
+   return inserted['Attributes']
+
+async def insert_product(item):
+   return await upsert_product(str(uuid.uuid4()), item)
+
+async def delete_product(product_id):
+   return (await table.delete_item(Key={'id': product_id}, ReturnValues='ALL_OLD')).get('Attributes')
+
+async def update_product(product_id, item, expected_version=None):
+   return await upsert_product(product_id, item, expected_version)
+
+async def iterate_pages(operation, **kwargs):
+   """Yields (items, last_evaluated_key) for every page of a scan or query.
+
+   The next page is requested before the current one is handed over, so
+   DynamoDB works on it while the caller sends the items to the client.
+   """
+   pending=asyncio.ensure_future(operation(**kwargs))
+   try:
+      while pending:
+         response=await pending
+         pending=None
+         last_evaluated_key=response.get('LastEvaluatedKey')
+         if last_evaluated_key:
+            kwargs['ExclusiveStartKey']=last_evaluated_key
+            pending=asyncio.ensure_future(operation(**kwargs))
+         yield response.get('Items', []), last_evaluated_key
+   finally:
+      if pending:
+         pending.cancel()
+
+def category_query(category):
+   return dict(IndexName='category-index', KeyConditionExpression=boto3.dynamodb.conditions.Key('category').eq(category))
+
+def scan_pages(**kwargs):
+   return iterate_pages(table.scan, **kwargs)
+
+def category_pages(category, **kwargs):
+   return iterate_pages(table.query, **category_query(category), **kwargs)
+
+async def iterate_products(pages):
+   async for items, _ in pages:
+      for item in items:
+         yield item
+
+async def get_products_page(category=None, limit=None, next_token=None):
+   """Returns one page of products and the token for the next one (None on the last page)"""
+   kwargs={}
+   if limit:
+      kwargs['Limit']=limit
+   if next_token:
+      kwargs['ExclusiveStartKey']=decode_page_token(next_token)
+   # a single call, without requesting the next page ahead
+   if category:
+      response=await table.query(**category_query(category), **kwargs)
+   else:
+      response=await table.scan(**kwargs)
+   return response.get('Items', []), encode_page_token(response.get('LastEvaluatedKey'))
+
+scan_segments=int(os.environ.get('SCAN_SEGMENTS') or 4)
+
+async def parallel_scan(total_segments=None):
+   """Scans the whole table with concurrent Segment/TotalSegments tasks.
+
+   Same as products_db.parallel_scan, with tasks instead of threads: items
+   are yielded as they arrive, and the bounded queue keeps memory flat.
+   """
+   total_segments=total_segments or scan_segments
+   output=asyncio.Queue(maxsize=1000)
+   finished=object()
+   async def scan_segment(segment):
+      try:
+         async for item in iterate_products(scan_pages(Segment=segment, TotalSegments=total_segments)):
+            await output.put(item)
+      except Exception:
+         await output.put(finished)
+         raise
+      # not on cancellation, nobody reads the queue anymore
+      await output.put(finished)
+   tasks=[asyncio.ensure_future(scan_segment(segment)) for segment in range(total_segments)]
+   try:
+      running=total_segments
+      while running:
+         item=await output.get()
+         if item is finished:
+            running-=1
+         else:
+            yield item
+      for task in tasks:
+         task.result() # re-raises errors from the segments
+   finally:
+      for task in tasks:
+         task.cancel()
@@ -0,0 +1,41 @@
+"""gunicorn settings for the container.
+
+Pre-fork gthread workers: the requests mostly wait on DynamoDB, so a few
+processes with several threads each keep the CPUs busy. The counts come
+from the CPUs the task may use and can be overridden with WEB_CONCURRENCY
+and GUNICORN_THREADS. APP_MODULE and GUNICORN_WORKER_CLASS switch to the
+asynchronous variant (async_app.py) on uvicorn workers.
+"""
+import math
+import os
+
+def available_cpus():
+    """CPUs of the cgroup quota (Fargate reports all host CPUs otherwise)"""
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()
+        if quota != 'max':
+            return max(1, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    return len(os.sched_getaffinity(0))
+
+cpus = available_cpus()
+
+bind = '0.0.0.0:' + os.environ.get('PORT', '5000')
+# app:app (Flask), or async_app:app with GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker
+wsgi_app = os.environ.get('APP_MODULE') or 'app:app'
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS') or 'gthread'
+# an event loop keeps one CPU busy on its own, threads are only for gthread
+default_workers = cpus * 2 + 1 if worker_class == 'gthread' else cpus
+workers = int(os.environ.get('WEB_CONCURRENCY') or default_workers)
+threads = int(os.environ.get('GUNICORN_THREADS') or 4)
+
+# longer than the 60 s idle timeout of the load balancer, so it closes the connections
+keepalive = 75
+timeout = 30
+# ECS kills the task 30 s after SIGTERM, finish the requests in flight before that
+graceful_timeout = 20
+# heartbeat files on tmpfs, the container filesystem can block
+worker_tmp_dir = '/dev/shm'
+accesslog = '-'
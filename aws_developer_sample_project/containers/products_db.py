@@ -1,6 +1,11 @@
 import boto3
 import boto3.dynamodb.conditions
 import uuid
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import base64
+import json
 from decimal import Decimal
 import os
 table_name=os.environ.get('PRODUCTS_TABLE_NAME') or 'Products'
@@ -9,7 +14,11 @@ table=boto3.resource('dynamodb').Table(table_name)
 def get_product(product_id):
    return table.get_item(Key={'id': product_id}).get('Item')
 
-def upsert_product(product_id, fields):
+class VersionConflict(Exception):
+   """The product changed since the expected version was read"""
+
+def update_arguments(product_id, fields, expected_version=None):
+   """Arguments of the UpdateItem call writing the product (shared with async_products_db)"""
    category=fields.get('category') or []
    title=fields.get('title') or ''
    description=fields.get('description') or ''
@@ -19,33 +28,155 @@ def upsert_product(product_id, fields):
       SET category = :category,
       title = :title,
       description = :description,
-      price = :price
+      price = :price,
+      version = if_not_exists(version, :zero) + :one
    """
    expression_attribute_values = {
       ':category': category,
       ':title': title,
       ':description': description,
-      ':price': price
+      ':price': price,
+      ':zero': 0,
+      ':one': 1
    }
-   inserted=table.update_item(
+   conditions={}
+   if expected_version is not None:
+      # only if nobody changed the product since expected_version was read
+      if expected_version:
+         conditions['ConditionExpression']='version = :expected_version'
+         expression_attribute_values[':expected_version']=expected_version
+      else:
+         conditions['ConditionExpression']='attribute_exists(id) AND attribute_not_exists(version)'
+   return dict(
       Key={'id': product_id},
       UpdateExpression=update_expression,
       ExpressionAttributeValues=expression_attribute_values,
-      ReturnValues="ALL_NEW"
+      ReturnValues="ALL_NEW",
+      **conditions
    )
+
+def upsert_product(product_id, fields, expected_version=None):
+   try:
+      inserted=table.update_item(**update_arguments(product_id, fields, expected_version))
+   except table.meta.client.exceptions.ConditionalCheckFailedException:
+      raise VersionConflict(f"Product {product_id} is not at version {expected_version}")
    return inserted['Attributes']
     
 def insert_product(item):
    return upsert_product(str(uuid.uuid4()), item)
 
 def delete_product(product_id):
-   return table.delete_item(Key={'id': product_id}).get('Item')
+   # the deleted product, None if there was none
+   return table.delete_item(Key={'id': product_id}, ReturnValues='ALL_OLD').get('Attributes')
+
+def update_product(product_id, item, expected_version=None):
+   return upsert_product(product_id, item, expected_version)
+
+def iterate_pages(operation, **kwargs):
+   """Yields (items, last_evaluated_key) for every page of a scan or query.
+
+   DynamoDB returns at most 1 MB per call, so this keeps following
+   LastEvaluatedKey instead of silently stopping after the first page.
+   """
+   while True:
+      response=operation(**kwargs)
+      last_evaluated_key=response.get('LastEvaluatedKey')
+      yield response.get('Items', []), last_evaluated_key
+      if not last_evaluated_key:
+         return
+      kwargs['ExclusiveStartKey']=last_evaluated_key
+
+def scan_pages(**kwargs):
+   return iterate_pages(table.scan, **kwargs)
+
+def category_pages(category, **kwargs):
+   return iterate_pages(table.query, IndexName='category-index', KeyConditionExpression=boto3.dynamodb.conditions.Key('category').eq(category), **kwargs)
 
-def update_product(product_id, item):
-   return upsert_product(product_id, item)
+def iterate_products(pages):
+   for items, _ in pages:
+      yield from items
+
+def encode_page_token(last_evaluated_key):
+   if not last_evaluated_key:
+      return None
+   return base64.urlsafe_b64encode(json.dumps(last_evaluated_key, default=str).encode('utf-8')).decode('ascii')
+
+def decode_page_token(token):
+   try:
+      key=json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+   except ValueError:
+      raise ValueError('Invalid next token')
+   if not isinstance(key, dict):
+      raise ValueError('Invalid next token')
+   return key
+
+def get_products_page(category=None, limit=None, next_token=None):
+   """Returns one page of products and the token for the next one (None on the last page)"""
+   kwargs={}
+   if limit:
+      kwargs['Limit']=limit
+   if next_token:
+      kwargs['ExclusiveStartKey']=decode_page_token(next_token)
+   pages=category_pages(category, **kwargs) if category else scan_pages(**kwargs)
+   items, last_evaluated_key=next(pages)
+   return items, encode_page_token(last_evaluated_key)
+
+scan_segments=int(os.environ.get('SCAN_SEGMENTS') or 4)
+
+def scan_segment(segment, total_segments, output, stop):
+   # boto3 resources are not thread safe, the low-level client of the table is
+   for items, _ in iterate_pages(table.meta.client.scan, TableName=table_name, Segment=segment, TotalSegments=total_segments):
+      for item in items:
+         while not stop.is_set():
+            try:
+               output.put(item, timeout=0.1)
+               break
+            except queue.Full:
+               pass
+      if stop.is_set():
+         return
+
+def parallel_scan(total_segments=None):
+   """Scans the whole table with parallel Segment/TotalSegments workers.
+
+   Items are merged into one stream as they arrive, in no particular order.
+   The queue between the workers and the caller is bounded, so memory stays
+   flat however big the table is.
+   """
+   total_segments=total_segments or scan_segments
+   output=queue.Queue(maxsize=1000)
+   stop=threading.Event()
+   finished=object()
+   def worker(segment):
+      try:
+         scan_segment(segment, total_segments, output, stop)
+      finally:
+         output.put(finished)
+   with ThreadPoolExecutor(max_workers=total_segments) as executor:
+      futures=[executor.submit(worker, segment) for segment in range(total_segments)]
+      try:
+         running=total_segments
+         while running:
+            item=output.get()
+            if item is finished:
+               running-=1
+            else:
+               yield item
+         for future in futures:
+            future.result() # re-raises errors from the workers
+      finally:
+         stop.set()
+         # unblock workers waiting to hand over their last item
+         while any(not future.done() for future in futures):
+            try:
+               output.get(timeout=0.1)
+            except queue.Empty:
+               pass
 
-def get_all_products():
-   return table.scan()['Items']
+def get_all_products(limit=None):
+   """The first page of products, at most limit and 1 MB of items; get_products_page reads the next ones"""
+   return get_products_page(None, limit)[0]
 
-def get_products_by_category(category):
-   return table.query(IndexName='category-index', KeyConditionExpression=boto3.dynamodb.conditions.Key('category').eq(category)).get('Items') 
+def get_products_by_category(category, limit=None):
+   """The first page of products of the category, like get_all_products"""
+   return get_products_page(category, limit)[0]
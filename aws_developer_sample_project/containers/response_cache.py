@@ -0,0 +1,173 @@
+"""Cache of the product read responses of app.py.
+
+Responses are kept as JSON text under their route and query parameters,
+and every key belongs to a group: one product (product:{id}), the whole
+catalog (products) or one category (category:{name}). Writes invalidate
+the groups of the products they change.
+
+Entries live in a LocalCache in the worker process (LOCAL_CACHE_* settings).
+With CACHE_CLUSTER_URL set they are also kept in Valkey, shared by all the
+tasks, one hash per group so a group is invalidated with a single DEL.
+Invalidations also increment generation:{group} in Valkey, and a response
+is only written to the shared hash if that generation did not move while
+it was loaded. Other tasks only see an invalidation once their local
+entries expire.
+"""
+import logging
+import os
+import threading
+from urllib.parse import urlencode
+import local_cache
+
+logger=logging.getLogger(__name__)
+
+# a cached response is not used after this long, even without writes
+shared_ttl=int(os.environ.get('RESPONSE_CACHE_SHARED_TTL_SECONDS') or 60)
+enabled=os.environ.get('RESPONSE_CACHE', 'true')=='true'
+
+local=local_cache.from_environment()
+# group -> generation, invalidating a group moves it to a new generation
+# and its old local entries age out of the LRU
+generations={}
+lock=threading.Lock()
+
+def create_shared_client():
+   cluster_url=os.environ.get('CACHE_CLUSTER_URL')
+   if not cluster_url:
+      return None
+   import redis # optional, only with a shared cache
+   return redis.Redis(
+      host=cluster_url,
+      port=6379,
+      decode_responses=True,
+      ssl=True,
+      socket_connect_timeout=1,
+      socket_timeout=1,
+      socket_keepalive=True,
+      health_check_interval=30
+   )
+
+shared=None
+shared_created=False
+
+def shared_client():
+   """The Valkey client, created on first use (None without CACHE_CLUSTER_URL)"""
+   global shared, shared_created
+   if not shared_created:
+      with lock:
+         if not shared_created:
+            shared=create_shared_client()
+            shared_created=True
+   return shared
+
+def query_key(args):
+   """The query parameters in a stable order, e.g. from request.args"""
+   return urlencode(sorted(args.items(multi=True)))
+
+def local_key(group, query):
+   return f"{group}#{local_generation(group)}?{query}"
+
+def get(group, query=''):
+   """The cached body of the response, or None"""
+   if not enabled:
+      return None
+   body=local.get(local_key(group, query))
+   if body is not None or not shared_client():
+      return body
+   try:
+      body=shared_client().hget(f"response:{group}", query)
+   except Exception as e:
+      logger.warning("Valkey error: %s", e)
+      return None
+   if body is not None:
+      local.set(local_key(group, query), body, len(body))
+   return body
+
+def local_generation(group):
+   return generations.get(group, 0)
+
+def shared_generation(group):
+   """The generation of the group in Valkey, None when Valkey can not be read"""
+   try:
+      return int(shared_client().get(f"generation:{group}") or 0)
+   except Exception as e:
+      logger.warning("Valkey error: %s", e)
+      return None
+
+def generation(group):
+   """The (local, shared) generation of the group, read it before loading a response"""
+   return local_generation(group), shared_generation(group) if shared_client() else None
+
+def store_shared(group, query, body, loaded_generation):
+   """Writes the body to Valkey if generation:{group} is still loaded_generation, returns whether it did.
+
+   The generation key is watched, so an invalidation from another task
+   between the check and the write makes the transaction run again.
+   """
+   def write(pipeline):
+      if int(pipeline.get(f"generation:{group}") or 0)!=loaded_generation:
+         return False
+      pipeline.multi()
+      pipeline.hset(f"response:{group}", query, body)
+      # the first response of a group sets when the whole group expires
+      pipeline.expire(f"response:{group}", shared_ttl, nx=True)
+      return True
+   return shared_client().transaction(write, f"generation:{group}", value_from_callable=True)
+
+def store(group, query, body, loaded_generation):
+   """Caches the body unless the group was invalidated since loaded_generation (read before loading)"""
+   local_loaded, shared_loaded=loaded_generation
+   if not enabled or local_generation(group)!=local_loaded:
+      return
+   if shared_client() and shared_loaded is not None:
+      try:
+         if not store_shared(group, query, body, shared_loaded):
+            # invalidated by another task while loading
+            return
+      except Exception as e:
+         logger.warning("Valkey error: %s", e)
+   local.set(local_key(group, query), body, len(body))
+
+def cache_chunks(group, query, chunks, loaded_generation):
+   """Yields the chunks of a streamed body and caches the body once complete.
+
+   Bodies bigger than the local cache are streamed without being kept.
+   """
+   collected=[]
+   size=0
+   for chunk in chunks:
+      if collected is not None:
+         collected.append(chunk)
+         size+=len(chunk)
+         if size > local.max_bytes:
+            collected=None
+      yield chunk
+   if collected is not None:
+      store(group, query, ''.join(collected), loaded_generation)
+
+def product_groups(product):
+   """The groups whose responses include the product"""
+   groups=[f"product:{product['id']}", 'products']
+   if product.get('category'):
+      groups.append(f"category:{product['category']}")
+   return groups
+
+def invalidate(*groups):
+   with lock:
+      for group in groups:
+         generations[group]=generations.get(group, 0)+1
+   if not shared_client():
+      return
+   try:
+      pipeline=shared_client().pipeline(transaction=True)
+      for group in groups:
+         pipeline.incr(f"generation:{group}")
+         pipeline.delete(f"response:{group}")
+      pipeline.execute()
+   except Exception as e:
+      logger.warning("Valkey error: %s", e)
+
+def clear():
+   with lock:
+      generations.clear()
+   local.clear()
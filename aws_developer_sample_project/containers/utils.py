@@ -1,6 +1,13 @@
-import json
-from decimal import Decimal
-from flask import make_response
+from json_encoder import dumps, decimal_serializer
+import gzip
+import os
+import zlib
+from flask import make_response, request, Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
 access_control_headers= {
     'Access-Control-Allow-Origin': '*', 
@@ -8,21 +15,88 @@ access_control_headers= {
     'Access-Control-Allow-Headers': 'Content-Type, Authorization'
 }
 headers={**access_control_headers, 'Content-Type': 'application/json'}
+# clients keep the body and revalidate it with If-None-Match
+cache_control=os.environ.get('CACHE_CONTROL') or 'no-cache'
+# smaller bodies are not worth compressing
+compression_threshold=int(os.environ.get('COMPRESSION_THRESHOLD') or 1024)
+# Content-Encoding -> function compressing bytes, in order of preference
+compressors={'gzip': lambda data: gzip.compress(data, compresslevel=6)}
+if brotli:
+    compressors={'br': lambda data: brotli.compress(data, quality=5), **compressors}
 
 def create_options_response():
     response=make_response('', 200, access_control_headers)
 
 def create_success_response(status_code, data):
-    return make_response(json.dumps(data, default=decimal_serializer), status_code, headers)
+    return create_json_response(status_code, dumps(data))
+
+def create_json_response(status_code, body):
+    """Response with a body already encoded as JSON text, e.g. from the response cache"""
+    response=make_response(body, status_code, headers)
+    if request.method in ('GET', 'HEAD') and status_code==200:
+        # ETag from the body; answers 304 without body when If-None-Match has it
+        response.add_etag()
+        response.headers['Cache-Control']=cache_control
+        response.make_conditional(request)
+    return compress_response(response)
+
+def compress_response(response):
+    """Compresses the body with the best encoding the client accepts (Accept-Encoding)"""
+    if response.status_code!=200:
+        return response
+    data=response.get_data()
+    if len(data) < compression_threshold:
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding=request.accept_encodings.best_match(list(compressors))
+    if not encoding:
+        return response
+    response.set_data(compressors[encoding](data))
+    response.headers['Content-Encoding']=encoding
+    etag, _ = response.get_etag()
+    if etag:
+        # same content, different bytes
+        response.set_etag(etag, weak=True)
+    return response
+
+def gzip_chunks(chunks):
+    compressor=zlib.compressobj(6, zlib.DEFLATED, 16+zlib.MAX_WBITS) # gzip format
+    for chunk in chunks:
+        data=compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+def create_chunked_response(chunks, status_code, response_headers):
+    """Streams the chunks, gzip compressed when the client accepts it"""
+    if request.accept_encodings.best_match(['gzip']):
+        return Response(gzip_chunks(chunks), status_code, {**response_headers, 'Content-Encoding': 'gzip', 'Vary': 'Accept-Encoding'})
+    return Response(chunks, status_code, response_headers)
+
+def json_array_chunks(items):
+    """Encodes an iterable of items as a JSON array, one chunk per item"""
+    separator='['
+    for item in items:
+        yield separator+dumps(item)
+        separator=','
+    yield ']' if separator==',' else '[]'
+
+def create_streaming_response(status_code, items):
+    """Streams an iterable of items as a JSON array, one item at a time"""
+    return create_json_streaming_response(status_code, json_array_chunks(items))
+
+def create_json_streaming_response(status_code, chunks):
+    return create_chunked_response(chunks, status_code, headers)
+
+def create_ndjson_streaming_response(status_code, items):
+    """Streams an iterable of items with one JSON document per line (NDJSON)"""
+    def generate():
+        for item in items:
+            yield dumps(item)+'\n'
+    return create_chunked_response(generate(), status_code, {**access_control_headers, 'Content-Type': 'application/x-ndjson'})
 
 def create_error_response(status_code, message):
-    return make_response(json.dumps({
+    return make_response(dumps({
         'error': message,
         'statusCode': status_code
         }), status_code, headers)
-
-def decimal_serializer(obj):
-    """Handle Decimal objects in JSON serialization"""
-    if isinstance(obj, Decimal):
-        return float(obj)
-    raise TypeError(f"Object of type {type(obj)} is not JSON serializable")
\ No newline at end of file
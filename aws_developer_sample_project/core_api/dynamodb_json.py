@@ -0,0 +1,58 @@
+"""Converts items in DynamoDB's wire format straight to JSON text.
+
+The low-level client returns attribute values like {'N': '10.5'}. Numbers
+are already text in the wire format, so they are copied as they are instead
+of going through Decimal (boto3's TypeDeserializer) and back (json.dumps).
+Sets become arrays and binary values base64 strings.
+"""
+import base64
+from json.encoder import encode_basestring_ascii as encode_string
+
+def encode_binary(value):
+   return '"'+base64.b64encode(value).decode('ascii')+'"'
+
+def encode_list(values):
+   return '['+','.join([attribute_to_json(value) for value in values])+']'
+
+converters={
+   'S': encode_string,
+   'N': str,
+   'BOOL': lambda value: 'true' if value else 'false',
+   'NULL': lambda value: 'null',
+   'M': lambda value: item_to_json(value),
+   'L': encode_list,
+   'SS': lambda values: '['+','.join([encode_string(value) for value in values])+']',
+   'NS': lambda values: '['+','.join(values)+']',
+   'B': encode_binary,
+   'BS': lambda values: '['+','.join([encode_binary(value) for value in values])+']'
+}
+
+def attribute_to_json(attribute_value):
+   for data_type, value in attribute_value.items():
+      return converters[data_type](value)
+   raise ValueError('Empty attribute value')
+
+# '"name":' for every attribute name seen, items of a table share a few names
+encoded_names={}
+max_encoded_names=1000
+
+def item_to_json(item):
+   members=[]
+   for name, attribute_value in item.items():
+      encoded_name=encoded_names.get(name)
+      if encoded_name is None:
+         encoded_name=encode_string(name)+':'
+         if len(encoded_names) < max_encoded_names:
+            encoded_names[name]=encoded_name
+      for data_type, value in attribute_value.items():
+         # strings and numbers are most of the values, skip the lookup for them
+         if data_type=='S':
+            members.append(encoded_name+encode_string(value))
+         elif data_type=='N':
+            members.append(encoded_name+value)
+         else:
+            members.append(encoded_name+converters[data_type](value))
+   return '{'+','.join(members)+'}'
+
+def items_to_json(items):
+   return '['+','.join([item_to_json(item) for item in items])+']'
@@ -0,0 +1,23 @@
+from response_utils import create_ndjson_response,create_error_response
+import products_db
+
+def parse_number(query_parameters, name, default, maximum):
+   value=query_parameters.get(name) or str(default)
+   if not value.isdigit() or not 0 < int(value) <= maximum:
+      raise ValueError(f'{name} must be a number between 1 and {maximum}')
+   return int(value)
+
+def handler(event, context):
+   try:
+      query_parameters=event.get('queryStringParameters') or {}
+      # GET /products/export?segments=4&limit=1000, then ?next=<X-Next-Token> until there is no token
+      try:
+         segments=parse_number(query_parameters, 'segments', products_db.scan_segments, products_db.max_segments)
+         limit=parse_number(query_parameters, 'limit', products_db.export_limit, products_db.export_limit)
+         products,next_token=products_db.export_page(segments, limit, query_parameters.get('next'))
+      except ValueError as e:
+         return create_error_response(400, str(e))
+      return create_ndjson_response(200, products, event, next_token)
+   except Exception as e:
+      print(f"Unexpected error: {str(e)}")
+      return create_error_response(500, f'Internal server error - {str(e)}')
@@ -1,4 +1,4 @@
-from response_utils import create_success_response,create_error_response
+from response_utils import create_json_response,create_error_response
 import products_db
 import traceback
 def handler(event, context):
@@ -6,9 +6,9 @@ def handler(event, context):
       path_parameters = event.get('pathParameters') or {}
       product_id = path_parameters.get('id')
       if product_id:
-         product=products_db.get_product(product_id)
+         product=products_db.get_product_json(product_id)
          if product:
-            return create_success_response(200, product) 
+            return create_json_response(200, product, event)
          else:
                return create_error_response(404, 'Product not found')
       else: 
@@ -0,0 +1,18 @@
+from response_utils import create_success_response,create_error_response
+import products_db
+
+max_ids=100
+
+def handler(event, context):
+   try:
+      query_parameters=event.get('queryStringParameters') or {}
+      product_ids=[product_id.strip() for product_id in (query_parameters.get('ids') or '').split(',') if product_id.strip()]
+      if not product_ids:
+         return create_error_response(400, 'Product ids are required')
+      if len(product_ids) > max_ids:
+         return create_error_response(400, f'At most {max_ids} product ids are allowed')
+      products=products_db.get_products(product_ids)
+      return create_success_response(200, products, event)
+   except Exception as e:
+      print(f"Unexpected error: {str(e)}")
+      return create_error_response(500, f'Internal server error - {str(e)}')
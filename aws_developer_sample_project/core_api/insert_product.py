@@ -2,10 +2,10 @@ import json
 from decimal import Decimal
 import uuid
 import products_db
-from response_utils import create_success_response,create_error_response
+from response_utils import create_success_response,create_error_response,get_request_body
 
 def handler(event, context):
-   body = event.get('body') or ''
+   body = get_request_body(event)
    try:
       item = json.loads(body)
       if 'id' in item:
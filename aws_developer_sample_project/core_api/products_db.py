@@ -1,16 +1,70 @@
 import boto3
 import boto3.dynamodb.conditions
 import uuid
+from concurrent.futures import ThreadPoolExecutor
+from botocore.config import Config
+import base64
+import json
 from decimal import Decimal
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+import dynamodb_json
+import json_encoder
 
 import os
+import time
 table_name=os.environ.get('PRODUCTS_TABLE_NAME') or 'Products'
-table=boto3.resource('dynamodb').Table(table_name)
+# most segments an export reads at the same time, one thread each
+max_segments=int(os.environ.get('MAX_SCAN_SEGMENTS') or 16)
+# a connection for each segment, botocore keeps 10 by default
+dynamodb=boto3.resource('dynamodb', config=Config(max_pool_connections=max_segments))
+table=dynamodb.Table(table_name)
+low_level_reads=(os.environ.get('LOW_LEVEL_READS') or 'false').lower()=='true'
+client=None
+
+def get_client():
+   """Low-level client for the read-only endpoints, created on first use with LOW_LEVEL_READS.
+
+   It returns items in DynamoDB's wire format. dynamodb.meta.client can not
+   be used, the resource adds its (de)serialization to it.
+   """
+   global client
+   if client is None:
+      client=boto3.client('dynamodb')
+   return client
+
+batch_get_size=100 # BatchGetItem limit
+batch_get_attempts=5
 
 def get_product(product_id):
    return table.get_item(Key={'id': product_id}).get('Item')
 
-def upsert_product(product_id, fields):
+def get_products(product_ids):
+   """Gets many products with BatchGetItem, in chunks of 100 keys.
+
+   Unprocessed keys are retried with exponential backoff. Products that do
+   not exist are left out; the rest come back in the order they were asked for.
+   """
+   product_ids=list(dict.fromkeys(product_ids)) # no duplicates, keeps the order
+   found={}
+   for start in range(0, len(product_ids), batch_get_size):
+      keys=[{'id': product_id} for product_id in product_ids[start:start+batch_get_size]]
+      request_items={table_name: {'Keys': keys}}
+      for attempt in range(batch_get_attempts):
+         response=dynamodb.batch_get_item(RequestItems=request_items)
+         for item in response.get('Responses', {}).get(table_name, []):
+            found[item['id']]=item
+         request_items=response.get('UnprocessedKeys')
+         if not request_items:
+            break
+         time.sleep(0.05 * 2**attempt)
+      else:
+         raise RuntimeError(f"Could not get {len(request_items[table_name]['Keys'])} products after {batch_get_attempts} attempts")
+   return [found[product_id] for product_id in product_ids if product_id in found]
+
+class VersionConflict(Exception):
+   """The product changed since the expected version was read"""
+
+def upsert_product(product_id, fields, expected_version=None):
    category=fields.get('category') or []
    title=fields.get('title') or ''
    description=fields.get('description') or ''
@@ -20,20 +74,35 @@ def upsert_product(product_id, fields):
       SET category = :category,
       title = :title,
       description = :description,
-      price = :price
+      price = :price,
+      version = if_not_exists(version, :zero) + :one
    """
    expression_attribute_values = {
       ':category': category,
       ':title': title,
       ':description': description,
-      ':price': price
+      ':price': price,
+      ':zero': 0,
+      ':one': 1
    }
-   inserted=table.update_item(
-      Key={'id': product_id},
-      UpdateExpression=update_expression,
-      ExpressionAttributeValues=expression_attribute_values,
-      ReturnValues="ALL_NEW"
-   )
+   conditions={}
+   if expected_version is not None:
+      # only if nobody changed the product since expected_version was read
+      if expected_version:
+         conditions['ConditionExpression']='version = :expected_version'
+         expression_attribute_values[':expected_version']=expected_version
+      else:
+         conditions['ConditionExpression']='attribute_exists(id) AND attribute_not_exists(version)'
+   try:
+      inserted=table.update_item(
+         Key={'id': product_id},
+         UpdateExpression=update_expression,
+         ExpressionAttributeValues=expression_attribute_values,
+         ReturnValues="ALL_NEW",
+         **conditions
+      )
+   except table.meta.client.exceptions.ConditionalCheckFailedException:
+      raise VersionConflict(f"Product {product_id} is not at version {expected_version}")
    return inserted['Attributes']
     
 def insert_product(item):
@@ -42,11 +111,168 @@ def insert_product(item):
 def delete_product(product_id):
    return table.delete_item(Key={'id': product_id}).get('Item')
 
-def update_product(product_id, item):
-   return upsert_product(product_id, item)
+def update_product(product_id, item, expected_version=None):
+   return upsert_product(product_id, item, expected_version)
+
+def iterate_pages(operation, **kwargs):
+   """Yields (items, last_evaluated_key) for every page of a scan or query.
+
+   DynamoDB returns at most 1 MB per call, so this keeps following
+   LastEvaluatedKey instead of silently stopping after the first page.
+   """
+   while True:
+      response=operation(**kwargs)
+      last_evaluated_key=response.get('LastEvaluatedKey')
+      yield response.get('Items', []), last_evaluated_key
+      if not last_evaluated_key:
+         return
+      kwargs['ExclusiveStartKey']=last_evaluated_key
+
+def scan_pages(**kwargs):
+   return iterate_pages(table.scan, **kwargs)
+
+def category_pages(category, **kwargs):
+   return iterate_pages(table.query, IndexName='category-index', KeyConditionExpression=boto3.dynamodb.conditions.Key('category').eq(category), **kwargs)
+
+def iterate_products(pages):
+   for items, _ in pages:
+      yield from items
+
+def encode_page_token(last_evaluated_key):
+   if not last_evaluated_key:
+      return None
+   return base64.urlsafe_b64encode(json.dumps(last_evaluated_key, default=str).encode('utf-8')).decode('ascii')
+
+def decode_page_token(token):
+   try:
+      key=json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+   except ValueError:
+      raise ValueError('Invalid next token')
+   if not isinstance(key, dict):
+      raise ValueError('Invalid next token')
+   return key
+
+def get_products_page(category=None, limit=None, next_token=None):
+   """Returns one page of products and the token for the next one (None on the last page)"""
+   kwargs={}
+   if limit:
+      kwargs['Limit']=limit
+   if next_token:
+      kwargs['ExclusiveStartKey']=decode_page_token(next_token)
+   pages=category_pages(category, **kwargs) if category else scan_pages(**kwargs)
+   items, last_evaluated_key=next(pages)
+   return items, encode_page_token(last_evaluated_key)
+
+scan_segments=int(os.environ.get('SCAN_SEGMENTS') or 4)
+# products per export page, a Lambda response holds at most 6 MB
+export_limit=int(os.environ.get('EXPORT_LIMIT') or 1000)
+scan_executor=None
+
+def get_scan_executor():
+   """Threads of the export segments, created on first use and kept for the life of the container"""
+   global scan_executor
+   if scan_executor is None:
+      scan_executor=ThreadPoolExecutor(max_workers=max_segments, thread_name_prefix='scan')
+   return scan_executor
+
+def encode_export_token(total_segments, start_keys):
+   if not start_keys:
+      return None
+   return encode_page_token({'segments': total_segments, 'keys': {str(segment): key for segment, key in start_keys.items()}})
+
+def decode_export_token(token):
+   """The number of segments and the key each unfinished segment starts after"""
+   key=decode_page_token(token)
+   try:
+      total_segments=int(key['segments'])
+      start_keys={int(segment): start_key for segment, start_key in key['keys'].items()}
+   except (KeyError, TypeError, ValueError, AttributeError):
+      raise ValueError('Invalid next token')
+   if not 0 < total_segments <= max_segments or not start_keys or not all(0 <= segment < total_segments and isinstance(start_key, dict) for segment, start_key in start_keys.items()):
+      raise ValueError('Invalid next token')
+   return total_segments, start_keys
+
+def scan_segment(segment, total_segments, limit, start_key=None):
+   """One page of a segment, with the low-level client: unlike the table it is thread safe"""
+   kwargs={'ExclusiveStartKey': start_key} if start_key else {}
+   response=dynamodb.meta.client.scan(TableName=table_name, Segment=segment, TotalSegments=total_segments, Limit=limit, **kwargs)
+   return response.get('Items', []), response.get('LastEvaluatedKey')
+
+def export_page(total_segments=None, limit=None, next_token=None):
+   """One page of the whole table, read with parallel Segment/TotalSegments scans.
+
+   Every unfinished segment reads its share of limit products at the same
+   time, so a page has at most limit products (or one per segment when
+   limit is smaller), in no particular order. The token of the next page
+   (None after the last one) keeps the number of segments and where each of
+   them stopped.
+   """
+   if next_token:
+      total_segments, start_keys=decode_export_token(next_token)
+   else:
+      total_segments=total_segments or scan_segments
+      start_keys=dict.fromkeys(range(total_segments))
+   segment_limit=max(1, (limit or export_limit)//len(start_keys))
+   futures={segment: get_scan_executor().submit(scan_segment, segment, total_segments, segment_limit, start_key) for segment, start_key in start_keys.items()}
+   items=[]
+   next_keys={}
+   for segment, future in futures.items():
+      segment_items, last_evaluated_key=future.result()
+      items.extend(segment_items)
+      if last_evaluated_key:
+         next_keys[segment]=last_evaluated_key
+   return items, encode_export_token(total_segments, next_keys)
+
+def get_all_products(limit=None):
+   """The first page of products, at most limit and 1 MB of items; get_products_page reads the next ones"""
+   return get_products_page(None, limit)[0]
+
+def get_products_by_category(category, limit=None):
+   """The first page of products of the category, like get_all_products"""
+   return get_products_page(category, limit)[0]
+
+
+# Read-only queries returning JSON text. With LOW_LEVEL_READS=true they use the
+# low-level client and dynamodb_json, so no Decimal is ever built.
+
+def get_product_json(product_id):
+   if not low_level_reads:
+      product=get_product(product_id)
+      return json_encoder.dumps(product) if product else None
+   item=get_client().get_item(TableName=table_name, Key={'id': {'S': product_id}}).get('Item')
+   return dynamodb_json.item_to_json(item) if item else None
+
+def low_level_pages(category=None, **kwargs):
+   if category:
+      return iterate_pages(get_client().query, TableName=table_name, IndexName='category-index',
+         KeyConditionExpression='category = :category', ExpressionAttributeValues={':category': {'S': category}}, **kwargs)
+   return iterate_pages(get_client().scan, TableName=table_name, **kwargs)
+
+def get_products_json(category=None, limit=None):
+   """The first page of get_products_page as a JSON array, and the token of the next page"""
+   if not low_level_reads:
+      products, token=get_products_page(category, limit)
+      return json_encoder.dumps(products), token
+   items, token=low_level_page(category, limit)
+   return dynamodb_json.items_to_json(items), token
 
-def get_all_products():
-   return table.scan()['Items']
+def get_products_page_json(category=None, limit=None, next_token=None):
+   """Same as get_products_page, as a {"items": [...], "next": token} JSON object"""
+   if not low_level_reads:
+      products, token=get_products_page(category, limit, next_token)
+      return json_encoder.dumps({'items': products, 'next': token})
+   items, token=low_level_page(category, limit, next_token)
+   return '{"items":'+dynamodb_json.items_to_json(items)+',"next":'+json_encoder.dumps(token)+'}'
 
-def get_products_by_category(category):
-   return table.query(IndexName='category-index', KeyConditionExpression=boto3.dynamodb.conditions.Key('category').eq(category)).get('Items') 
+def low_level_page(category=None, limit=None, next_token=None):
+   """Same as get_products_page, with the items in the DynamoDB format"""
+   kwargs={}
+   if limit:
+      kwargs['Limit']=limit
+   if next_token:
+      # page tokens hold plain keys, so both paths accept each other's tokens
+      kwargs['ExclusiveStartKey']={name: TypeSerializer().serialize(value) for name, value in decode_page_token(next_token).items()}
+   items, last_evaluated_key=next(low_level_pages(category, **kwargs))
+   if last_evaluated_key:
+      last_evaluated_key={name: TypeDeserializer().deserialize(value) for name, value in last_evaluated_key.items()}
+   return items, encode_page_token(last_evaluated_key)
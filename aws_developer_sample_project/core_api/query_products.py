@@ -1,16 +1,36 @@
-from response_utils import create_success_response,create_error_response
-from products_db import get_products_by_category, get_all_products
+from response_utils import create_json_response,create_error_response,add_next_token
+from products_db import get_products_json, get_products_page_json
+import get_products
+
+max_limit=1000
+
+def parse_limit(limit):
+   if limit is None:
+      return max_limit
+   if not limit.isdigit() or not 0 < int(limit) <= max_limit:
+      raise ValueError(f'limit must be a number between 1 and {max_limit}')
+   return int(limit)
 
 def handler(event, context):
    path_parameters = event.get('pathParameters') or {}
    try:
       query_parameters=event.get('queryStringParameters') or {}
+      if 'ids' in query_parameters:
+         # GET /products?ids=a,b,c
+         return get_products.handler(event, context)
       category=query_parameters.get('category')
-      if category:
-         products=get_products_by_category(category)
-      else: 
-         products=get_all_products()
-      return create_success_response(200, products)
+      if 'limit' in query_parameters or 'next' in query_parameters:
+         # GET /products?limit=50&next=<token> returns one page at a time
+         try:
+            limit=parse_limit(query_parameters.get('limit'))
+            page=get_products_page_json(category, limit, query_parameters.get('next'))
+         except ValueError as e:
+            return create_error_response(400, str(e))
+         return create_json_response(200, page, event)
+      # without parameters, the first page as an array: a Lambda response
+      # holds at most 6 MB, X-Next-Token has the token of the next page
+      products,next_token=get_products_json(category, max_limit)
+      return add_next_token(create_json_response(200, products, event), next_token)
    except Exception as e:
       print(f"Unexpected error: {str(e)}")
       return create_error_response(500, f'Internal server error - {str(e)}')
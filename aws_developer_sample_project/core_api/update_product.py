@@ -1,18 +1,27 @@
-from response_utils import create_success_response,create_error_response
+from response_utils import create_success_response,create_error_response,get_request_body,get_header,if_match_allows,compute_etag
 import json
 from decimal import Decimal
-from products_db import update_product
+import products_db
 
 def handler(event, context):
    try:
-      body = event.get('body') or ''
+      body = get_request_body(event)
       id=event.get('pathParameters',{}).get('id')
       item = json.loads(body)
       if id:
-         updated=update_product(id,item)
+         expected_version=None
+         if get_header(event, 'If-Match'):
+            # compare with the ETag of GET /products/{id}; the write checks the version again
+            current=products_db.get_product_json(id)
+            if not current or not if_match_allows(event, compute_etag(current)):
+               return create_error_response(412, 'Product has changed')
+            expected_version=int(json.loads(current).get('version') or 0)
+         updated=products_db.update_product(id,item,expected_version)
          return create_success_response(200, updated)
       else:
          return create_error_response(400, 'Product id is required')
+   except products_db.VersionConflict as e:
+      return create_error_response(412, 'Product has changed')
    except Exception as e:
       print(f"Unexpected error: {str(e)}")
       return create_error_response(500, f'Internal server error - {str(e)}')
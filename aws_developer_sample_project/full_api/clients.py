@@ -0,0 +1,92 @@
+"""Clients shared by all the invocations of a Lambda container.
+
+Creating a client resolves credentials and endpoints and opens new (TLS)
+connections, so handlers get their clients from here instead of creating
+them on every invocation. Clients are created on first use: functions that
+never touch Valkey do not import redis or connect to the cluster, and
+boto3 is only imported when an AWS client is needed.
+
+Modules calling AWS on every request create their clients when they are
+imported with warm(), so that cost is paid while Lambda initializes the
+function (ahead of time with provisioned concurrency) and not by the first
+request.
+
+Tests can replace a client with register() and drop the cached ones with reset().
+"""
+import os
+import threading
+
+def boto_config():
+   from botocore.config import Config
+   # keep the connections to AWS open between invocations, one for each
+   # of the 16 export segments (products_db.max_segments) at most
+   return Config(
+      tcp_keepalive=True,
+      max_pool_connections=int(os.environ.get('MAX_POOL_CONNECTIONS') or 16)
+   )
+
+def create_boto_client(service_name):
+   import boto3 # about 200 ms, functions answering from the cache never load it
+   return boto3.client(service_name, config=boto_config())
+
+def create_boto_resource(service_name):
+   import boto3
+   return boto3.resource(service_name, config=boto_config())
+
+def create_cache_client():
+   cluster_url=os.environ.get('CACHE_CLUSTER_URL')
+   if not cluster_url:
+      return None
+   import redis # only the functions using the cache have the redis layer
+   # Redis/Valkey connection (Redis-compatible)
+   return redis.Redis(
+      host=cluster_url,
+      port=6379,
+      decode_responses=True,
+      ssl=True,
+      socket_connect_timeout=5,
+      socket_timeout=5,
+      socket_keepalive=True,
+      health_check_interval=30
+   )
+
+factories={
+   's3': lambda: create_boto_client('s3'),
+   'dynamodb': lambda: create_boto_resource('dynamodb'),
+   'cache': create_cache_client
+}
+
+clients={}
+# boto3's default session is not thread safe, create one client at a time
+lock=threading.Lock()
+
+def get(name):
+   """Returns the shared client called name, creating it on first use"""
+   client=clients.get(name)
+   if client is not None:
+      return client
+   with lock:
+      if clients.get(name) is None:
+         clients[name]=factories[name]()
+      return clients[name]
+
+def warm(*names):
+   """Creates the clients called names now, during the init phase"""
+   for name in names:
+      get(name)
+
+def register(name, client):
+   """Replaces the shared client called name, e.g. with a stand-in in tests"""
+   clients[name]=client
+
+def reset():
+   clients.clear()
+
+def s3():
+   return get('s3')
+
+def dynamodb():
+   return get('dynamodb')
+
+def cache():
+   return get('cache')
@@ -1,6 +1,10 @@
 from response_utils import create_success_response,create_error_response
 import products_db
+import metrics
+import log
 
+@log.buffered
+@metrics.instrument
 def handler(event, context):
     path_parameters = event.get('pathParameters') or {}
     try:
@@ -11,5 +15,5 @@ def handler(event, context):
          else: 
             return create_error_response(400, 'Product id is required') 
     except Exception as e:
-        print(f"Unexpected error: {str(e)}")
+        log.error("Unexpected error: %s", e)
         return create_error_response(500, f'Internal server error - {str(e)}')
@@ -1,5 +1,7 @@
 from response_utils import create_success_response,create_error_response
+import log
 
+@log.buffered
 def handler(event, context):
-   print(event)
+   log.info("Event", event=event)
    return create_success_response(200, event) 
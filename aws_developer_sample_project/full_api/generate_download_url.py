@@ -1,11 +1,15 @@
-import boto3
+import clients
+import log
 import json
 import os
 from utils import create_success_response,create_error_response
 
+clients.warm('s3')
+
+@log.buffered
 def handler(event, context):
    try:
-      s3_client = boto3.client('s3')
+      s3_client = clients.s3()
       bucket_name = os.environ.get('BUCKET_NAME')
       image_folder = os.environ.get('IMAGE_FOLDER') or 'product_images'
       if not bucket_name:
@@ -29,5 +33,5 @@ def handler(event, context):
       return create_success_response(200, {'download_url': download_url, 'expires_in':3600})      
       
    except Exception as e:
-      print(f"Eror - {e}")
+      log.error("Error - %s", e)
       return create_error_response(500, f'Failed to generate download URL - {e}',)
\ No newline at end of file
@@ -1,29 +1,38 @@
-from response_utils import create_success_response,create_error_response
+from response_utils import create_success_response,create_error_response,create_not_modified_response,etag_matches,get_header
 import products_db
 import sys
+import metrics
+import log
 
+@log.buffered
+@metrics.instrument
 def handler(event,context):
    ans=nohandler(event,context)
-   print(f"Returning {ans=}")
+   log.debug("Returning", response=ans)
    return ans
 
 def nohandler(event, context):
    try:
       path_parameters = event.get('pathParameters') or {}
       product_id = path_parameters.get('id')
-      print(f"{product_id=}")
+      log.debug("Getting product %s", product_id)
       if product_id:
+         if get_header(event, 'If-None-Match'):
+            # the ETag is cached next to the product, no need to load it
+            etag=products_db.get_product_etag(product_id)
+            if etag and etag_matches(event, etag):
+               return create_not_modified_response(etag)
          product=products_db.get_product(product_id)
-         print(f"{product=}")
+         log.debug("Loaded product", product=product)
          if product:
-            return create_success_response(200, product)
+            return create_success_response(200, product, event)
          else:
                return create_error_response(404, 'Product not found')
       else: 
          return create_error_response(400, 'Product id is required') 
    except BaseException as e:
-      print(f"Unexpected error: {str(e)}")
+      log.error("Unexpected error: %s", e)
       return create_error_response(500, f'Internal server error - {str(e)}')
    except:
-      print(f"Unexpected error {sys.last_value}")
+      log.error("Unexpected error %s", sys.last_value)
       return create_error_response(500, 'Internal server error :(')
\ No newline at end of file
@@ -2,10 +2,14 @@ import json
 from decimal import Decimal
 import uuid
 import products_db
-from response_utils import create_success_response,create_error_response
+from response_utils import create_success_response,create_error_response,get_request_body
+import metrics
+import log
 
+@log.buffered
+@metrics.instrument
 def handler(event, context):
-   body = event.get('body') or ''
+   body = get_request_body(event)
    try:
       item = json.loads(body)
       if 'id' in item:
@@ -13,5 +17,5 @@ def handler(event, context):
       inserted=products_db.insert_product(item)
       return create_success_response(200, inserted)
    except Exception as e:
-      print(f"Unexpected error: {str(e)}")
+      log.error("Unexpected error: %s", e)
       return create_error_response(500, f'Internal server error - {str(e)}')
@@ -0,0 +1,102 @@
+"""Structured logging for the Lambda functions: one JSON line per message.
+
+    log.info('Updating %s prices', len(prices), stream=stream_name)
+
+The message is only formatted, and the fields only encoded, when LOG_LEVEL
+(DEBUG, INFO, WARNING or ERROR, default INFO) lets the message through,
+so a log.debug() of a whole product costs nothing in production. Strings
+and encoded fields longer than LOG_MAX_LENGTH characters are truncated.
+
+A handler decorated with @log.buffered keeps its lines in memory and
+writes them in one go when it returns; metrics.py writes its EMF line
+through emit() so that it is part of the same write.
+"""
+import json
+import os
+import sys
+import time
+from functools import wraps
+from json_encoder import dumps
+
+levels={'DEBUG': 10, 'INFO': 20, 'WARNING': 30, 'ERROR': 40}
+level=levels.get((os.environ.get('LOG_LEVEL') or 'INFO').upper(), levels['INFO'])
+max_length=int(os.environ.get('LOG_MAX_LENGTH') or 1024)
+# lines kept before a long invocation writes them anyway
+buffer_limit=100
+
+# lines of the invocation being buffered, None when writing at once
+buffer=None
+request_id=None
+
+def truncate(text):
+   if len(text) <= max_length:
+      return text
+   return f"{text[:max_length]}... ({len(text)-max_length} more characters)"
+
+def encode_field(value):
+   if value is None or isinstance(value, (bool, int, float)):
+      return value
+   if isinstance(value, str):
+      return truncate(value)
+   try:
+      return truncate(dumps(value))
+   except TypeError:
+      return truncate(repr(value))
+
+def write(level_name, message, args, fields):
+   if args:
+      message=message % args
+   record={'level': level_name, 'timestamp': round(time.time()*1000), 'message': truncate(str(message))}
+   if request_id:
+      record['request_id']=request_id
+   for name, value in fields.items():
+      record[name]=encode_field(value)
+   emit(json.dumps(record))
+
+def debug(message, *args, **fields):
+   if levels['DEBUG'] >= level:
+      write('DEBUG', message, args, fields)
+
+def info(message, *args, **fields):
+   if levels['INFO'] >= level:
+      write('INFO', message, args, fields)
+
+def warning(message, *args, **fields):
+   if levels['WARNING'] >= level:
+      write('WARNING', message, args, fields)
+
+def error(message, *args, **fields):
+   if levels['ERROR'] >= level:
+      write('ERROR', message, args, fields)
+
+def emit(line):
+   """Writes an already formatted line, or keeps it for the end of the invocation"""
+   if buffer is None:
+      sys.stdout.write(line+'\n')
+      return
+   buffer.append(line)
+   if len(buffer) >= buffer_limit:
+      flush()
+
+def flush():
+   if buffer:
+      sys.stdout.write('\n'.join(buffer)+'\n')
+      sys.stdout.flush()
+      buffer.clear()
+
+def buffered(handler):
+   """Writes the lines logged while the handler runs once, when it returns or raises"""
+   @wraps(handler)
+   def buffered_handler(event, context):
+      global buffer, request_id
+      # a handler called by another one shares its buffer
+      if buffer is not None:
+         return handler(event, context)
+      buffer=[]
+      request_id=getattr(context, 'aws_request_id', None)
+      try:
+         return handler(event, context)
+      finally:
+         flush()
+         buffer, request_id=None, None
+   return buffered_handler
@@ -0,0 +1,96 @@
+"""Per-invocation latency metrics in CloudWatch Embedded Metric Format (EMF).
+
+A handler decorated with @metrics.instrument records its invocations:
+`with metrics.timer('DynamoDB'):` adds the duration of a block in
+milliseconds, metrics.count('CacheHit') adds to a counter, and at the end
+of the invocation one JSON line is written (see log.emit), which CloudWatch Logs turns
+into metrics in METRICS_NAMESPACE with the function as dimension.
+
+METRICS_SAMPLE_RATE (0 to 1, default 1) records that share of the
+invocations. Outside of a recorded invocation timer() returns a shared
+do-nothing context manager and count() returns at once.
+"""
+import json
+import os
+import random
+import threading
+import time
+from functools import wraps
+import log
+
+namespace=os.environ.get('METRICS_NAMESPACE') or 'ProductCatalog'
+sample_rate=float(os.environ.get('METRICS_SAMPLE_RATE') or 1)
+
+# name -> value of the invocation being recorded, None when not recording
+current=None
+units={}
+lock=threading.Lock()
+
+class NullTimer:
+   def __enter__(self):
+      return self
+   def __exit__(self, *exc_info):
+      return False
+
+null_timer=NullTimer()
+
+class Timer:
+   def __init__(self, name):
+      self.name=name
+   def __enter__(self):
+      self.start=time.perf_counter()
+      return self
+   def __exit__(self, *exc_info):
+      add(self.name, (time.perf_counter()-self.start)*1000, 'Milliseconds')
+      return False
+
+def timer(name):
+   """Context manager adding the duration of the block to the metric name"""
+   if current is None:
+      return null_timer
+   return Timer(name)
+
+def add(name, value, unit):
+   if current is None:
+      return
+   with lock:
+      current[name]=current.get(name, 0)+value
+      units[name]=unit
+
+def count(name, value=1):
+   if current is None:
+      return
+   add(name, value, 'Count')
+
+def emf_record(function_name, values):
+   return {
+      '_aws': {
+         'Timestamp': int(time.time()*1000),
+         'CloudWatchMetrics': [{
+            'Namespace': namespace,
+            'Dimensions': [['Function']],
+            'Metrics': [{'Name': name, 'Unit': units[name]} for name in values]
+         }]
+      },
+      'Function': function_name,
+      **{name: round(value, 3) if units[name]=='Milliseconds' else value for name, value in values.items()}
+   }
+
+def instrument(handler):
+   """Records the Duration of the handler and the metrics added while it runs"""
+   function_name=os.environ.get('AWS_LAMBDA_FUNCTION_NAME') or handler.__module__
+   @wraps(handler)
+   def instrumented(event, context):
+      global current
+      # a handler called by another one adds to its record
+      if current is not None or sample_rate <= 0 or (sample_rate < 1 and random.random() >= sample_rate):
+         return handler(event, context)
+      current={}
+      units.clear()
+      try:
+         with Timer('Duration'):
+            return handler(event, context)
+      finally:
+         values, current=current, None
+         log.emit(json.dumps(emf_record(function_name, values)))
+   return instrumented
@@ -1,17 +1,48 @@
 import base64
 import json
-from products_db import update_price
+from decimal import Decimal
+from products_db import update_prices
+import metrics
+import log
 
-def handler(event, context):
+def decode_record(record):
+    record_data = base64.b64decode(record['kinesis']['data']).decode('utf-8')
+    # DynamoDB does not accept floats
+    record_data = json.loads(record_data, parse_float=Decimal)
+    return record_data['product_id'], record_data['price']
+
+def latest_prices(records):
+    """Keeps only the last price for each product, in sequence number order.
 
-    for record in event['Records']:
+    Returns the prices and the sequence number each price came from. Records
+    that can not be decoded are logged and skipped: retrying them would fail
+    the same way and hold up the shard until they expire.
+    """
+    prices = {}
+    sequence_numbers = {}
+    for record in sorted(records, key=lambda record: int(record['kinesis']['sequenceNumber'])):
         try:
-            print(f"Processing Kinesis Event - EventID: {record['eventID']}")
-            record_data = base64.b64decode(record['kinesis']['data']).decode('utf-8')
-            record_data=json.loads(record_data)
-            print(f"Record Data: {record_data}")
-            update_price(record_data['product_id'],record_data['price'])
+            product_id, price = decode_record(record)
         except Exception as e:
-            print(f"An error occurred {e}")
-            raise e
-    print(f"Successfully processed {len(event['Records'])} records.")
+            log.error("Skipping record %s that can not be decoded: %s", record['eventID'], e)
+            metrics.count('SkippedRecords')
+            continue
+        prices[product_id] = price
+        sequence_numbers[product_id] = record['kinesis']['sequenceNumber']
+    return prices, sequence_numbers
+
+@log.buffered
+@metrics.instrument
+def handler(event, context):
+    prices, sequence_numbers = latest_prices(event['Records'])
+    log.info("Updating %s prices from %s records", len(prices), len(event['Records']))
+    failed = []
+    for product_id, result in update_prices(prices).items():
+        if isinstance(result, Exception):
+            log.error("An error occurred updating %s: %s", product_id, result)
+            failed.append(sequence_numbers[product_id])
+    # only the writes can succeed when retried. Lambda restarts the batch from
+    # the lowest failed sequence number, and after the retry attempts of the
+    # event source the batch goes to the failure destination
+    log.info("Processed %s records, %s failed", len(event['Records']), len(failed))
+    return {'batchItemFailures': [{'itemIdentifier': sequence_number} for sequence_number in failed]}
@@ -1,8 +1,12 @@
-import boto3
+import clients
+import log
 import os
-import PIL
+from PIL import Image
 from io import BytesIO
 from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+
+clients.warm('s3', 'dynamodb')
 
 @dataclass
 class ImageSize:
@@ -16,6 +20,14 @@ sizes=[
    ImageSize('large', 1920, 1080)
 ]
 
+# output format -> (file extension, content type)
+image_formats={
+   'JPEG': ('jpg', 'image/jpeg'),
+   'WEBP': ('webp', 'image/webp')
+}
+image_format=(os.environ.get('IMAGE_FORMAT') or 'JPEG').upper()
+image_quality=int(os.environ.get('IMAGE_QUALITY') or 85)
+
 @dataclass
 class ImageAttributes:
    product_id: str
@@ -26,13 +38,13 @@ class ImageAttributes:
       # f"{image_folder}/{product_id}/{image_type}.jpg"
       components=key.split('/')
       file_name=components[-1]
-      product_id=file_name.split('.')[-2]
-      type=file_name.split('.')[-1]
-      return ImageAttributes(product_id=product_id, type=type)   
+      product_id=components[-2]
+      type=file_name.split('.')[0]
+      return ImageAttributes(product_id=product_id, type=type)
 
 
 def update_products_table(product_id, image_type, sizes):
-   table=boto3.resource('dynamodb').Table("Products")
+   table=clients.dynamodb().Table("Products")
    item_key = {
       'id': product_id
    }
@@ -58,32 +70,54 @@ def update_products_table(product_id, image_type, sizes):
       ReturnValues="UPDATED_NEW"
    )
 
+def resize_all(image_content, sizes):
+   """Decodes the image once and yields (size, image) from the largest size down.
+
+   draft() lets the JPEG decoder scale down while decoding, and every size
+   is resized from the previous (larger) one instead of from the original.
+   """
+   sizes=sorted(sizes, key=lambda size: size.width*size.height, reverse=True)
+   with Image.open(BytesIO(image_content)) as img:
+      img.draft('RGB', (sizes[0].width, sizes[0].height))
+      current=img.convert('RGB')
+   for size in sizes:
+      current=current.resize((size.width, size.height), Image.Resampling.LANCZOS, reducing_gap=3.0)
+      yield size, current
+
+def encode(img):
+   output=BytesIO()
+   img.save(output, format=image_format, quality=image_quality)
+   return output.getvalue()
+
 images_folder=os.environ.get('IMAGES_FOLDER') or 'product_images'
 def process_image(bucket_name,key, product_id, type, output_folder,sizes):
-   s3_client = boto3.client('s3')
+   s3_client = clients.s3()
    # Download the image from S3
    response = s3_client.get_object(Bucket=bucket_name, Key=key)
    image_content = response['Body'].read()
-   for size in sizes:
-      with PIL.Image.open(BytesIO(image_content)) as img:
-         # Resize the image
-         resized_img = img.resize((size.width, size.height))
-         # Save the resized image back to S3
-         output_key = f"{output_folder}/{product_id}/{type}/{size.name}.jpg"
-         s3_client.put_object(Bucket=bucket_name, Key=output_key, Body=resized_img.tobytes())
-      
+   extension, content_type = image_formats[image_format]
+   uploads=[]
+   with ThreadPoolExecutor(max_workers=len(sizes)) as executor:
+      for size, resized_img in resize_all(image_content, sizes):
+         # Save the resized image back to S3, uploads run while the next size is resized
+         output_key = f"{output_folder}/{product_id}/{type}/{size.name}.{extension}"
+         uploads.append(executor.submit(s3_client.put_object, Bucket=bucket_name, Key=output_key, Body=encode(resized_img), ContentType=content_type))
+      for upload in uploads:
+         upload.result()
+
+@log.buffered
 def handler(event, context):
    # Process each S3 event record
    for record in event['Records']:
       bucket_name = record['s3']['bucket']['name']
       object_key = record['s3']['object']['key']
       attrs=ImageAttributes.from_key(object_key)
-      
+
       try:
-         process_image(bucket_name, object_key, images_folder, attrs.product_id, attrs.type,sizes)         
-         
-         print(f"Processed image metadata for product {attrs.product_id}")
-            
+         process_image(bucket_name, object_key, attrs.product_id, attrs.type, images_folder, sizes)
+
+         log.info("Processed image metadata for product %s", attrs.product_id)
+
       except Exception as e:
-            print(f"Error processing {object_key}: {e}")
-    
+            log.error("Error processing %s: %s", object_key, e)
+
@@ -1,74 +1,279 @@
-import boto3
-import boto3.dynamodb.conditions
 import uuid
+import base64
 from decimal import Decimal
-import redis
 import json
 import os
-import urllib.request
+import math
+import random
+import time
+import local_cache
+import json_encoder
+import clients
+import metrics
+import log
+from response_utils import compute_etag
 
 table_name=os.environ.get('PRODUCTS_TABLE_NAME') or 'Products'
-table=boto3.resource('dynamodb').Table(table_name)
-
-def decimal_serializer(obj):
-    """Handle Decimal objects in JSON serialization"""
-    if isinstance(obj, Decimal):
-        return float(obj)
-    raise TypeError(f"Object of type {type(obj)} is not JSON serializable")
+table=None
 
+def get_table():
+   """The products table, created with the DynamoDB client when the module is imported"""
+   global table
+   if table is None:
+      table=clients.dynamodb().Table(table_name)
+   return table
 
 cluster_url = os.environ['CACHE_CLUSTER_URL']
-print(f"Cluster URL: {cluster_url}")
-
-# Initialize Redis/Valkey connection (Redis-compatible)
-if cluster_url:
-   cache_client = redis.Redis(
-      host=cluster_url,
-      port=6379,
-      decode_responses=True,
-      ssl=True,
-      socket_connect_timeout=5,
-      socket_timeout=5
-   )
+log.info("Cluster URL: %s", cluster_url)
+# the handlers importing this module call DynamoDB or Valkey on every request
+clients.warm('dynamodb', 'cache')
+get_table()
+
+# L1 cache in front of Valkey, shared by all invocations in this container
+product_cache=local_cache.from_environment()
 
 # same as get_product from core_api
 def get_product_from_dynamodb(product_id):
-   return table.get_item(Key={'id': product_id}).get('Item')
+   with metrics.timer('DynamoDB'):
+      return get_table().get_item(Key={'id': product_id}).get('Item')
+
+cache_ttl=3600 # seconds
+refill_lock_ttl=5000 # milliseconds
+refill_wait=0.05 # seconds between checks while another caller refills
+refill_attempts=10
+xfetch_beta=1.0
+# how long the last DynamoDB refill took, used to decide early refreshes
+refill_duration=0.05
+
+def should_refresh_early(ttl_remaining_ms):
+   """Probabilistic early expiration (XFetch).
+
+   Refreshes a key before it expires with a probability that grows as the
+   expiry approaches, so a hot key is normally reloaded by a single caller.
+   """
+   if ttl_remaining_ms is None or ttl_remaining_ms < 0:
+      return False
+   return -refill_duration * xfetch_beta * math.log(1.0 - random.random()) * 1000 >= ttl_remaining_ms
+
+def acquire_refill_lock(cache_key):
+   token=str(uuid.uuid4())
+   with metrics.timer('Valkey'):
+      locked=clients.cache().set(f"lock:{cache_key}", token, nx=True, px=refill_lock_ttl)
+   if locked:
+      return token
+   return None
+
+def release_refill_lock(cache_key, token):
+   lock_key=f"lock:{cache_key}"
+   # only the owner releases; an expired lock may already belong to someone else
+   cache_client=clients.cache()
+   with metrics.timer('Valkey'):
+      if cache_client.get(lock_key)==token:
+         cache_client.delete(lock_key)
+
+def cache_product(cache, cache_key, product_str):
+   """Stores the product and the ETag of its response body; cache can be a pipeline"""
+   cache.setex(cache_key, cache_ttl, product_str)
+   cache.setex(f"etag:{cache_key}", cache_ttl, compute_etag(product_str))
+
+def product_version(product):
+   return float(product.get('version') or 0)
+
+def cache_products(products):
+   """Caches products (a dict of cache key -> product) unless the cache has a newer version.
+
+   Writers race each other (updates, the price stream, refills that read an
+   older copy), so the cached versions are checked in a WATCH/MULTI
+   transaction, which is retried when one of the keys changes in between.
+   Returns a dict of cache key -> JSON text of the products written.
+   """
+   if not products:
+      return {}
+   cache_keys=list(products)
+   written={}
+   def write(pipeline):
+      written.clear()
+      cached_products=pipeline.mget(cache_keys)
+      pipeline.multi()
+      for cache_key, cached_product in zip(cache_keys, cached_products):
+         product=products[cache_key]
+         if cached_product and product_version(json.loads(cached_product)) > product_version(product):
+            continue # somebody cached a newer version
+         written[cache_key]=json_encoder.dumps(product)
+         cache_product(pipeline, cache_key, written[cache_key])
+   with metrics.timer('Valkey'):
+      clients.cache().transaction(write, *cache_keys)
+   return written
+
+def get_product_etag(product_id):
+   """ETag of GET /products/{id} if the product is cached, None otherwise"""
+   if not cluster_url:
+      return None
+   try:
+      with metrics.timer('Valkey'):
+         return clients.cache().get(f"etag:product:{product_id}")
+   except BaseException as e:
+      log.warning("Valkey error: %s", e)
+      return None
+
+def refill_product(product_id, cache_key):
+   global refill_duration
+   started=time.monotonic()
+   product = get_product_from_dynamodb(product_id)
+   refill_duration=time.monotonic()-started
+   log.debug("Got from DynamoDB", product=product)
+   if product:
+      # Store in cache with 1 hour TTL
+      product_str=cache_products({cache_key: product}).get(cache_key)
+      if product_str:
+         product_cache.set(cache_key, product, len(product_str))
+         log.debug("Stored %s", product_id)
+   return product
+
+def wait_for_refill(cache_key):
+   """The product cached by the caller holding the refill lock, or None.
+
+   Stops waiting as soon as the lock is released without a cached product
+   (the product does not exist), so missing products do not wait the
+   refill_attempts checks.
+   """
+   for _ in range(refill_attempts):
+      time.sleep(refill_wait)
+      with metrics.timer('Valkey'):
+         pipeline = clients.cache().pipeline(transaction=False)
+         pipeline.get(cache_key)
+         pipeline.exists(f"lock:{cache_key}")
+         cached_product, locked = pipeline.execute()
+      if cached_product or not locked:
+         return cached_product
+   return None
 
 # checks the cache first
 def get_product(product_id):
    if not cluster_url:
       return get_product_from_dynamodb(product_id)
    cache_key = f"product:{product_id}"
+   product = product_cache.get(cache_key)
+   if product is not None:
+      metrics.count('LocalCacheHit')
+      return product
    try:
-      # Try cache first
-      cached_product = cache_client.get(cache_key)
-      print(f"{cached_product=}")
+      # Try cache first, fetching the remaining TTL in the same round trip
+      with metrics.timer('Valkey'):
+         pipeline = clients.cache().pipeline(transaction=False)
+         pipeline.get(cache_key)
+         pipeline.pttl(cache_key)
+         cached_product, ttl_remaining = pipeline.execute()
       if cached_product:
-         print(f"Cache hit for product {product_id}")
-         return json.loads(cached_product)
-            
-      # Cache miss - get from DynamoDB
-      print(f"Cache miss for product {product_id}. Trying to get from dynamo")
-      product = get_product_from_dynamodb(product_id)
-      print(f"Got from dynamodb {product}")
-      
-      if product:
-         product_str=json.dumps(product,default=decimal_serializer)
-         print(f"{product_str=}")
-         # Store in cache with 1 hour TTL
-         cache_client.setex(cache_key, 3600, product_str)
-         print(f"Stored {product_id}")
-      
-      return product
-      
+         metrics.count('CacheHit')
+         if should_refresh_early(ttl_remaining):
+            token=acquire_refill_lock(cache_key)
+            if token:
+               # refresh ahead of expiry; everybody else keeps the current value
+               try:
+                  return refill_product(product_id, cache_key)
+               finally:
+                  release_refill_lock(cache_key, token)
+         product = json.loads(cached_product)
+         product_cache.set(cache_key, product, len(cached_product))
+         return product
+
+      # Cache miss - only one caller reloads from DynamoDB
+      metrics.count('CacheMiss')
+      token=acquire_refill_lock(cache_key)
+      if token:
+         try:
+            return refill_product(product_id, cache_key)
+         finally:
+            release_refill_lock(cache_key, token)
+
+      cached_product = wait_for_refill(cache_key)
+      if cached_product:
+         product = json.loads(cached_product)
+         product_cache.set(cache_key, product, len(cached_product))
+         return product
+      # the refill did not finish in time (or the product does not exist)
+      return get_product_from_dynamodb(product_id)
+
    except BaseException as e:
-      print(f"Valkey error: {e}")
+      log.warning("Valkey error: %s", e)
       # Fallback to database if cache fails
       return get_product_from_dynamodb(product_id)
 
 
-def upsert_product_dynamo(product_id, fields):
+batch_get_size=100 # BatchGetItem limit
+batch_get_attempts=5
+
+# same as get_products from core_api
+def get_products_from_dynamodb(product_ids):
+   found={}
+   for start in range(0, len(product_ids), batch_get_size):
+      keys=[{'id': product_id} for product_id in product_ids[start:start+batch_get_size]]
+      request_items={table_name: {'Keys': keys}}
+      for attempt in range(batch_get_attempts):
+         with metrics.timer('DynamoDB'):
+            response=clients.dynamodb().batch_get_item(RequestItems=request_items)
+         for item in response.get('Responses', {}).get(table_name, []):
+            found[item['id']]=item
+         request_items=response.get('UnprocessedKeys')
+         if not request_items:
+            break
+         time.sleep(0.05 * 2**attempt)
+      else:
+         raise RuntimeError(f"Could not get {len(request_items[table_name]['Keys'])} products after {batch_get_attempts} attempts")
+   return found
+
+def get_products(product_ids):
+   """Gets many products at once.
+
+   Looks in the local cache, then resolves the rest with a single MGET, loads
+   the misses with BatchGetItem and writes them back in one pipelined round
+   trip. Missing products are left out; the rest keep the requested order.
+   """
+   product_ids=list(dict.fromkeys(product_ids)) # no duplicates, keeps the order
+   if not cluster_url:
+      found=get_products_from_dynamodb(product_ids)
+      return [found[product_id] for product_id in product_ids if product_id in found]
+
+   found={}
+   for product_id in product_ids:
+      product=product_cache.get(f"product:{product_id}")
+      if product is not None:
+         found[product_id]=product
+   remaining=[product_id for product_id in product_ids if product_id not in found]
+   metrics.count('LocalCacheHit', len(found))
+   try:
+      if remaining:
+         cache_keys=[f"product:{product_id}" for product_id in remaining]
+         with metrics.timer('Valkey'):
+            cached_products=clients.cache().mget(cache_keys)
+         for product_id, cache_key, cached_product in zip(remaining, cache_keys, cached_products):
+            if cached_product:
+               product=json.loads(cached_product)
+               product_cache.set(cache_key, product, len(cached_product))
+               found[product_id]=product
+         misses=[product_id for product_id in remaining if product_id not in found]
+         metrics.count('CacheHit', len(remaining)-len(misses))
+         if misses:
+            metrics.count('CacheMiss', len(misses))
+            loaded=get_products_from_dynamodb(misses)
+            written=cache_products({f"product:{product_id}": product for product_id, product in loaded.items()})
+            for product_id, product in loaded.items():
+               product_str=written.get(f"product:{product_id}")
+               if product_str:
+                  product_cache.set(f"product:{product_id}", product, len(product_str))
+            found.update(loaded)
+   except BaseException as e:
+      log.warning("Valkey error: %s", e)
+      # Fallback to database if cache fails
+      found.update(get_products_from_dynamodb([product_id for product_id in remaining if product_id not in found]))
+   return [found[product_id] for product_id in product_ids if product_id in found]
+
+
+class VersionConflict(Exception):
+   """The product changed since the expected version was read"""
+
+def upsert_product_dynamo(product_id, fields, expected_version=None):
    category=fields.get('category') or []
    title=fields.get('title') or ''
    description=fields.get('description') or ''
@@ -78,54 +283,112 @@ def upsert_product_dynamo(product_id, fields):
       SET category = :category,
       title = :title,
       description = :description,
-      price = :price
+      price = :price,
+      version = if_not_exists(version, :zero) + :one
    """
    expression_attribute_values = {
       ':category': category,
       ':title': title,
       ':description': description,
-      ':price': price
+      ':price': price,
+      ':zero': 0,
+      ':one': 1
    }
-   inserted=table.update_item(
-      Key={'id': product_id},
-      UpdateExpression=update_expression,
-      ExpressionAttributeValues=expression_attribute_values,
-      ReturnValues="ALL_NEW"
-   )
+   conditions={}
+   if expected_version is not None:
+      # only if nobody changed the product since expected_version was read
+      if expected_version:
+         conditions['ConditionExpression']='version = :expected_version'
+         expression_attribute_values[':expected_version']=expected_version
+      else:
+         conditions['ConditionExpression']='attribute_exists(id) AND attribute_not_exists(version)'
+   try:
+      with metrics.timer('DynamoDB'):
+         inserted=get_table().update_item(
+            Key={'id': product_id},
+            UpdateExpression=update_expression,
+            ExpressionAttributeValues=expression_attribute_values,
+            ReturnValues="ALL_NEW",
+            **conditions
+         )
+   except get_table().meta.client.exceptions.ConditionalCheckFailedException:
+      raise VersionConflict(f"Product {product_id} is not at version {expected_version}")
    return inserted['Attributes']
 
 def update_price_dynamo(product_id, price):
    update_expression = """
       SET 
-      price = :price
+      price = :price,
+      version = if_not_exists(version, :zero) + :one
    """
    expression_attribute_values = {
-      ':price': price
+      ':price': price,
+      ':zero': 0,
+      ':one': 1
    }
-   inserted=table.update_item(
-      Key={'id': product_id},
-      UpdateExpression=update_expression,
-      ExpressionAttributeValues=expression_attribute_values,
-      ReturnValues="ALL_NEW"
-   )
+   with metrics.timer('DynamoDB'):
+      # update_prices calls this from its threads: boto3 resources are not thread
+      # safe, their low-level client is (and still converts the Python values)
+      inserted=clients.dynamodb().meta.client.update_item(
+         TableName=table_name,
+         Key={'id': product_id},
+         UpdateExpression=update_expression,
+         ExpressionAttributeValues=expression_attribute_values,
+         ReturnValues="ALL_NEW"
+      )
    return inserted['Attributes']
 
 def update_price(product_id,price):
    upserted=update_price_dynamo(product_id,price)
    if cluster_url:
       cache_key = f"product:{product_id}"
-      cache_client.setex(cache_key, 3600, json.dumps(upserted, default=decimal_serializer))
+      product_cache.invalidate(cache_key)
+      cache_products({cache_key: upserted})
    return upserted
 
-def upsert_product(product_id, fields):
+price_update_concurrency=int(os.environ.get('PRICE_UPDATE_CONCURRENCY') or 10)
+executor=None
+
+def get_executor():
+   """Threads for the concurrent price updates, kept for the life of the container"""
+   global executor
+   if executor is None:
+      from concurrent.futures import ThreadPoolExecutor
+      executor=ThreadPoolExecutor(max_workers=price_update_concurrency, thread_name_prefix='products_db')
+   return executor
+
+def update_prices(prices):
+   """Applies many price updates at once.
+
+   prices maps product id to price. The DynamoDB updates run with bounded
+   concurrency and the cache is refreshed in a single pipelined round trip.
+   Returns a dict mapping product id to the updated item, or to the
+   exception raised while updating it.
+   """
+   results={}
+   futures={product_id: get_executor().submit(update_price_dynamo, product_id, price) for product_id, price in prices.items()}
+   for product_id, future in futures.items():
+      try:
+         results[product_id]=future.result()
+      except Exception as e:
+         results[product_id]=e
+   updated={product_id: item for product_id, item in results.items() if not isinstance(item, Exception)}
+   if cluster_url and updated:
+      for product_id in updated:
+         product_cache.invalidate(f"product:{product_id}")
+      cache_products({f"product:{product_id}": item for product_id, item in updated.items()})
+   return results
+
+def upsert_product(product_id, fields, expected_version=None):
    if not cluster_url:
-      return upsert_product_dynamo(product_id,fields)
+      return upsert_product_dynamo(product_id,fields,expected_version)
 
    cache_key = f"product:{product_id}"
-   print(f"Upserting product {product_id=}")   
+   log.debug("Upserting product %s", product_id)
    upserted=None
-   upserted=upsert_product_dynamo(product_id,fields)
-   cache_client.setex(cache_key, 3600, json.dumps(upserted, default=decimal_serializer))
+   upserted=upsert_product_dynamo(product_id,fields,expected_version)
+   product_cache.invalidate(cache_key)
+   cache_products({cache_key: upserted})
    return upserted 
   
 def insert_product(item):
@@ -133,14 +396,133 @@ def insert_product(item):
 
 def delete_product(product_id):
    if cluster_url:
-      cache_client.delete(f"product:{product_id}") # no need for checking
-   return table.delete_item(Key={'id': product_id}).get('Item')
+      product_cache.invalidate(f"product:{product_id}")
+      with metrics.timer('Valkey'):
+         clients.cache().delete(f"product:{product_id}", f"etag:product:{product_id}") # no need for checking
+   with metrics.timer('DynamoDB'):
+      return get_table().delete_item(Key={'id': product_id}).get('Item')
+
+def update_product(product_id, item, expected_version=None):
+   return upsert_product(product_id, item, expected_version)
+
+def iterate_pages(operation, **kwargs):
+   """Yields (items, last_evaluated_key) for every page of a scan or query.
+
+   DynamoDB returns at most 1 MB per call, so this keeps following
+   LastEvaluatedKey instead of silently stopping after the first page.
+   """
+   while True:
+      with metrics.timer('DynamoDB'):
+         response=operation(**kwargs)
+      last_evaluated_key=response.get('LastEvaluatedKey')
+      yield response.get('Items', []), last_evaluated_key
+      if not last_evaluated_key:
+         return
+      kwargs['ExclusiveStartKey']=last_evaluated_key
+
+def scan_pages(**kwargs):
+   return iterate_pages(get_table().scan, **kwargs)
+
+def category_pages(category, **kwargs):
+   from boto3.dynamodb.conditions import Key
+   return iterate_pages(get_table().query, IndexName='category-index', KeyConditionExpression=Key('category').eq(category), **kwargs)
+
+def iterate_products(pages):
+   for items, _ in pages:
+      yield from items
+
+def encode_page_token(last_evaluated_key):
+   if not last_evaluated_key:
+      return None
+   return base64.urlsafe_b64encode(json.dumps(last_evaluated_key, default=str).encode('utf-8')).decode('ascii')
+
+def decode_page_token(token):
+   try:
+      key=json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+   except ValueError:
+      raise ValueError('Invalid next token')
+   if not isinstance(key, dict):
+      raise ValueError('Invalid next token')
+   return key
+
+def get_products_page(category=None, limit=None, next_token=None):
+   """Returns one page of products and the token for the next one (None on the last page)"""
+   kwargs={}
+   if limit:
+      kwargs['Limit']=limit
+   if next_token:
+      kwargs['ExclusiveStartKey']=decode_page_token(next_token)
+   pages=category_pages(category, **kwargs) if category else scan_pages(**kwargs)
+   items, last_evaluated_key=next(pages)
+   return items, encode_page_token(last_evaluated_key)
 
-def update_product(product_id, item):
-   return upsert_product(product_id, item)
+scan_segments=int(os.environ.get('SCAN_SEGMENTS') or 4)
+# most segments an export reads at the same time, one thread each
+max_segments=int(os.environ.get('MAX_SCAN_SEGMENTS') or 16)
+# products per export page, a Lambda response holds at most 6 MB
+export_limit=int(os.environ.get('EXPORT_LIMIT') or 1000)
+scan_executor=None
+
+def get_scan_executor():
+   """Threads of the export segments, created on first use and kept for the life of the container"""
+   global scan_executor
+   if scan_executor is None:
+      from concurrent.futures import ThreadPoolExecutor
+      scan_executor=ThreadPoolExecutor(max_workers=max_segments, thread_name_prefix='scan')
+   return scan_executor
+
+def encode_export_token(total_segments, start_keys):
+   if not start_keys:
+      return None
+   return encode_page_token({'segments': total_segments, 'keys': {str(segment): key for segment, key in start_keys.items()}})
+
+def decode_export_token(token):
+   """The number of segments and the key each unfinished segment starts after"""
+   key=decode_page_token(token)
+   try:
+      total_segments=int(key['segments'])
+      start_keys={int(segment): start_key for segment, start_key in key['keys'].items()}
+   except (KeyError, TypeError, ValueError, AttributeError):
+      raise ValueError('Invalid next token')
+   if not 0 < total_segments <= max_segments or not start_keys or not all(0 <= segment < total_segments and isinstance(start_key, dict) for segment, start_key in start_keys.items()):
+      raise ValueError('Invalid next token')
+   return total_segments, start_keys
+
+def scan_segment(segment, total_segments, limit, start_key=None):
+   """One page of a segment, with the low-level client: unlike the table it is thread safe"""
+   kwargs={'ExclusiveStartKey': start_key} if start_key else {}
+   with metrics.timer('DynamoDB'):
+      response=clients.dynamodb().meta.client.scan(TableName=table_name, Segment=segment, TotalSegments=total_segments, Limit=limit, **kwargs)
+   return response.get('Items', []), response.get('LastEvaluatedKey')
+
+def export_page(total_segments=None, limit=None, next_token=None):
+   """One page of the whole table, read with parallel Segment/TotalSegments scans.
+
+   Every unfinished segment reads its share of limit products at the same
+   time, so a page has at most limit products (or one per segment when
+   limit is smaller), in no particular order. The token of the next page (None after the last one) keeps the
+   number of segments and where each of them stopped.
+   """
+   if next_token:
+      total_segments, start_keys=decode_export_token(next_token)
+   else:
+      total_segments=total_segments or scan_segments
+      start_keys=dict.fromkeys(range(total_segments))
+   segment_limit=max(1, (limit or export_limit)//len(start_keys))
+   futures={segment: get_scan_executor().submit(scan_segment, segment, total_segments, segment_limit, start_key) for segment, start_key in start_keys.items()}
+   items=[]
+   next_keys={}
+   for segment, future in futures.items():
+      segment_items, last_evaluated_key=future.result()
+      items.extend(segment_items)
+      if last_evaluated_key:
+         next_keys[segment]=last_evaluated_key
+   return items, encode_export_token(total_segments, next_keys)
 
-def get_all_products():
-   return table.scan()['Items']
+def get_all_products(limit=None):
+   """The first page of products, at most limit and 1 MB of items; get_products_page reads the next ones"""
+   return get_products_page(None, limit)[0]
 
-def get_products_by_category(category):
-   return table.query(IndexName='category-index', KeyConditionExpression=boto3.dynamodb.conditions.Key('category').eq(category)).get('Items') 
+def get_products_by_category(category, limit=None):
+   """The first page of products of the category, like get_all_products"""
+   return get_products_page(category, limit)[0]
@@ -1,5 +1,14 @@
-import json
-from decimal import Decimal
+import base64
+import gzip
+import hashlib
+import os
+from json_encoder import dumps, decimal_serializer
+import metrics
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
 access_control_headers= {
     'Access-Control-Allow-Origin': '*', 
@@ -8,6 +17,15 @@ access_control_headers= {
 }
 headers={**access_control_headers, 'Content-Type': 'application/json'}
 options_headers={**access_control_headers, 'Access-Control-Max-Age': '86400'}
+ndjson_headers={**access_control_headers, 'Content-Type': 'application/x-ndjson', 'Access-Control-Expose-Headers': 'X-Next-Token'}
+# clients keep the body and revalidate it with If-None-Match
+cache_control=os.environ.get('CACHE_CONTROL') or 'no-cache'
+# smaller bodies are not worth compressing
+compression_threshold=int(os.environ.get('COMPRESSION_THRESHOLD') or 1024)
+# Content-Encoding -> function compressing bytes, in order of preference
+compressors={'gzip': lambda data: gzip.compress(data, compresslevel=6)}
+if brotli:
+    compressors={'br': lambda data: brotli.compress(data, quality=5), **compressors}
 def create_options_response():
     """Create standardized response for OPTIONS requests"""
     return {
@@ -15,14 +33,152 @@ def create_options_response():
         'headers': options_headers
     }
 
-def create_success_response(status_code, data):
-    """Create standardized success response for API Gateway"""
+def create_success_response(status_code, data, event=None):
+    """Create standardized success response for API Gateway
+
+    With the request event, the response gets an ETag and becomes a 304
+    without body when the client already has this version (If-None-Match).
+    """
+    with metrics.timer('Serialization'):
+        body=dumps(data)
+    if event is not None:
+        return create_conditional_response(event, body, status_code=status_code)
     return {
         'statusCode': status_code,
         'headers': headers,
-        'body': json.dumps(data, default=decimal_serializer)
+        'body': body
     }
 
+def compute_etag(body):
+    """Strong ETag from the response body"""
+    return '"'+hashlib.blake2b(body.encode('utf-8'), digest_size=16).hexdigest()+'"'
+
+def get_header(event, name):
+    """Header from the API Gateway event, header names are case insensitive"""
+    name=name.lower()
+    for key, value in (event.get('headers') or {}).items():
+        if key.lower()==name:
+            return value
+    return None
+
+def etag_matches(event, etag):
+    """True if the If-None-Match header of the request has etag"""
+    if_none_match=get_header(event, 'If-None-Match')
+    if not if_none_match:
+        return False
+    if if_none_match.strip()=='*':
+        return True
+    # If-None-Match uses the weak comparison
+    etag=etag.removeprefix('W/')
+    return any(tag.strip().removeprefix('W/')==etag for tag in if_none_match.split(','))
+
+def if_match_allows(event, etag):
+    """False when the request has an If-Match header and etag is not in it.
+
+    Compressed responses carry the weak form of the same ETag, so W/ is ignored.
+    """
+    if_match=get_header(event, 'If-Match')
+    if not if_match or if_match.strip()=='*':
+        return True
+    etag=etag.removeprefix('W/')
+    return any(tag.strip().removeprefix('W/')==etag for tag in if_match.split(','))
+
+def create_not_modified_response(etag):
+    """Create 304 response, without body"""
+    return {
+        'statusCode': 304,
+        'headers': {**access_control_headers, 'ETag': etag, 'Cache-Control': cache_control}
+    }
+
+def create_conditional_response(event, body, etag=None, status_code=200):
+    """Create response with ETag from a JSON body, or 304 when If-None-Match has the ETag
+
+    Only a 200 becomes a 304, other statuses (a 201 from an insert) are kept.
+    """
+    etag=etag or compute_etag(body)
+    if status_code==200 and etag_matches(event, etag):
+        return create_not_modified_response(etag)
+    return compress_response(event, {
+        'statusCode': status_code,
+        'headers': {**headers, 'ETag': etag, 'Cache-Control': cache_control},
+        'body': body
+    })
+
+def choose_encoding(accept_encoding):
+    """The preferred encoding we support in an Accept-Encoding header, None for no compression"""
+    weights={}
+    for coding in (accept_encoding or '').split(','):
+        name, _, parameters=coding.partition(';')
+        name=name.strip().lower()
+        weight=1.0
+        parameters=parameters.strip().replace(' ', '')
+        if parameters.startswith('q='):
+            try:
+                weight=float(parameters[2:])
+            except ValueError:
+                continue
+        if name=='*':
+            for supported in compressors:
+                weights.setdefault(supported, weight)
+        elif name in compressors:
+            weights[name]=weight
+    candidates=[name for name in compressors if weights.get(name, 0) > 0]
+    return max(candidates, key=lambda name: weights[name]) if candidates else None
+
+def compress_response(event, response):
+    """Compresses the body with the best encoding the client accepts.
+
+    The compressed body is base64 encoded (isBase64Encoded), API Gateway
+    sends it as binary. Bodies under compression_threshold are left alone.
+    """
+    body=response.get('body')
+    if not body or len(body) < compression_threshold:
+        return response
+    response_headers={**response['headers'], 'Vary': 'Accept-Encoding'}
+    encoding=choose_encoding(get_header(event, 'Accept-Encoding'))
+    if not encoding:
+        return {**response, 'headers': response_headers}
+    response_headers['Content-Encoding']=encoding
+    if 'ETag' in response_headers:
+        # same content, different bytes
+        response_headers['ETag']='W/'+response_headers['ETag'].removeprefix('W/')
+    with metrics.timer('Compression'):
+        compressed=base64.b64encode(compressors[encoding](body.encode('utf-8'))).decode('ascii')
+    return {
+        **response,
+        'headers': response_headers,
+        'body': compressed,
+        'isBase64Encoded': True
+    }
+
+def get_request_body(event):
+    """Request body as text, API Gateway base64 encodes it for binary media types"""
+    body=event.get('body') or ''
+    if event.get('isBase64Encoded'):
+        body=base64.b64decode(body).decode('utf-8')
+    return body
+
+def create_ndjson_response(status_code, items, event=None, next_token=None):
+    """Create response with one JSON document per line (NDJSON) for a page of items
+
+    The whole body is in the response, so items must be a bounded page. The
+    X-Next-Token header has the token of the next page, if any.
+    """
+    with metrics.timer('Serialization'):
+        body=''.join([dumps(item)+'\n' for item in items])
+    response={
+        'statusCode': status_code,
+        'headers': {**ndjson_headers, 'X-Next-Token': next_token} if next_token else ndjson_headers,
+        'body': body
+    }
+    return compress_response(event, response) if event is not None else response
+
+def add_next_token(response, next_token):
+    """Adds the X-Next-Token header with the token of the next page, if there is one"""
+    if not next_token:
+        return response
+    return {**response, 'headers': {**response['headers'], 'X-Next-Token': next_token, 'Access-Control-Expose-Headers': 'X-Next-Token'}}
+
 def create_error_response(status_code, message):
     """Create standardized error response for API Gateway"""
     return {
@@ -30,9 +186,3 @@ def create_error_response(status_code, message):
         'headers': headers,
         'body': message
     }
-
-def decimal_serializer(obj):
-    """Handle Decimal objects in JSON serialization"""
-    if isinstance(obj, Decimal):
-        return float(obj)
-    raise TypeError(f"Object of type {type(obj)} is not JSON serializable")
\ No newline at end of file
@@ -1,12 +1,13 @@
-import boto3
+import clients
+from response_utils import get_request_body
 import json
 import os
 def update_product_images(event, context):
-    dynamodb = boto3.resource('dynamodb')
+    dynamodb = clients.dynamodb()
     table = dynamodb.Table('Products')
     
     product_id = event['pathParameters']['id']
-    body = json.loads(event.get('body', '{}'))
+    body = json.loads(get_request_body(event) or '{}')
     image_key = body['image_key'] 
     
     # Construct the public URL for the image
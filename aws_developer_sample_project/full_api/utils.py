@@ -1,5 +1,4 @@
-import json
-from decimal import Decimal
+from json_encoder import dumps, decimal_serializer
 
 def create_options_response():
     """Create standardized response for OPTIONS requests"""
@@ -23,7 +22,7 @@ def create_success_response(status_code, data):
             'Access-Control-Allow-Methods': 'GET, POST, PUT, DELETE, OPTIONS',
             'Access-Control-Allow-Headers': 'Content-Type, Authorization'
         },
-        'body': json.dumps(data, default=decimal_serializer)
+        'body': dumps(data)
     }
 
 def create_error_response(status_code, message):
@@ -36,9 +35,3 @@ def create_error_response(status_code, message):
         },
         'body': message
     }
-
-def decimal_serializer(obj):
-    """Handle Decimal objects in JSON serialization"""
-    if isinstance(obj, Decimal):
-        return float(obj)
-    raise TypeError(f"Object of type {type(obj)} is not JSON serializable")
\ No newline at end of file
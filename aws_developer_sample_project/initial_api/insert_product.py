@@ -12,8 +12,10 @@ def handler(event, context):
          return create_error_response(400, 'Product id is not allowed')
       id=str(uuid.uuid4())
       item['id'] = id
-      products_db.insert_product(item)
-      return create_success_response(201, item)
+      inserted=products_db.insert_product(item)
+      return create_success_response(201, inserted)
+   except products_db.InvalidProduct as e:
+      return create_error_response(400, str(e))
    except Exception as e:
       print(f"Unexpected error: {str(e)}")
       return create_error_response(500, f'Internal server error - {str(e)}')
@@ -1,5 +1,21 @@
+"""In-memory product catalog, the store of the initial API.
+
+Products are kept in a primary dict by id, with secondary indexes by
+category and by price bucket that every write keeps up to date, so
+category and price range lookups do not go through the whole catalog.
+The catalog can be saved to and loaded from a JSON snapshot file; set
+PRODUCT_CATALOG_SNAPSHOT to load one when the module is imported.
+
+Prices are kept as Decimal and categories as str, whatever the request
+sent (the UI sends prices as strings and "" for missing fields); values
+that do not convert raise InvalidProduct.
+"""
+import bisect
+import json
+import os
+import threading
 import uuid
-from decimal import Decimal
+from decimal import Decimal, InvalidOperation
 
 PRODUCT_CATALOG = {
     "prod_001": {
@@ -18,20 +34,183 @@ PRODUCT_CATALOG = {
     }
 }
 
+class InvalidProduct(ValueError):
+   """A field of the product has a value that can not be stored"""
+
+def to_price(value):
+   """The price as a Decimal, None when missing"""
+   if value is None or value=='':
+      return None
+   if isinstance(value, bool) or not isinstance(value, (str, int, float, Decimal)):
+      raise InvalidProduct(f"price must be a number, not {value!r}")
+   try:
+      price=Decimal(str(value).strip())
+   except InvalidOperation:
+      raise InvalidProduct(f"price must be a number, not {value!r}")
+   if not price.is_finite():
+      raise InvalidProduct(f"price must be a number, not {value!r}")
+   return price
+
+def to_category(value):
+   """The category as a str, None when missing"""
+   if value is None or value=='':
+      return None
+   if isinstance(value, bool) or not isinstance(value, (str, int, float, Decimal)):
+      raise InvalidProduct(f"category must be a string, not {value!r}")
+   return str(value)
+
+class Product:
+   """One product; the usual fields in slots, any others in extra"""
+   __slots__=('id', 'title', 'price', 'category', 'in_stock', 'extra')
+   fields=('id', 'title', 'price', 'category', 'in_stock')
+
+   def __init__(self, item):
+      for field in self.fields:
+         setattr(self, field, item.get(field))
+      self.price=to_price(self.price)
+      self.category=to_category(self.category)
+      self.extra={name: value for name, value in item.items() if name not in self.fields} or None
+
+   def to_dict(self):
+      item={field: getattr(self, field) for field in self.fields if getattr(self, field) is not None}
+      if self.extra:
+         item.update(self.extra)
+      return item
+
+class Catalog:
+   """Products by id, with indexes by category and price bucket"""
+   def __init__(self, items=(), price_bucket_size=10):
+      self.price_bucket_size=price_bucket_size
+      self.products={}
+      # category -> {id: None}, a dict keeps the insertion order
+      self.by_category={}
+      # price // price_bucket_size -> {id: None}
+      self.by_price_bucket={}
+      # the keys of by_price_bucket in order, range lookups bisect it
+      self.price_buckets=[]
+      self.lock=threading.Lock()
+      for item in items:
+         self.put(item)
+
+   def price_bucket(self, price):
+      return int(Decimal(str(price)) // self.price_bucket_size)
+
+   def _index(self, product):
+      if product.category is not None:
+         self.by_category.setdefault(product.category, {})[product.id]=None
+      if product.price is not None:
+         bucket=self.price_bucket(product.price)
+         if bucket not in self.by_price_bucket:
+            self.by_price_bucket[bucket]={}
+            bisect.insort(self.price_buckets, bucket)
+         self.by_price_bucket[bucket][product.id]=None
+
+   def _unindex(self, product):
+      if product.category is not None:
+         self._remove_id(self.by_category, product.category, product.id)
+      if product.price is not None:
+         bucket=self.price_bucket(product.price)
+         if self._remove_id(self.by_price_bucket, bucket, product.id):
+            del self.price_buckets[bisect.bisect_left(self.price_buckets, bucket)]
+
+   def _remove_id(self, index, key, product_id):
+      """Removes the id from index[key], and the key once it has no ids; returns whether it did"""
+      ids=index.get(key, {})
+      ids.pop(product_id, None)
+      if not ids:
+         return index.pop(key, None) is not None
+      return False
+
+   def get(self, product_id):
+      product=self.products.get(product_id)
+      return product.to_dict() if product else None
+
+   def put(self, item):
+      """Inserts or replaces the product with the id of item"""
+      product=Product(item)
+      with self.lock:
+         previous=self.products.get(product.id)
+         if previous:
+            self._unindex(previous)
+         self.products[product.id]=product
+         self._index(product)
+      return product.to_dict()
+
+   def delete(self, product_id):
+      with self.lock:
+         product=self.products.pop(product_id, None)
+         if product:
+            self._unindex(product)
+      return product.to_dict() if product else None
+
+   def all(self):
+      return [product.to_dict() for product in list(self.products.values())]
+
+   def by_category_name(self, category):
+      ids=list(self.by_category.get(category, ()))
+      return [self.products[product_id].to_dict() for product_id in ids if product_id in self.products]
+
+   def by_price_range(self, min_price, max_price):
+      """Products with min_price <= price <= max_price, only the non-empty buckets in the range are looked at"""
+      min_price,max_price=to_price(min_price),to_price(max_price)
+      with self.lock:
+         start=bisect.bisect_left(self.price_buckets, self.price_bucket(min_price))
+         end=bisect.bisect_right(self.price_buckets, self.price_bucket(max_price))
+         buckets=self.price_buckets[start:end]
+      products=[]
+      for bucket in buckets:
+         for product_id in list(self.by_price_bucket.get(bucket, ())):
+            product=self.products.get(product_id)
+            if product and min_price <= product.price <= max_price:
+               products.append(product.to_dict())
+      return products
+
+   def save(self, path):
+      """Writes the catalog to a JSON file, replacing it atomically"""
+      temporary_path=f"{path}.tmp"
+      with open(temporary_path, 'w') as f:
+         json.dump(self.all(), f, default=str)
+      os.replace(temporary_path, path)
+
+   def load(self, path):
+      with open(path) as f:
+         items=json.load(f)
+      with self.lock:
+         self.products.clear()
+         self.by_category.clear()
+         self.by_price_bucket.clear()
+         self.price_buckets.clear()
+      for item in items:
+         self.put(item)
+
+catalog=Catalog(PRODUCT_CATALOG.values())
+snapshot_path=os.environ.get('PRODUCT_CATALOG_SNAPSHOT')
+if snapshot_path and os.path.exists(snapshot_path):
+   catalog.load(snapshot_path)
+
 def get_product(product_id):
-   return PRODUCT_CATALOG.get(product_id)
+   return catalog.get(product_id)
 
 def insert_product(item):
-   raise NotImplementedError("This function is not implemented yet....")    
+   return catalog.put({**item, 'id': item.get('id') or str(uuid.uuid4())})
 
 def delete_product(product_id):
-   raise NotImplementedError("This function is not implemented yet.")    
+   return catalog.delete(product_id)
 
 def update_product(product_id, item):
-   raise NotImplementedError("This function is not implemented yet.")    
+   return catalog.put({**item, 'id': product_id})
 
 def get_all_products():
-   return list(PRODUCT_CATALOG.values())
+   return catalog.all()
 
 def get_products_by_category(category):
-   return [p for p in PRODUCT_CATALOG.values() if category== p.get('category')]
\ No newline at end of file
+   return catalog.by_category_name(category)
+
+def get_products_by_price(min_price, max_price):
+   return catalog.by_price_range(min_price, max_price)
+
+def save_snapshot(path=None):
+   catalog.save(path or snapshot_path)
+
+def load_snapshot(path=None):
+   catalog.load(path or snapshot_path)
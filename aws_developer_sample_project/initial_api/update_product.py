@@ -1,7 +1,7 @@
 from response_utils import create_success_response,create_error_response
 import json
 from decimal import Decimal
-from products_db import update_product
+import products_db
 
 def handler(event, context):
    try:
@@ -10,10 +10,12 @@ def handler(event, context):
       item = json.loads(body)
 
       if id:
-         updated=update_product(id,item)
+         updated=products_db.update_product(id,item)
          return create_success_response(200, updated)
       else:
          return create_error_response(400, 'Product id is required')
+   except products_db.InvalidProduct as e:
+      return create_error_response(400, str(e))
    except Exception as e:
       print(f"Unexpected error: {str(e)}")
       return create_error_response(500, f'Internal server error - {str(e)}')
@@ -0,0 +1,55 @@
+"""JSON encoding for the responses.
+
+The one copy of this module: the Lambda functions get it from the common
+layer (/opt/python), the containers image copies it next to app.py.
+
+dumps() uses orjson when it is installed and falls back to the standard
+library otherwise. Set JSON_ENCODER=json (or orjson) to choose one; an
+unknown or missing encoder logs a warning and uses json, so a mistyped
+setting does not break every cold start.
+
+DynamoDB returns every number as a Decimal, both encoders write them as
+JSON numbers through decimal_serializer. orjson calls it for each Decimal,
+which is cheap next to building the Decimals: lists read with the
+low-level client (core_api's LOW_LEVEL_READS, dynamodb_json.py) never
+build one, see benchmarks/bench_dynamodb_json.py.
+"""
+import json
+import logging
+import os
+from decimal import Decimal
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+def decimal_serializer(obj):
+    """Handle Decimal objects in JSON serialization"""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f"Object of type {type(obj)} is not JSON serializable")
+
+def stdlib_dumps(data):
+    return json.dumps(data, default=decimal_serializer)
+
+def orjson_dumps(data):
+    return orjson.dumps(data, default=decimal_serializer).decode('utf-8')
+
+encoders = {'json': stdlib_dumps}
+if orjson:
+    encoders['orjson'] = orjson_dumps
+
+def choose_encoder(name):
+    """name if there is such an encoder, json otherwise; no name picks the fastest"""
+    if not name:
+        return 'orjson' if orjson else 'json'
+    if name not in encoders:
+        logger.warning("JSON encoder %s is not available, using json (available: %s)", name, ', '.join(encoders))
+        return 'json'
+    return name
+
+encoder_name = choose_encoder(os.environ.get('JSON_ENCODER'))
+dumps = encoders[encoder_name]
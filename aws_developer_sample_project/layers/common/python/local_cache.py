@@ -0,0 +1,70 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+
+class LocalCache:
+   """Bounded in-process LRU cache with a per-entry TTL.
+
+   Lives as long as the process (a warm Lambda container or a worker of the
+   containers app) and sits in front of Valkey, so repeated reads of the same
+   product or response skip the network.
+   Capped both by number of entries and by the approximate size of the values.
+   """
+   def __init__(self, max_items=256, max_bytes=8*1024*1024, ttl=5, clock=time.monotonic):
+      self.max_items=max_items
+      self.max_bytes=max_bytes
+      self.ttl=ttl
+      self.clock=clock
+      self.entries=OrderedDict()  # key -> (expires_at, size, value)
+      self.size=0
+      self.lock=threading.Lock()
+
+   def get(self, key):
+      with self.lock:
+         entry=self.entries.get(key)
+         if entry is None:
+            return None
+         expires_at, size, value = entry
+         if expires_at <= self.clock():
+            self._remove(key)
+            return None
+         self.entries.move_to_end(key)
+         return value
+
+   def set(self, key, value, size=1):
+      if self.max_items <= 0 or size > self.max_bytes:
+         return
+      with self.lock:
+         if key in self.entries:
+            self._remove(key)
+         self.entries[key]=(self.clock()+self.ttl, size, value)
+         self.size+=size
+         while len(self.entries) > self.max_items or self.size > self.max_bytes:
+            oldest=next(iter(self.entries))
+            self._remove(oldest)
+
+   def invalidate(self, key):
+      with self.lock:
+         if key in self.entries:
+            self._remove(key)
+
+   def clear(self):
+      with self.lock:
+         self.entries.clear()
+         self.size=0
+
+   def __len__(self):
+      return len(self.entries)
+
+   def _remove(self, key):
+      _, size, _ = self.entries.pop(key)
+      self.size-=size
+
+def from_environment():
+   """Create a LocalCache configured from LOCAL_CACHE_* environment variables"""
+   return LocalCache(
+      max_items=int(os.environ.get('LOCAL_CACHE_MAX_ITEMS') or 256),
+      max_bytes=int(os.environ.get('LOCAL_CACHE_MAX_BYTES') or 8*1024*1024),
+      ttl=float(os.environ.get('LOCAL_CACHE_TTL_SECONDS') or 5)
+   )
@@ -23,6 +23,15 @@ import os.path
 
 class ContainersStack(Stack):
 
+   def server_environment(self):
+      # cdk deploy -c async_app=true runs containers/async_app.py on uvicorn workers
+      if self.node.try_get_context("async_app")=="true":
+         return {
+            "APP_MODULE": "async_app:app",
+            "GUNICORN_WORKER_CLASS": "uvicorn.workers.UvicornWorker"
+         }
+      return {}
+
    def create_vpc(self):
       self.vpc = aws_ec2.Vpc(self, "ServiceVPC",
          max_azs=2,  # Deploy across multiple availability zones
@@ -96,8 +105,10 @@ class ContainersStack(Stack):
          )
       )
 
+      # the build context is the project folder, for the shared code in layers/common (see .dockerignore)
       docker_image_asset = aws_ecr_assets.DockerImageAsset(self, 'MyDockerImage', 
-         directory= 'aws_developer_sample_project/containers',
+         directory= 'aws_developer_sample_project',
+         file='containers/Dockerfile',
          asset_name='m10-app',
          platform=aws_ecr_assets.Platform.LINUX_ARM64
       )
@@ -127,7 +138,8 @@ class ContainersStack(Stack):
                log_retention=aws_logs.RetentionDays.ONE_DAY
             ),
             environment = {
-               "PRODUCTS_TABLE_NAME": self.products_table.table_name
+               "PRODUCTS_TABLE_NAME": self.products_table.table_name,
+               **self.server_environment()
             }
       )     
       container_definition.add_port_mappings(
@@ -153,7 +165,8 @@ class ContainersStack(Stack):
       )
       listener.add_targets("ApplicationFleet",
          port=8080,
-         targets=[service]
+         targets=[service],
+         health_check=aws_elasticloadbalancingv2.HealthCheck(path="/healthz")
       )
       lb.set_attribute(
             key="routing.http.drop_invalid_header_fields.enabled",
@@ -12,6 +12,7 @@ from aws_cdk import (
    aws_iam
 )
 from constructs import Construct
+from . import performance
 
 class CoreApiStack(Stack):
     
@@ -24,6 +25,9 @@ class CoreApiStack(Stack):
          self, "ProductsAPI",
          rest_api_name="ProductsApi",
          description="Amazon API Gateway for ProductsAPI.",
+         # lets the Lambda functions return compressed (base64 encoded) bodies;
+         # request bodies reach them base64 encoded too
+         binary_media_types=["*/*"],
          deploy_options=aws_apigateway.StageOptions(
                stage_name="dev",
                access_log_destination=aws_apigateway.LogGroupLogDestination(log_group),
@@ -35,6 +39,9 @@ class CoreApiStack(Stack):
       products_resource.add_method("GET", aws_apigateway.LambdaIntegration(self.query_products))
       products_resource.add_method("POST", aws_apigateway.LambdaIntegration(self.insert_product))
       products_resource.add_method("OPTIONS", aws_apigateway.LambdaIntegration(self.options_handler))
+
+      export_resource = products_resource.add_resource("export")
+      export_resource.add_method("GET", aws_apigateway.LambdaIntegration(self.export_products))
       
       get_product_resource = products_resource.add_resource("{id}")
       get_product_resource.add_method("GET", aws_apigateway.LambdaIntegration(self.get_product))
@@ -49,24 +56,27 @@ class CoreApiStack(Stack):
       CfnOutput(self, "ProductsApiUrl", value=f'{api.url}products')
       CfnOutput(self, "UIUrl", value=f'{api.url}ui')
 
-   def create_lambda(self,name, code_file, code_location=None):
+   def create_lambda(self,name, code_file, profile, code_location=None, timeout=Duration.seconds(10)):
       function_name = self.lambda_prefix + "_" + name
       log_group = aws_logs.LogGroup(self, f'lg_{name}',
          log_group_name = f'/aws/lambda/{function_name}',
          encryption_key = self.key
       )
       
-      return aws_lambda.Function(self, name,
+      return performance.create_function(self, name, profile,
+         reserved_concurrency=self.default_concurrent_executions,
          runtime=self.lambda_runtime,
          architecture=aws_lambda.Architecture.ARM_64,
          environment={
-            "PRODUCTS_TABLE_NAME": self.products_table.table_name
+            "PRODUCTS_TABLE_NAME": self.products_table.table_name,
+            # read-only endpoints skip Decimal, see core_api/dynamodb_json.py
+            "LOW_LEVEL_READS": "true" if self.node.try_get_context("low_level_reads")=="true" else "false"
          },
          environment_encryption = self.key,
          handler=f"{code_file}.handler",
          code=aws_lambda.Code.from_asset(code_location or self.code_location),
-         timeout=Duration.seconds(10),
-         reserved_concurrent_executions = self.default_concurrent_executions,
+         layers=[self.common_layer],
+         timeout=timeout,
          function_name = function_name,
          log_group=log_group,
       )
@@ -105,23 +115,34 @@ class CoreApiStack(Stack):
          )
       )
 
-      self.main_ui_lambda= self.create_lambda( "MainUI", code_file="main_ui",code_location=self.ui_code_location)
+      # code shared with the other APIs and the containers (json_encoder.py)
+      self.common_layer=aws_lambda.LayerVersion(self, "CommonLayer",
+         removal_policy=RemovalPolicy.DESTROY,
+         code=aws_lambda.Code.from_asset(os.path.join(os.path.dirname(__file__), "../layers/common")),
+         compatible_architectures=[aws_lambda.Architecture.ARM_64]
+      )
 
-      self.get_product= self.create_lambda("GetProduct", code_file="get_product")
+      self.main_ui_lambda= self.create_lambda( "MainUI", code_file="main_ui", profile="static", code_location=self.ui_code_location)
+
+      self.get_product= self.create_lambda("GetProduct", code_file="get_product", profile="read")
       self.products_table.grant_read_data(self.get_product)
 
-      self.query_products= self.create_lambda("QueryProducts", code_file="query_products")
+      self.query_products= self.create_lambda("QueryProducts", code_file="query_products", profile="read")
       self.products_table.grant_read_data(self.query_products)
 
-      self.insert_product= self.create_lambda("InsertProduct", code_file="insert_product")
+      self.insert_product= self.create_lambda("InsertProduct", code_file="insert_product", profile="admin")
       self.products_table.grant_read_write_data(self.insert_product)
 
-      self.update_product= self.create_lambda("UpdateProduct", code_file="update_product")
+      self.update_product= self.create_lambda("UpdateProduct", code_file="update_product", profile="admin")
       self.products_table.grant_read_write_data(self.update_product)
 
-      self.delete_product= self.create_lambda("DeleteProduct", code_file="delete_product")
+      self.delete_product= self.create_lambda("DeleteProduct", code_file="delete_product", profile="admin")
       self.products_table.grant_read_write_data(self.delete_product)
 
-      self.options_handler= self.create_lambda("APIOptions", code_file="options")
+      # parallel scan of the whole table, needs more time than the other routes
+      self.export_products= self.create_lambda("ExportProducts", code_file="export_products", profile="admin", timeout=Duration.seconds(60))
+      self.products_table.grant_read_data(self.export_products)
+
+      self.options_handler= self.create_lambda("APIOptions", code_file="options", profile="static")
       self.create_api_gateway()
 
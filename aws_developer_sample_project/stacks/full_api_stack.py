@@ -16,9 +16,11 @@ from aws_cdk import (
    aws_kinesis,
    aws_iam,
    aws_kms,
-   aws_logs
+   aws_logs,
+   aws_sqs
 )
 from constructs import Construct
+from . import performance
 
 class FullApiStack(Stack):    
    def create_vpc_etc(self):
@@ -83,6 +85,9 @@ class FullApiStack(Stack):
          self, "ProductsAPI",
          rest_api_name="ProductsApi",
          description="Amazon API Gateway for ProductsAPI.",
+         # lets the Lambda functions return compressed (base64 encoded) bodies;
+         # request bodies reach them base64 encoded too
+         binary_media_types=["*/*"],
          deploy_options=aws_apigateway.StageOptions(
                stage_name="dev",
                access_log_destination=aws_apigateway.LogGroupLogDestination(log_group),
@@ -97,6 +102,9 @@ class FullApiStack(Stack):
       products_resource.add_method("GET", aws_apigateway.LambdaIntegration(self.query_products))
       products_resource.add_method("POST", aws_apigateway.LambdaIntegration(self.insert_product))
       products_resource.add_method("OPTIONS", aws_apigateway.LambdaIntegration(self.options_handler))
+
+      export_resource = products_resource.add_resource("export")
+      export_resource.add_method("GET", aws_apigateway.LambdaIntegration(self.export_products))
       
       get_product_resource = products_resource.add_resource("{id}")
       get_product_resource.add_method("GET", aws_apigateway.LambdaIntegration(self.get_product))
@@ -175,6 +183,9 @@ class FullApiStack(Stack):
          authorization_type=aws_apigateway.AuthorizationType.COGNITO
       )
       products_resource.add_method("OPTIONS", aws_apigateway.LambdaIntegration(self.options_handler))
+
+      export_resource = products_resource.add_resource("export")
+      export_resource.add_method("GET", aws_apigateway.LambdaIntegration(self.export_products))
       
       get_product_resource = products_resource.add_resource("{id}")
       get_product_resource.add_method("GET", aws_apigateway.LambdaIntegration(self.get_product))
@@ -194,55 +205,58 @@ class FullApiStack(Stack):
       CfnOutput(self, "ProductsApiUrl", value=api.url)
 
 
-   def create_redis_lambda(self,name,cache_url,code_file,vpc,cache_subnets,lambda_security_group):
+   def create_redis_lambda(self,name,cache_url,code_file,vpc,cache_subnets,lambda_security_group,profile):
       if vpc:
-         return aws_lambda.Function(self, name,
+         return performance.create_function(self, name, profile,
             runtime=aws_lambda.Runtime.PYTHON_3_12,
             architecture=aws_lambda.Architecture.ARM_64,
             handler=f"{code_file}.handler",
             code=aws_lambda.Code.from_asset(self.code_location),
             environment={
                "CACHE_CLUSTER_URL": cache_url,
-               "PRODUCTS_TABLE_NAME": "full_api_products"
+               "PRODUCTS_TABLE_NAME": "full_api_products",
+               "LOG_LEVEL": self.node.try_get_context("log_level") or "INFO"
             },
             vpc=vpc,
             vpc_subnets=aws_ec2.SubnetSelection(subnets=cache_subnets.subnets),
-            layers=[self.redis_layer],
+            layers=[self.redis_layer, self.common_layer],
             security_groups=[lambda_security_group],
             timeout=Duration.seconds(30)
          )
       else:
-         return aws_lambda.Function(self, name,
+         return performance.create_function(self, name, profile,
             runtime=aws_lambda.Runtime.PYTHON_3_12,
             architecture=aws_lambda.Architecture.ARM_64,
             handler=f"{code_file}.handler",
             code=aws_lambda.Code.from_asset(self.code_location),
             environment={
                "CACHE_CLUSTER_URL": "",
-               "PRODUCTS_TABLE_NAME": "full_api_products"
+               "PRODUCTS_TABLE_NAME": "full_api_products",
+               "LOG_LEVEL": self.node.try_get_context("log_level") or "INFO"
             },
-            layers=[self.redis_layer],
+            layers=[self.redis_layer, self.common_layer],
             timeout=Duration.seconds(30)
          )
 
 
-   def create_lambda(self,name, code_file,layers=[]):
-      return aws_lambda.Function(self, name,
+   def create_lambda(self,name, code_file,profile,layers=[]):
+      return performance.create_function(self, name, profile,
          runtime=aws_lambda.Runtime.PYTHON_3_12,
          architecture=aws_lambda.Architecture.ARM_64,
-         layers=layers,
+         layers=[*layers, self.common_layer],
          handler=f"{code_file}.handler",
          code=aws_lambda.Code.from_asset(self.code_location),
          timeout=Duration.seconds(10)
       )
 
 
-   def create_image_lambda(self,name, code_file,s3_bucket):
-      return aws_lambda.Function(self, name,
+   def create_image_lambda(self,name, code_file,s3_bucket,profile):
+      return performance.create_function(self, name, profile,
          runtime=aws_lambda.Runtime.PYTHON_3_12,
          architecture=aws_lambda.Architecture.ARM_64,
          handler=f"{code_file}.handler",
          code=aws_lambda.Code.from_asset(self.code_location),
+         layers=[self.common_layer],
          timeout=Duration.seconds(10),
          environment={
             "BUCKET_NAME": s3_bucket.bucket_name,
@@ -250,20 +264,34 @@ class FullApiStack(Stack):
          }
       )
 
-   def create_stream_and_processing(self):
+   def create_stream_and_processing(self, products_table):
       stream=aws_kinesis.Stream(self, "ProductPricesStream",stream_name='ProductPricesStream')
 
-      self.process_price_updates= aws_lambda.Function(self, "ProcessPriceUpdates",
+      self.process_price_updates= performance.create_function(self, "ProcessPriceUpdates", "worker",
          runtime=self.lambda_runtime,
          handler="process_stream_prices.handler",
          code=aws_lambda.Code.from_asset(self.code_location),
+         layers=[self.common_layer],
          environment={
+            "CACHE_CLUSTER_URL": "",
             "PRODUCTS_TABLE_NAME": "full_api_products"
          },         
       )
+      products_table.grant_read_write_data(self.process_price_updates)
+      # batches that still fail after the retries, so they do not block the shard
+      dead_letter_queue=aws_sqs.Queue(self, "ProductPricesDeadLetterQueue",
+         encryption=aws_sqs.QueueEncryption.SQS_MANAGED,
+         enforce_ssl=True,
+         retention_period=Duration.days(14)
+      )
       self.process_price_updates.add_event_source(aws_lambda_event_sources.KinesisEventSource(stream,
          batch_size=100,
-         starting_position=aws_lambda.StartingPosition.LATEST
+         starting_position=aws_lambda.StartingPosition.LATEST,
+         # retry from the first failed record instead of the whole batch
+         report_batch_item_failures=True,
+         retry_attempts=5,
+         bisect_batch_on_error=True,
+         on_failure=aws_lambda_event_sources.SqsDlq(dead_letter_queue)
       ))
 
    def __init__(self, scope: Construct, construct_id: str, **kwargs) -> None:
@@ -320,6 +348,13 @@ class FullApiStack(Stack):
          compatible_architectures=[aws_lambda.Architecture.ARM_64]
       )
 
+      # code shared with the other APIs and the containers (json_encoder.py)
+      self.common_layer=aws_lambda.LayerVersion(self, "CommonLayer",
+         removal_policy=RemovalPolicy.DESTROY,
+         code=aws_lambda.Code.from_asset(os.path.join(os.path.dirname(__file__), "../layers/common")),
+         compatible_architectures=[aws_lambda.Architecture.ARM_64]
+      )
+
       pillow_layer=aws_lambda.LayerVersion(self, "PillowLayer",
          removal_policy=RemovalPolicy.DESTROY,
          code=aws_lambda.Code.from_asset(os.path.join(os.path.dirname(__file__), "../layers/pil-layer-python.zip")),
@@ -330,6 +365,7 @@ class FullApiStack(Stack):
          name="QueryProducts", 
          cache_url = cache_url, 
          code_file="query_products", 
+         profile="read",
          vpc=vpc, 
          cache_subnets=cache_subnets,
          lambda_security_group=lambda_security_group
@@ -340,6 +376,7 @@ class FullApiStack(Stack):
          name="InsertProduct", 
          cache_url = cache_url, 
          code_file="insert_product", 
+         profile="admin",
          vpc=vpc, 
          cache_subnets=cache_subnets,
          lambda_security_group=lambda_security_group
@@ -350,15 +387,28 @@ class FullApiStack(Stack):
          name="UpdateProduct", 
          cache_url = cache_url, 
          code_file="update_product", 
+         profile="admin",
          vpc=vpc, 
          cache_subnets=cache_subnets,
          lambda_security_group=lambda_security_group
       )
       products_table.grant_read_write_data(self.update_product)
 
+      self.export_products= self.create_redis_lambda(
+         name="ExportProducts", 
+         cache_url = cache_url, 
+         code_file="export_products", 
+         profile="admin",
+         vpc=vpc, 
+         cache_subnets=cache_subnets,
+         lambda_security_group=lambda_security_group
+      )
+      products_table.grant_read_data(self.export_products)
+
       self.options_handler= self.create_lambda(
          name="Options", 
          code_file="options", 
+         profile="static",
       )
 
 
@@ -366,6 +416,7 @@ class FullApiStack(Stack):
          name="GenerateUploadUrl", 
          s3_bucket=bucket,
          code_file="generate_upload_url", 
+         profile="admin",
       )
       bucket.grant_read_write(self.upload)
 
@@ -373,6 +424,7 @@ class FullApiStack(Stack):
          name="GenerateDownloadUrl",
          s3_bucket=bucket, 
          code_file="generate_download_url", 
+         profile="read",
       )
       bucket.grant_read(self.download)
 
@@ -381,6 +433,7 @@ class FullApiStack(Stack):
          name="DeleteProduct", 
          cache_url = cache_url, 
          code_file="delete_product", 
+         profile="admin",
          vpc=vpc, 
          cache_subnets=cache_subnets,
          lambda_security_group=lambda_security_group
@@ -392,6 +445,7 @@ class FullApiStack(Stack):
          name="GetProduct", 
          cache_url = cache_url, 
          code_file="get_product", 
+         profile="read",
          vpc=vpc, 
          cache_subnets=cache_subnets,
          lambda_security_group=lambda_security_group
@@ -399,7 +453,7 @@ class FullApiStack(Stack):
       products_table.grant_read_data(self.get_product)
       # self.get_product.connections.allow_internally(aws_ec2.Port.tcp(6379)) # Allow access to Redis
 
-      self.main_ui_lambda= aws_lambda.Function(self, "MainUI",
+      self.main_ui_lambda= performance.create_function(self, "MainUI", "static",
          runtime=self.lambda_runtime,
          handler="main_ui.handler",
          code=aws_lambda.Code.from_asset(ui_code_location)
@@ -413,6 +467,7 @@ class FullApiStack(Stack):
       self.process_images= self.create_lambda(
          name="ProcessImages", 
          code_file="process_uploaded_images",
+         profile="worker",
          layers=[pillow_layer]
       )
       products_table.grant_read_write_data(self.process_images)
@@ -426,7 +481,7 @@ class FullApiStack(Stack):
 
       if self.node.try_get_context("create_stream")=="true":
          print("FullApiStack creating streams")
-         self.create_stream_and_processing()
+         self.create_stream_and_processing(products_table)
 
 
 
@@ -6,6 +6,7 @@ from aws_cdk import (
     CfnOutput
 )
 from constructs import Construct
+from . import performance
 
 class InitialApiStack(Stack):
     def __init__(self, scope: Construct, construct_id: str,  **kwargs) -> None:
@@ -16,46 +17,46 @@ class InitialApiStack(Stack):
       lambda_runtime=aws_lambda.Runtime.PYTHON_3_12
       default_concurrent_executions = 5
 
-      self.main_ui_lambda= aws_lambda.Function(self, "MainUI",
+      self.main_ui_lambda= performance.create_function(self, "MainUI", "static",
          runtime=lambda_runtime,
          handler="main_ui.handler",
          code=aws_lambda.Code.from_asset(ui_code_location),
-         reserved_concurrent_executions = default_concurrent_executions,
+         reserved_concurrency=default_concurrent_executions,
       )
 
-      self.get_product= aws_lambda.Function(self, "GetProduct",
+      self.get_product= performance.create_function(self, "GetProduct", "read",
          runtime=lambda_runtime,
          handler="get_product.handler",
          code=aws_lambda.Code.from_asset(code_location),
-         reserved_concurrent_executions = default_concurrent_executions
+         reserved_concurrency=default_concurrent_executions
       )
 
-      self.query_products= aws_lambda.Function(self, "QueryProducts",
+      self.query_products= performance.create_function(self, "QueryProducts", "read",
          runtime=lambda_runtime,
          handler="query_products.handler",
          code=aws_lambda.Code.from_asset(code_location),
-         reserved_concurrent_executions = default_concurrent_executions
+         reserved_concurrency=default_concurrent_executions
       )
 
-      self.insert_product= aws_lambda.Function(self, "InsertProduct",
+      self.insert_product= performance.create_function(self, "InsertProduct", "admin",
          runtime=lambda_runtime,
          handler="insert_product.handler",
          code=aws_lambda.Code.from_asset(code_location),
-         reserved_concurrent_executions = default_concurrent_executions
+         reserved_concurrency=default_concurrent_executions
       )
 
-      self.update_product= aws_lambda.Function(self, "UpdateProduct",
+      self.update_product= performance.create_function(self, "UpdateProduct", "admin",
          runtime=lambda_runtime,
          handler="update_product.handler",
          code=aws_lambda.Code.from_asset(code_location),
-         reserved_concurrent_executions = default_concurrent_executions,
+         reserved_concurrency=default_concurrent_executions,
       )
 
-      self.options_handler= aws_lambda.Function(self, "APIOptions",
+      self.options_handler= performance.create_function(self, "APIOptions", "static",
          runtime=lambda_runtime,
          handler="options.handler",
          code=aws_lambda.Code.from_asset(code_location),
-         reserved_concurrent_executions = default_concurrent_executions,
+         reserved_concurrency=default_concurrent_executions,
       )
 
       api = aws_apigateway.RestApi(
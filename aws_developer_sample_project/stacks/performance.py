@@ -0,0 +1,84 @@
+"""Performance profiles of the Lambda functions, tuned with CDK context.
+
+Every function has a profile:
+- read: the latency-critical read routes (GET /products, GET /products/{id})
+- admin: the routes changing products, exports and upload URLs
+- static: OPTIONS and the UI, which do almost nothing
+- worker: stream and image processing, CPU bound
+
+A profile sets the memory size (Lambda gives CPU in proportion, 1769 MB is
+one vCPU), the reserved concurrency (None keeps the stack default), the
+provisioned concurrency of the "live" alias and Python SnapStart on the
+published versions. Provisioned concurrency keeps environments initialized
+and turns SnapStart off, Lambda does not combine them.
+
+SnapStart is off by default: the handlers create their clients and caches
+on the first request, so the snapshot would hold little more than the
+imports, and the restore and the published versions would cost more than
+they save.
+
+Override them with the "performance" context, by profile or by function:
+
+   cdk deploy CoreApiStack -c performance='{"read": {"provisioned_concurrency": 2}, "ExportProducts": {"memory_size": 2048}}'
+"""
+import json
+from aws_cdk import aws_lambda
+
+profiles={
+   'read': {'memory_size': 1024, 'reserved_concurrency': None, 'provisioned_concurrency': 0, 'snap_start': False},
+   'admin': {'memory_size': 512, 'reserved_concurrency': None, 'provisioned_concurrency': 0, 'snap_start': False},
+   'static': {'memory_size': 128, 'reserved_concurrency': None, 'provisioned_concurrency': 0, 'snap_start': False},
+   'worker': {'memory_size': 1769, 'reserved_concurrency': None, 'provisioned_concurrency': 0, 'snap_start': False},
+}
+
+# Python runtimes with SnapStart
+snap_start_runtimes=('python3.12', 'python3.13')
+
+def context_overrides(scope):
+   overrides=scope.node.try_get_context('performance') or {}
+   # -c performance='{...}' gives a string, cdk.json an object
+   return json.loads(overrides) if isinstance(overrides, str) else overrides
+
+def settings(scope, name, profile):
+   """The profile of the function called name, with the context overrides"""
+   overrides=context_overrides(scope)
+   unknown=set(overrides.get(profile, {}))|set(overrides.get(name, {}))
+   unknown-=set(profiles[profile])
+   if unknown:
+      raise ValueError(f"Unknown performance settings for {name}: {', '.join(sorted(unknown))}")
+   result={**profiles[profile], **overrides.get(profile, {}), **overrides.get(name, {})}
+   if result['provisioned_concurrency']:
+      result['snap_start']=False
+   return result
+
+def function_options(scope, name, profile, runtime, reserved_concurrency=None):
+   """Keyword arguments of aws_lambda.Function for the profile, and its settings"""
+   options=settings(scope, name, profile)
+   reserved=options['reserved_concurrency'] if options['reserved_concurrency'] is not None else reserved_concurrency
+   if reserved is not None and options['provisioned_concurrency'] > reserved:
+      raise ValueError(f"{name}: provisioned concurrency {options['provisioned_concurrency']} is over the reserved concurrency {reserved}")
+   if options['snap_start'] and runtime.name not in snap_start_runtimes:
+      raise ValueError(f"{name}: SnapStart is not available for {runtime.name}")
+   arguments={'memory_size': options['memory_size']}
+   if reserved is not None:
+      arguments['reserved_concurrent_executions']=reserved
+   if options['snap_start']:
+      arguments['snap_start']=aws_lambda.SnapStartConf.ON_PUBLISHED_VERSIONS
+   return arguments, options
+
+def create_function(scope, name, profile, reserved_concurrency=None, **function_arguments):
+   """Creates the function with its profile.
+
+   Returns what API Gateway and the event sources should invoke: the "live"
+   alias when SnapStart or provisioned concurrency need a published
+   version, the function otherwise. Grants on the alias go to the function role.
+   """
+   arguments, options=function_options(scope, name, profile, function_arguments['runtime'], reserved_concurrency)
+   function=aws_lambda.Function(scope, name, **function_arguments, **arguments)
+   if not options['snap_start'] and not options['provisioned_concurrency']:
+      return function
+   return aws_lambda.Alias(scope, f"{name}LiveAlias",
+      alias_name='live',
+      version=function.current_version,
+      provisioned_concurrent_executions=options['provisioned_concurrency'] or None
+   )
@@ -0,0 +1,55 @@
+"""Micro-benchmark of turning DynamoDB wire-format items into response JSON.
+
+Compares what the resource path does (TypeDeserializer, then json_encoder)
+with dynamodb_json used by LOW_LEVEL_READS=true.
+
+   python benchmarks/bench_dynamodb_json.py --sizes 100,1000,10000
+"""
+import argparse
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'aws_developer_sample_project', 'core_api'))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'aws_developer_sample_project', 'layers', 'common', 'python'))
+from boto3.dynamodb.types import TypeDeserializer
+import dynamodb_json
+import json_encoder
+
+def make_items(size):
+   return [{
+      'id': {'S': f'prod_{i:07d}'},
+      'title': {'S': f'Product {i}'},
+      'description': {'S': f'Description of product {i} '*4},
+      'price': {'N': f'{random.randint(100, 100000)/100}'},
+      'stock': {'N': str(random.randint(0, 500))},
+      'category': {'S': f'category{i%50}'},
+      'images': {'M': {'main': {'L': [{'S': 'small'}, {'S': 'medium'}, {'S': 'large'}]}}}
+   } for i in range(size)]
+
+def resource_path(items):
+   deserializer=TypeDeserializer()
+   products=[{name: deserializer.deserialize(value) for name, value in item.items()} for item in items]
+   return json_encoder.dumps(products)
+
+def low_level_path(items):
+   return dynamodb_json.items_to_json(items)
+
+def main():
+   parser=argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+   parser.add_argument('--sizes', default='100,1000,10000', help='comma separated number of items')
+   parser.add_argument('--repeat', type=int, default=5)
+   args=parser.parse_args()
+
+   random.seed(42)
+   print(f"encoder: {json_encoder.encoder_name}")
+   print(f"{'items':>9} {'resource':>12} {'low level':>12}  speedup")
+   for size in [int(size) for size in args.sizes.split(',')]:
+      items=make_items(size)
+      number=max(1, 10000//size)
+      timings=[min(timeit.repeat(lambda: path(items), number=number, repeat=args.repeat))/number*1000 for path in (resource_path, low_level_path)]
+      print(f"{size:>9} {timings[0]:>10.3f}ms {timings[1]:>10.3f}ms  {timings[0]/timings[1]:6.1f}x")
+
+if __name__ == '__main__':
+   main()
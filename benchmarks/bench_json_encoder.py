@@ -0,0 +1,52 @@
+"""Micro-benchmark of the JSON encoders in json_encoder.py on product lists.
+
+The last column encodes the same products with floats instead of Decimals,
+what orjson costs without the decimal_serializer callback.
+
+   python benchmarks/bench_json_encoder.py --sizes 100,1000,10000
+"""
+import argparse
+import os
+import random
+import sys
+import timeit
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'aws_developer_sample_project', 'core_api'))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'aws_developer_sample_project', 'layers', 'common', 'python'))
+import json_encoder
+
+def make_products(size):
+   return [{
+      'id': f'prod_{i:07d}',
+      'title': f'Product {i}',
+      'description': f'Description of product {i} '*4,
+      'price': Decimal(random.randint(100, 100000))/100,
+      'stock': Decimal(random.randint(0, 500)),
+      'category': f'category{i%50}',
+      'images': {'main': ['small', 'medium', 'large']}
+   } for i in range(size)]
+
+def main():
+   parser=argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+   parser.add_argument('--sizes', default='100,1000,10000', help='comma separated number of products')
+   parser.add_argument('--repeat', type=int, default=5)
+   args=parser.parse_args()
+
+   random.seed(42)
+   print(f"{'products':>9} " + ' '.join(f"{name:>12}" for name in json_encoder.encoders) + '  speedup' + (f"  {'no Decimal':>12}" if json_encoder.orjson else ''))
+   for size in [int(size) for size in args.sizes.split(',')]:
+      products=make_products(size)
+      number=max(1, 10000//size)
+      timings={}
+      for name, dumps in json_encoder.encoders.items():
+         timings[name]=min(timeit.repeat(lambda: dumps(products), number=number, repeat=args.repeat))/number*1000
+      speedup=timings['json']/timings['orjson'] if 'orjson' in timings else 1
+      line=f"{size:>9} " + ' '.join(f"{timing:>10.3f}ms" for timing in timings.values()) + f"  {speedup:6.1f}x"
+      if json_encoder.orjson:
+         floats=[{name: float(value) if isinstance(value, Decimal) else value for name, value in product.items()} for product in products]
+         line+=f"  {min(timeit.repeat(lambda: json_encoder.orjson.dumps(floats), number=number, repeat=args.repeat))/number*1000:>10.3f}ms"
+      print(line)
+
+if __name__ == '__main__':
+   main()
@@ -0,0 +1,158 @@
+"""Import time of every Lambda handler, the part of a cold start our code controls.
+
+Each handler module is imported in a fresh interpreter with
+`python -X importtime`, a few times, and the median cumulative import time
+is compared with its budget in import_budgets.json. Budgets are multiples of
+the time a fixed set of standard library modules takes to import, measured
+between the imports of each handler, so they hold on slower and faster (or
+busy) machines alike. Exits with status 1
+when a handler is over budget, or with --compare when it got slower than
+--threshold compared with a previous report.
+
+The Lambda functions only import their handler module, so the report shows
+the heaviest modules each one pulls in.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+root=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+lambda_root=os.path.join(root, 'aws_developer_sample_project')
+# the common layer, /opt/python in Lambda
+common_folder=os.path.join(lambda_root, 'layers', 'common', 'python')
+default_budgets=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'import_budgets.json')
+results_folder=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+# what the stacks set, products_db reads them when it is imported
+lambda_environment={
+   'AWS_DEFAULT_REGION': 'us-east-1',
+   'PRODUCTS_TABLE_NAME': 'Products',
+   'CACHE_CLUSTER_URL': '',
+   'PYTHONDONTWRITEBYTECODE': '1'
+}
+
+# the unit of the budgets, modules of the kind boto3 and our handlers import
+reference_imports='json, decimal, logging, email.parser, http.client, concurrent.futures, uuid'
+
+line_format=re.compile(r'import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)')
+
+def find_handlers(folder):
+   """Modules of the folder defining a handler function"""
+   handlers=[]
+   for file_name in sorted(os.listdir(folder)):
+      if file_name.endswith('.py'):
+         with open(os.path.join(folder, file_name)) as f:
+            if re.search(r'^def handler\(', f.read(), re.MULTILINE):
+               handlers.append(file_name[:-3])
+   return handlers
+
+def import_times(folder, module):
+   """Cumulative import times in microseconds of module and of its direct imports"""
+   environment={**os.environ, **lambda_environment, 'PYTHONPATH': os.pathsep.join([folder, common_folder])}
+   result=subprocess.run(
+      [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+      cwd=folder, env=environment, capture_output=True, text=True
+   )
+   if result.returncode!=0:
+      raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+   # a module is listed after everything it imports, one indentation level deeper
+   imports={}
+   for line in result.stderr.splitlines():
+      match=line_format.match(line)
+      if not match:
+         continue
+      cumulative, depth, name=int(match.group(2)), len(match.group(3))//2, match.group(4)
+      if depth==0:
+         if name==module:
+            return cumulative, imports
+         imports={}
+      elif depth==1:
+         imports[name]=cumulative
+   raise RuntimeError(f"no import time for {module}")
+
+def reference_time():
+   """Time in ms to import reference_imports in a fresh interpreter, under -X importtime like the handlers"""
+   code=f"import time; started=time.perf_counter(); import {reference_imports}; print((time.perf_counter()-started)*1000)"
+   result=subprocess.run(
+      [sys.executable, '-X', 'importtime', '-c', code],
+      env={**os.environ, **lambda_environment}, capture_output=True, text=True, check=True
+   )
+   return float(result.stdout)
+
+def measure(folder, module, runs):
+   """Median import time of the handler, and relative to the reference imports timed in between"""
+   samples=[]
+   references=[]
+   for _ in range(runs):
+      references.append(reference_time())
+      samples.append(import_times(folder, module))
+   total=statistics.median(total for total, _ in samples)/1000
+   reference_ms=statistics.median(references)
+   heaviest=sorted(samples[-1][1].items(), key=lambda entry: -entry[1])[:3]
+   return {
+      'import_ms': round(total, 1),
+      'reference_ms': round(reference_ms, 1),
+      'relative': round(total/reference_ms, 2),
+      'heaviest': [f"{name} {time/1000:.0f}ms" for name, time in heaviest]
+   }
+
+def commit():
+   try:
+      return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=root, capture_output=True, text=True, check=True).stdout.strip()
+   except (OSError, subprocess.CalledProcessError):
+      return 'unknown'
+
+def main():
+   parser=argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+   parser.add_argument('--folders', default='full_api', help='comma separated Lambda folders, e.g. full_api,core_api')
+   parser.add_argument('--runs', type=int, default=5, help='imports per handler, the median is reported')
+   parser.add_argument('--budgets', default=default_budgets, help='JSON file of budgets per folder and handler, in multiples of the reference imports')
+   parser.add_argument('--compare', help='previous report to compare with')
+   parser.add_argument('--threshold', type=float, default=0.2, help='allowed slowdown with --compare (0.2 = 20%%)')
+   args=parser.parse_args()
+
+   with open(args.budgets) as f:
+      budgets=json.load(f)
+   previous={}
+   if args.compare:
+      with open(args.compare) as f:
+         previous=json.load(f)['handlers']
+
+   print(f"Budgets in multiples of the reference imports: {reference_imports}\n")
+   report={}
+   failures=[]
+   print(f"{'handler':40} {'import':>9} {'relative':>9} {'budget':>9}  heaviest imports")
+   for folder_name in args.folders.split(','):
+      folder=os.path.join(lambda_root, folder_name)
+      for module in find_handlers(folder):
+         name=f"{folder_name}/{module}"
+         result=measure(folder, module, args.runs)
+         report[name]=result
+         budget=budgets.get(folder_name, {}).get(module)
+         status=''
+         if budget is not None and result['relative'] > budget:
+            status='OVER BUDGET'
+            failures.append(f"{name}: {result['import_ms']}ms ({result['relative']}x), budget {budget}x ({budget*result['reference_ms']:.0f}ms)")
+         # relative times, the previous report may come from another machine
+         before=previous.get(name, {}).get('relative')
+         if before and result['relative'] > before*(1+args.threshold):
+            status='REGRESSION'
+            failures.append(f"{name}: {result['relative']}x, was {before}x")
+         budget_text=f"{budget}x" if budget is not None else '-'
+         print(f"{name:40} {result['import_ms']:>7}ms {result['relative']:>8}x {budget_text:>9}  {', '.join(result['heaviest'])} {status}")
+
+   os.makedirs(results_folder, exist_ok=True)
+   output=os.path.join(results_folder, f"{commit()}-imports.json")
+   with open(output, 'w') as f:
+      json.dump({'python': sys.version.split()[0], 'handlers': report}, f, indent=2)
+   print(f"\nWritten to {output}")
+   if failures:
+      print('\n'+'\n'.join(failures))
+      sys.exit(1)
+
+if __name__ == '__main__':
+   main()
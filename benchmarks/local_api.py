@@ -0,0 +1,451 @@
+"""Local API Gateway + Lambda emulator, to test the API end to end without deploying.
+
+Serves the routes of a stack over HTTP and runs each request in-process
+through the handler module, with an API Gateway proxy event, the way Lambda
+does it:
+- every function has its own execution environments, each handling one
+  request at a time and kept warm for the next ones (--keep-warm seconds).
+- a request finding no idle environment starts a new one: a cold start
+  imports the handler module and its folder again, with their own globals
+  (clients, caches...), and can wait --init-delay ms more for the sandbox.
+- --max-environments limits the environments per function, requests over
+  it are throttled (429).
+
+DynamoDB is moto in-process, or DynamoDB Local with --dynamodb-endpoint.
+Valkey is an in-memory fakeredis shared by all the environments, or a
+local Valkey with --valkey-url.
+
+   python benchmarks/local_api.py --api full_api --port 8080
+   python benchmarks/local_api.py --api core_api --template cdk.out/CoreApiStack.template.json
+
+GET /__local_api/stats returns the invocations and cold starts per function.
+"""
+import argparse
+import base64
+import importlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+import traceback
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qsl
+
+root_folder=os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+# the common layer of the functions, /opt/python in Lambda
+common_folder=os.path.join(root_folder, 'aws_developer_sample_project', 'layers', 'common', 'python')
+lambda_root=os.path.join(root_folder, 'aws_developer_sample_project')
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+
+# method, resource and handler module, as in the stacks (the UI is not served)
+core_api_routes=[
+   ('GET', '/products', 'query_products'),
+   ('POST', '/products', 'insert_product'),
+   ('OPTIONS', '/products', 'options'),
+   ('GET', '/products/export', 'export_products'),
+   ('GET', '/products/{id}', 'get_product'),
+   ('PUT', '/products/{id}', 'update_product'),
+   ('DELETE', '/products/{id}', 'delete_product'),
+   ('OPTIONS', '/products/{id}', 'options'),
+]
+routes={
+   'core_api': core_api_routes,
+   'full_api': core_api_routes+[
+      ('GET', '/products/{id}/images', 'generate_download_url'),
+      ('POST', '/products/{id}/images', 'generate_upload_url'),
+   ]
+}
+
+def routes_from_template(template):
+   """(method, resource, handler module) of the Lambda proxy methods of a synthesized stack"""
+   resources=template['Resources']
+   def resource_path(reference):
+      if 'Ref' not in reference:
+         return '' # Fn::GetAtt RootResourceId
+      properties=resources[reference['Ref']]['Properties']
+      return resource_path(properties['ParentId'])+'/'+properties['PathPart']
+   def function_of(uri):
+      for part in uri.get('Fn::Join', ['', []])[1]:
+         if isinstance(part, dict) and 'Fn::GetAtt' in part:
+            return part['Fn::GetAtt'][0]
+   found=[]
+   for resource in resources.values():
+      if resource['Type']!='AWS::ApiGateway::Method':
+         continue
+      properties=resource['Properties']
+      integration=properties.get('Integration', {})
+      if integration.get('Type')!='AWS_PROXY':
+         continue
+      function=resources[function_of(integration['Uri'])]
+      module=function['Properties']['Handler'].rsplit('.', 1)[0]
+      found.append((properties['HttpMethod'], resource_path(properties['ResourceId']) or '/', module))
+   return found
+
+class Route:
+   def __init__(self, method, resource, function):
+      self.method=method
+      self.resource=resource
+      self.function=function
+      segments=[]
+      for segment in resource.strip('/').split('/'):
+         if segment.startswith('{') and segment.endswith('+}'):
+            segments.append(f"(?P<{segment[1:-2]}>.+)")
+         elif segment.startswith('{'):
+            segments.append(f"(?P<{segment[1:-1]}>[^/]+)")
+         else:
+            segments.append(re.escape(segment))
+      self.pattern=re.compile('^/'+'/'.join(segments)+'$')
+      # like API Gateway, /products/export wins over /products/{id}
+      self.parameters=resource.count('{')
+
+   def match(self, path):
+      match=self.pattern.match(path)
+      return match.groupdict() if match else None
+
+# Lambda runtime
+
+class Throttled(Exception):
+   pass
+
+class Context:
+   def __init__(self, function):
+      self.aws_request_id=str(uuid.uuid4())
+      self.function_name=function.name
+      self.function_version='$LATEST'
+      self.memory_limit_in_mb=128
+      self.invoked_function_arn=f"arn:aws:lambda:{os.environ['AWS_DEFAULT_REGION']}:000000000000:function:{function.name}"
+      self.deadline=time.monotonic()+function.timeout
+
+   def get_remaining_time_in_millis(self):
+      return max(0, int((self.deadline-time.monotonic())*1000))
+
+# module imports change sys.modules and sys.path, one cold start at a time
+import_lock=threading.Lock()
+
+def load_handler(folder, module_name, function_name):
+   """Imports the handler module with fresh copies of the modules of its folder and of the common layer"""
+   names={file_name[:-3] for path in (folder, common_folder) for file_name in os.listdir(path) if file_name.endswith('.py')}
+   with import_lock:
+      saved={name: sys.modules.pop(name) for name in names if name in sys.modules}
+      sys.path[:0]=[folder, common_folder]
+      previous_name=os.environ.get('AWS_LAMBDA_FUNCTION_NAME')
+      os.environ['AWS_LAMBDA_FUNCTION_NAME']=function_name
+      try:
+         module=importlib.import_module(module_name)
+         return module, {name: sys.modules[name] for name in names if name in sys.modules}
+      finally:
+         for name in names:
+            sys.modules.pop(name, None)
+         sys.modules.update(saved)
+         sys.path.remove(folder)
+         sys.path.remove(common_folder)
+         if previous_name is None:
+            os.environ.pop('AWS_LAMBDA_FUNCTION_NAME', None)
+         else:
+            os.environ['AWS_LAMBDA_FUNCTION_NAME']=previous_name
+
+class Environment:
+   """One execution environment: the handler module loaded once, for one request at a time"""
+   def __init__(self, function):
+      started=time.perf_counter()
+      if function.init_delay:
+         time.sleep(function.init_delay/1000)
+      module, self.modules=load_handler(function.folder, function.module, function.name)
+      if function.setup:
+         function.setup(self.modules)
+      self.handler=module.handler
+      self.init_ms=(time.perf_counter()-started)*1000
+      self.last_used=time.monotonic()
+
+class Function:
+   def __init__(self, folder, module, timeout=30, keep_warm=600, init_delay=0, max_environments=0, setup=None):
+      self.folder=folder
+      self.module=module
+      self.name=''.join(part.title() for part in module.split('_'))
+      self.timeout=timeout
+      self.keep_warm=keep_warm
+      self.init_delay=init_delay
+      self.max_environments=max_environments
+      # called with the modules of a new environment, to point its clients at the local backends
+      self.setup=setup
+      self.idle=[]
+      self.busy=0
+      self.lock=threading.Lock()
+      self.stats={'invocations': 0, 'cold_starts': 0, 'throttles': 0, 'errors': 0, 'init_ms': 0.0, 'duration_ms': 0.0}
+
+   def acquire(self):
+      """An idle environment, or None when the caller has to start one"""
+      with self.lock:
+         now=time.monotonic()
+         # environments idle for too long are gone
+         self.idle=[environment for environment in self.idle if now-environment.last_used < self.keep_warm]
+         if self.idle:
+            self.busy+=1
+            return self.idle.pop()
+         if self.max_environments and self.busy >= self.max_environments:
+            self.stats['throttles']+=1
+            raise Throttled(self.name)
+         self.busy+=1
+         return None
+
+   def release(self, environment):
+      with self.lock:
+         self.busy-=1
+         if environment is not None:
+            environment.last_used=time.monotonic()
+            # the most recently used environment is reused first, as in Lambda
+            self.idle.append(environment)
+
+   def invoke(self, event, quiet=False):
+      """The handler response, None when the function failed"""
+      environment=self.acquire()
+      cold=environment is None
+      if cold:
+         try:
+            environment=Environment(self)
+         except Exception:
+            traceback.print_exc()
+            self.release(None)
+            with self.lock:
+               self.stats['errors']+=1
+            return None
+      context=Context(self)
+      started=time.perf_counter()
+      try:
+         response=environment.handler(event, context)
+      except Exception:
+         # the environment survives errors of the handler
+         traceback.print_exc()
+         response=None
+      duration_ms=(time.perf_counter()-started)*1000
+      if duration_ms > self.timeout*1000:
+         print(f"{context.aws_request_id} Task timed out after {self.timeout} seconds")
+         response=None
+         self.release(None) # Lambda stops the environment
+      else:
+         self.release(environment)
+      with self.lock:
+         self.stats['invocations']+=1
+         self.stats['duration_ms']+=duration_ms
+         if response is None:
+            self.stats['errors']+=1
+         if cold:
+            self.stats['cold_starts']+=1
+            self.stats['init_ms']+=environment.init_ms
+      if not quiet:
+         init=f"\tInit Duration: {environment.init_ms:.2f} ms" if cold else ''
+         print(f"REPORT RequestId: {context.aws_request_id}\tFunction: {self.name}\tDuration: {duration_ms:.2f} ms{init}")
+      return response
+
+   def summary(self):
+      with self.lock:
+         stats=dict(self.stats)
+         stats['environments']=len(self.idle)+self.busy
+      invocations=stats['invocations'] or 1
+      stats['mean_duration_ms']=round(stats.pop('duration_ms')/invocations, 3)
+      stats['mean_init_ms']=round(stats.pop('init_ms')/(stats['cold_starts'] or 1), 3)
+      return stats
+
+# API Gateway
+
+def to_event(method, url, headers, body, route, path_parameters):
+   """REST API proxy integration event"""
+   parts=urlsplit(url)
+   query=parse_qsl(parts.query, keep_blank_values=True)
+   multi_value_query={}
+   for name, value in query:
+      multi_value_query.setdefault(name, []).append(value)
+   multi_value_headers={}
+   for name, value in headers.items():
+      multi_value_headers.setdefault(name, []).append(value)
+   is_base64=False
+   if body is not None:
+      try:
+         body=body.decode('utf-8')
+      except UnicodeDecodeError:
+         body=base64.b64encode(body).decode('ascii')
+         is_base64=True
+   return {
+      'resource': route.resource,
+      'path': parts.path,
+      'httpMethod': method,
+      'headers': {name: values[-1] for name, values in multi_value_headers.items()} or None,
+      'multiValueHeaders': multi_value_headers or None,
+      'queryStringParameters': {name: values[-1] for name, values in multi_value_query.items()} or None,
+      'multiValueQueryStringParameters': multi_value_query or None,
+      'pathParameters': path_parameters or None,
+      'stageVariables': None,
+      'body': body,
+      'isBase64Encoded': is_base64,
+      'requestContext': {
+         'resourcePath': route.resource,
+         'httpMethod': method,
+         'path': parts.path,
+         'stage': 'local',
+         'requestId': str(uuid.uuid4()),
+         'requestTimeEpoch': int(time.time()*1000),
+         'identity': {'sourceIp': '127.0.0.1'}
+      }
+   }
+
+class LocalApi:
+   def __init__(self, routes, functions, quiet=False):
+      self.routes=sorted(routes, key=lambda route: route.parameters)
+      self.functions=functions
+      self.quiet=quiet
+
+   def find(self, method, path):
+      """The route and its path parameters, (None, None) when no route matches"""
+      for route in self.routes:
+         if route.method in (method, 'ANY'):
+            path_parameters=route.match(path)
+            if path_parameters is not None:
+               return route, path_parameters
+      return None, None
+
+   def handle(self, method, url, headers, body):
+      """Returns the status code, a list of headers and the body bytes"""
+      path=urlsplit(url).path
+      if path=='/__local_api/stats':
+         stats={route_function.name: route_function.summary() for route_function in self.functions.values()}
+         return 200, [('Content-Type', 'application/json')], json.dumps(stats).encode('utf-8')
+      route, path_parameters=self.find(method, path)
+      if route is None:
+         # what API Gateway answers for a method or resource it does not have
+         return 403, [('Content-Type', 'application/json')], b'{"message":"Missing Authentication Token"}'
+      try:
+         response=self.functions[route.function].invoke(to_event(method, url, headers, body, route, path_parameters), self.quiet)
+      except Throttled:
+         return 429, [('Content-Type', 'application/json')], b'{"message":"Too Many Requests"}'
+      if not isinstance(response, dict) or 'statusCode' not in response:
+         return 502, [('Content-Type', 'application/json')], b'{"message": "Internal server error"}'
+      response_headers=list((response.get('headers') or {}).items())
+      for name, values in (response.get('multiValueHeaders') or {}).items():
+         response_headers.extend((name, value) for value in values)
+      response_body=response.get('body') or ''
+      if response.get('isBase64Encoded'):
+         response_body=base64.b64decode(response_body)
+      elif isinstance(response_body, str):
+         response_body=response_body.encode('utf-8')
+      return int(response['statusCode']), response_headers, response_body
+
+def request_handler(api):
+   class RequestHandler(BaseHTTPRequestHandler):
+      # keep-alive, like API Gateway
+      protocol_version='HTTP/1.1'
+
+      def dispatch(self):
+         length=int(self.headers.get('Content-Length') or 0)
+         body=self.rfile.read(length) if length else None
+         status, headers, response_body=api.handle(self.command, self.path, dict(self.headers.items()), body)
+         self.send_response(status)
+         for name, value in headers:
+            if name.lower() not in ('content-length', 'connection'):
+               self.send_header(name, str(value))
+         self.send_header('Content-Length', str(len(response_body)))
+         self.end_headers()
+         if self.command!='HEAD':
+            self.wfile.write(response_body)
+
+      do_GET=do_POST=do_PUT=do_DELETE=do_PATCH=do_OPTIONS=do_HEAD=dispatch
+
+      def log_message(self, format, *args):
+         pass
+   return RequestHandler
+
+# Backends
+
+def create_resources(bucket_name):
+   """The products table and the images bucket, unless they exist (DynamoDB Local keeps them)"""
+   import boto3
+   sys.path.insert(0, root_folder)
+   from tests.unit.full_api.testing_utils import create_table, table_name
+   dynamodb=boto3.client('dynamodb')
+   if table_name not in dynamodb.list_tables()['TableNames']:
+      create_table()
+   if os.environ.get('AWS_ENDPOINT_URL_DYNAMODB') is None:
+      boto3.client('s3').create_bucket(Bucket=bucket_name)
+
+def cache_setup(valkey_url):
+   """Points the Valkey client of every new environment at the local cache"""
+   if valkey_url:
+      import redis
+      create_client=lambda: redis.Redis.from_url(valkey_url, decode_responses=True)
+   else:
+      import fakeredis
+      server=fakeredis.FakeServer()
+      create_client=lambda: fakeredis.FakeRedis(server=server, decode_responses=True)
+   def setup(modules):
+      if 'clients' in modules:
+         modules['clients'].register('cache', create_client())
+   return setup
+
+def create_api(api_name, route_table, setup=None, quiet=False, **function_options):
+   folder=os.path.join(lambda_root, api_name)
+   functions={}
+   api_routes=[]
+   for method, resource, module in route_table:
+      if not os.path.exists(os.path.join(folder, f"{module}.py")):
+         print(f"Skipping {method} {resource}: no {module}.py in {api_name}")
+         continue
+      if module not in functions:
+         functions[module]=Function(folder, module, setup=setup, **function_options)
+      api_routes.append(Route(method, resource, module))
+   return LocalApi(api_routes, functions, quiet)
+
+def main():
+   parser=argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+   parser.add_argument('--api', default='full_api', choices=sorted(routes), help='Lambda folder to serve')
+   parser.add_argument('--template', help='synthesized stack template to read the routes from, e.g. cdk.out/CoreApiStack.template.json')
+   parser.add_argument('--host', default='127.0.0.1')
+   parser.add_argument('--port', type=int, default=8080)
+   parser.add_argument('--keep-warm', type=float, default=600, help='seconds an idle environment is kept, 0 for a cold start every time')
+   parser.add_argument('--init-delay', type=float, default=0, help='ms added to every cold start, for the sandbox and runtime start')
+   parser.add_argument('--max-environments', type=int, default=0, help='environments per function (reserved concurrency), 0 for no limit')
+   parser.add_argument('--timeout', type=float, default=30, help='function timeout in seconds')
+   parser.add_argument('--dynamodb-endpoint', help='DynamoDB Local URL, e.g. http://localhost:8000 (moto in-process otherwise)')
+   parser.add_argument('--valkey-url', help='local Valkey URL, e.g. redis://localhost:6379/0 (fakeredis otherwise)')
+   parser.add_argument('--no-cache', action='store_true', help='run the full_api functions without Valkey')
+   parser.add_argument('--quiet', action='store_true', help='no REPORT line per invocation')
+   args=parser.parse_args()
+
+   bucket_name=os.environ.setdefault('BUCKET_NAME', 'local-product-images')
+   os.environ['CACHE_CLUSTER_URL']='' if args.no_cache else 'localhost'
+   if args.dynamodb_endpoint:
+      os.environ['AWS_ENDPOINT_URL_DYNAMODB']=args.dynamodb_endpoint
+   else:
+      import moto
+      moto.mock_aws().start()
+   create_resources(bucket_name)
+
+   route_table=routes[args.api]
+   if args.template:
+      with open(args.template) as f:
+         route_table=routes_from_template(json.load(f))
+   api=create_api(
+      args.api, route_table,
+      setup=None if args.no_cache else cache_setup(args.valkey_url),
+      quiet=args.quiet,
+      timeout=args.timeout, keep_warm=args.keep_warm, init_delay=args.init_delay, max_environments=args.max_environments
+   )
+   server=ThreadingHTTPServer((args.host, args.port), request_handler(api))
+   server.daemon_threads=True
+   for route in api.routes:
+      print(f"{route.method:8} {route.resource:28} {api.functions[route.function].name}")
+   print(f"Serving {args.api} on http://{args.host}:{server.server_port}")
+   try:
+      server.serve_forever()
+   except KeyboardInterrupt:
+      pass
+   finally:
+      server.server_close()
+      print(json.dumps({function.name: function.summary() for function in api.functions.values()}, indent=2))
+
+if __name__ == '__main__':
+   main()
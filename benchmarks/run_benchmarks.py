@@ -0,0 +1,262 @@
+"""Benchmarks for the full_api Lambda handlers.
+
+Runs the handlers in-process against moto (DynamoDB, S3) and fakeredis or a
+local Valkey with synthetic catalogs, and reports p50/p99 latency, backend calls
+per invocation and peak memory allocated per invocation. Results are written
+to benchmarks/results so that runs from different commits can be compared.
+
+   python benchmarks/run_benchmarks.py --sizes 1000,100000
+   python benchmarks/run_benchmarks.py --compare benchmarks/results/<file>.json
+
+The stand-ins are much slower than the real services, so compare numbers
+between runs on the same machine rather than reading them as production
+latencies.
+"""
+import argparse
+import base64
+import contextlib
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from decimal import Decimal
+from io import BytesIO
+
+root_folder=os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+code_folder=os.path.join(root_folder, 'aws_developer_sample_project', 'full_api')
+common_folder=os.path.join(root_folder, 'aws_developer_sample_project', 'layers', 'common', 'python')
+results_folder=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+
+import boto3
+import botocore.client
+import fakeredis
+import moto
+import redis
+
+sys.path.insert(0, root_folder)
+from tests.unit.full_api.testing_utils import create_table
+
+categories=[f'category{i}' for i in range(50)]
+table_name='Products'
+bucket_name='benchmark-bucket'
+
+# Backend call counting
+
+calls=Counter()
+
+original_make_api_call=botocore.client.BaseClient._make_api_call
+def counting_make_api_call(self, operation_name, api_params):
+   calls[f"{self.meta.service_model.service_name}.{operation_name}"]+=1
+   return original_make_api_call(self, operation_name, api_params)
+botocore.client.BaseClient._make_api_call=counting_make_api_call
+
+# a warm invocation should not create sessions: they reload the service models
+original_session_init=boto3.session.Session.__init__
+def counting_session_init(self, *args, **kwargs):
+   calls["boto3.Session"]+=1
+   original_session_init(self, *args, **kwargs)
+boto3.session.Session.__init__=counting_session_init
+
+class CountingClient:
+   """Counts the commands sent to Valkey, a pipeline counts as one round trip"""
+   def execute_command(self, *args, **options):
+      calls[f"valkey.{args[0]}"]+=1
+      return super().execute_command(*args, **options)
+
+   def pipeline(self, *args, **kwargs):
+      pipeline=super().pipeline(*args, **kwargs)
+      execute=pipeline.execute
+      def counting_execute(*execute_args, **execute_kwargs):
+         calls["valkey.pipeline"]+=1
+         return execute(*execute_args, **execute_kwargs)
+      pipeline.execute=counting_execute
+      return pipeline
+
+class CountingFakeRedis(CountingClient, fakeredis.FakeRedis):
+   pass
+
+class CountingRedis(CountingClient, redis.Redis):
+   pass
+
+def create_cache_client(valkey_url):
+   if valkey_url:
+      client=CountingRedis.from_url(valkey_url, decode_responses=True)
+      client.flushdb()
+      return client
+   return CountingFakeRedis(decode_responses=True)
+
+# Synthetic data
+
+def make_product(i):
+   return {
+      'id': f'prod_{i:07d}',
+      'title': f'Product {i}',
+      'description': f'Description of product {i} '*4,
+      'price': Decimal(random.randint(100, 100000))/100,
+      'category': categories[i%len(categories)]
+   }
+
+def load_catalog(table, size):
+   started=time.perf_counter()
+   with table.batch_writer() as batch:
+      for i in range(size):
+         batch.put_item(Item=make_product(i))
+   print(f"Loaded {size} products in {time.perf_counter()-started:.1f}s")
+
+def create_bucket():
+   s3_client=boto3.client('s3')
+   s3_client.create_bucket(Bucket=bucket_name)
+   image=BytesIO()
+   from PIL import Image
+   Image.new('RGB', (1920, 1080), (200, 100, 50)).save(image, format='JPEG')
+   s3_client.put_object(Bucket=bucket_name, Key='incoming_product_images/prod_0000000/main.jpg', Body=image.getvalue())
+
+def random_product_id(size):
+   return f'prod_{random.randrange(size):07d}'
+
+# Scenarios: name -> (uses the catalog, function(size) that makes one invocation)
+
+def price_record(sequence_number, product_id):
+   data={'product_id': product_id, 'price': random.randint(100, 100000)/100}
+   return {
+      'eventID': f'shardId-000000000000:{sequence_number}',
+      'kinesis': {
+         'sequenceNumber': str(sequence_number),
+         'data': base64.b64encode(json.dumps(data).encode('utf-8')).decode('ascii')
+      }
+   }
+
+def make_scenarios(handlers):
+   get_product, get_products, query_products, insert_product, process_stream_prices, process_uploaded_images = handlers
+   def hot_product_ids(size):
+      return [f'prod_{i:07d}' for i in range(min(size, 20))]
+   return {
+      'get_product': (True, lambda size: get_product.handler({'pathParameters': {'id': random_product_id(size)}}, None)),
+      'get_product_hot': (True, lambda size: get_product.handler({'pathParameters': {'id': random.choice(hot_product_ids(size))}}, None)),
+      'get_products_50': (True, lambda size: get_products.handler({'queryStringParameters': {'ids': ','.join(random_product_id(size) for _ in range(50))}}, None)),
+      'query_products_page': (True, lambda size: query_products.handler({'queryStringParameters': {'limit': '100'}}, None)),
+      'query_products_category': (True, lambda size: query_products.handler({'queryStringParameters': {'category': random.choice(categories)}}, None)),
+      'insert_product': (False, lambda size: insert_product.handler({'body': json.dumps({'title': 'New product', 'price': 10, 'category': 'new'})}, None)),
+      'process_stream_prices_100': (True, lambda size: process_stream_prices.handler({'Records': [price_record(n, random_product_id(size)) for n in range(100)]}, None)),
+      'process_uploaded_images': (False, lambda size: process_uploaded_images.handler({'Records': [{'s3': {'bucket': {'name': bucket_name}, 'object': {'key': 'incoming_product_images/prod_0000000/main.jpg'}}}]}, None)),
+   }
+
+def percentile(samples, p):
+   samples=sorted(samples)
+   return samples[min(len(samples)-1, int(round(p/100*(len(samples)-1))))]
+
+def measure(name, invoke, size, iterations, warmup):
+   for _ in range(warmup):
+      invoke(size)
+   calls.clear()
+   durations=[]
+   for _ in range(iterations):
+      started=time.perf_counter()
+      invoke(size)
+      durations.append((time.perf_counter()-started)*1000)
+   per_invocation={call: count/iterations for call, count in sorted(calls.items())}
+   # allocations are measured in a separate pass, tracemalloc slows everything down
+   peaks=[]
+   for _ in range(min(iterations, 10)):
+      tracemalloc.start()
+      invoke(size)
+      peaks.append(tracemalloc.get_traced_memory()[1]/1024)
+      tracemalloc.stop()
+   return {
+      'benchmark': name,
+      'catalog_size': size,
+      'iterations': iterations,
+      'p50_ms': round(percentile(durations, 50), 3),
+      'p99_ms': round(percentile(durations, 99), 3),
+      'mean_ms': round(statistics.mean(durations), 3),
+      'calls': per_invocation,
+      'peak_kb': round(statistics.mean(peaks), 1)
+   }
+
+def run(sizes, selected, iterations, warmup, use_cache, valkey_url=None, verbose=False):
+   os.environ['CACHE_CLUSTER_URL']='localhost' if use_cache else ''
+   sys.path[:0]=[code_folder, common_folder]
+   results=[]
+   with moto.mock_aws():
+      import clients
+      import products_db
+      import get_product, get_products, query_products, insert_product, process_stream_prices, process_uploaded_images
+      scenarios=make_scenarios((get_product, get_products, query_products, insert_product, process_stream_prices, process_uploaded_images))
+      names=[name for name in scenarios if not selected or name in selected]
+      create_bucket()
+      for index, size in enumerate(sizes):
+         table=create_table()
+         load_catalog(table, size)
+         clients.register('cache', create_cache_client(valkey_url))
+         products_db.product_cache.clear()
+         for name in names:
+            uses_catalog, invoke = scenarios[name]
+            if not uses_catalog and index > 0:
+               continue # does not depend on the catalog size, once is enough
+            with contextlib.nullcontext() if verbose else contextlib.redirect_stdout(open(os.devnull, 'w')):
+               result=measure(name, invoke, size, iterations, warmup)
+            print(f"{name:28} {size:>9} p50={result['p50_ms']:9.3f}ms p99={result['p99_ms']:9.3f}ms peak={result['peak_kb']:9.1f}KB calls={result['calls']}")
+            results.append(result)
+         table.delete()
+   return results
+
+def current_commit():
+   try:
+      return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=root_folder, capture_output=True, text=True, check=True).stdout.strip()
+   except Exception:
+      return 'unknown'
+
+def compare(results, baseline_file, threshold):
+   """Prints the change against a previous run, returns False if something got slower than the threshold"""
+   with open(baseline_file) as f:
+      baseline={(r['benchmark'], r['catalog_size']): r for r in json.load(f)['results']}
+   ok=True
+   for result in results:
+      previous=baseline.get((result['benchmark'], result['catalog_size']))
+      if not previous:
+         continue
+      change=(result['p50_ms']-previous['p50_ms'])/previous['p50_ms'] if previous['p50_ms'] else 0
+      regressed=change > threshold
+      ok=ok and not regressed
+      print(f"{result['benchmark']:28} {result['catalog_size']:>9} p50 {previous['p50_ms']:9.3f} -> {result['p50_ms']:9.3f}ms ({change:+.0%}){' REGRESSION' if regressed else ''}")
+   return ok
+
+def main():
+   parser=argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+   parser.add_argument('--sizes', default='1000', help='comma separated catalog sizes, e.g. 1000,100000,1000000')
+   parser.add_argument('--benchmarks', default='', help='comma separated benchmark names (default: all)')
+   parser.add_argument('--iterations', type=int, default=50)
+   parser.add_argument('--warmup', type=int, default=5)
+   parser.add_argument('--no-cache', action='store_true', help='run without Valkey (DynamoDB only)')
+   parser.add_argument('--valkey-url', help='use a local Valkey, e.g. redis://localhost:6379/15 (default: fakeredis). The database is flushed!')
+   parser.add_argument('--verbose', action='store_true', help='show the output of the handlers')
+   parser.add_argument('--compare', help='results file of a previous run to compare with')
+   parser.add_argument('--threshold', type=float, default=0.2, help='allowed p50 slowdown when comparing (0.2 = 20%%)')
+   args=parser.parse_args()
+
+   random.seed(42)
+   sizes=[int(size) for size in args.sizes.split(',')]
+   selected=[name for name in args.benchmarks.split(',') if name]
+   results=run(sizes, selected, args.iterations, args.warmup, not args.no_cache, args.valkey_url, args.verbose)
+
+   commit=current_commit()
+   os.makedirs(results_folder, exist_ok=True)
+   results_file=os.path.join(results_folder, f"{commit}-{'nocache' if args.no_cache else 'cache'}.json")
+   with open(results_file, 'w') as f:
+      json.dump({'commit': commit, 'cache': not args.no_cache, 'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'results': results}, f, indent=2)
+   print(f"Results written to {results_file}")
+
+   if args.compare and not compare(results, args.compare, args.threshold):
+      sys.exit(1)
+
+if __name__ == '__main__':
+   main()
@@ -0,0 +1,127 @@
+"""HTTP helpers for the products API, shared by the integration tests and the load generator.
+
+The API URL is BASE_URL when it is set, for example a local server
+(http://localhost:8080), otherwise the ProductsApiUrl output of the
+STACK_NAME CloudFormation stack. Each thread keeps its own keep-alive
+connection, so concurrent callers do not pay a TCP/TLS handshake per request.
+"""
+import os
+import json
+import http.client
+import threading
+import traceback
+import urllib.parse
+from dataclasses import dataclass,asdict
+
+@dataclass
+class Product:
+   title: str
+   description: str
+   price: int
+   category: str
+   id: str = None
+
+headers = {"Content-Type": "application/json"}
+timeout = 30
+# the load generator turns it off, errors are counted there
+verbose = True
+
+def get_boto_client(service):
+   import boto3
+   if os.environ.get('ENDPOINT_URL'):
+      return boto3.client(service,endpoint_url=os.environ.get('ENDPOINT_URL'))
+   else:
+      return boto3.client(service)
+
+def get_base_url(stack_name):
+   try:
+      response = get_boto_client('cloudformation').describe_stacks(StackName=stack_name)
+      outputs = response['Stacks'][0]['Outputs']
+      api_output = next(output for output in outputs if output['OutputKey'] == 'ProductsApiUrl')
+      url = api_output['OutputValue']
+      assert url.startswith("https")
+      return url
+   except Exception as e:
+      print(f"Error retrieving API URL: {e}")
+      return None
+
+base_url = None
+
+def set_base_url(url):
+   global base_url
+   parsed = urllib.parse.urlsplit(url)
+   # plain http only to a server on this machine
+   if parsed.scheme != 'https' and not (parsed.scheme == 'http' and parsed.hostname in ('localhost', '127.0.0.1')):
+      raise ValueError(f"{url} must be https, or http on localhost")
+   base_url = url.rstrip('/')
+
+def get_api_url():
+   if base_url is None:
+      set_base_url(os.environ.get('BASE_URL') or get_base_url(os.getenv('STACK_NAME') or 'CoreApiStack'))
+   return base_url
+
+local = threading.local()
+
+def connection():
+   parsed = urllib.parse.urlsplit(get_api_url())
+   conn = getattr(local, 'connection', None)
+   if conn is None or local.netloc != parsed.netloc:
+      connection_class = http.client.HTTPSConnection if parsed.scheme == 'https' else http.client.HTTPConnection
+      conn = local.connection = connection_class(parsed.netloc, timeout=timeout)
+      local.netloc = parsed.netloc
+   return conn, parsed.path
+
+def send(method, path, data=None):
+   """Returns the status code and body text of the request; connection errors are raised"""
+   body = json.dumps(data).encode('utf-8') if data is not None else None
+   for attempt in range(2):
+      conn, prefix = connection()
+      try:
+         conn.request(method, prefix+path, body=body, headers=headers)
+         response = conn.getresponse()
+         return response.status, response.read().decode('utf-8')
+      except (http.client.HTTPException, OSError):
+         # the server may have closed the idle connection, reconnect once
+         conn.close()
+         local.connection = None
+         if attempt:
+            raise
+
+def call(method, path, data=None):
+   """Parsed JSON answer, None when the request failed or the product does not exist"""
+   try:
+      status, response_body = send(method, path, data)
+   except (http.client.HTTPException, OSError) as e:
+      if verbose:
+         print(f"Error: {e}")
+         traceback.print_exc()
+      return None
+   if 200 <= status < 300:
+      return json.loads(response_body)
+   if status != 404 and verbose:
+      print(f"Error: {status} {response_body[:200]}")
+   return None
+
+def product_fields(p):
+   data=asdict(p)
+   if 'id' in data:
+      del data['id']
+   return data
+
+def add_product(p):
+   return call('POST', '/products', product_fields(p))
+
+def update_product(p):
+   return call('PUT', f'/products/{p.id}', product_fields(p))
+
+def delete_product(id):
+   return call('DELETE', f'/products/{id}')
+
+def get_product(id):
+   return call('GET', f'/products/{id}')
+
+def get_all_products():
+   return call('GET', '/products')
+
+def get_products_by_category(cat):
+   return call('GET', f'/products?category={urllib.parse.quote(cat)}')
@@ -0,0 +1,260 @@
+"""Load generator for the products API, checking throughput and latency SLOs.
+
+Requests are sent at a fixed rate (--rps) whatever the server does, by up
+to --concurrency connections, through the helpers of api_client.py. Their
+latency is measured from the time they were scheduled, so a slow server
+also shows the time requests waited for a free connection (no coordinated
+omission).
+
+Products are picked with a Zipfian popularity (--zipf, 0 for uniform), the
+operations with --mix. The API is BASE_URL or --base-url, for example the
+containers app or the local API Gateway emulator, so changes can be
+compared without AWS:
+
+   python tests/integration/load_generator.py --base-url http://localhost:8080 \\
+      --rps 200 --duration 30 --mix get=0.9,category=0.05,add=0.05 --slo p99=100
+
+Exits with status 1 when an SLO (pNN=milliseconds, or errors=ratio) is missed.
+"""
+import argparse
+import asyncio
+import bisect
+import itertools
+import json
+import math
+import random
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import api_client
+from api_client import Product, add_product, get_product, get_all_products, get_products_by_category
+
+class Histogram:
+   """Latency histogram in microseconds with 3 significant digits, like HdrHistogram.
+
+   Values are rounded to 3 significant digits (at most 0.1% off), so the
+   memory depends on the range of the values, not on their count.
+   """
+   def __init__(self):
+      self.counts={}
+      self.count=0
+      self.total=0
+      self.max=0
+
+   @staticmethod
+   def bucket(value):
+      if value < 1000:
+         return value
+      scale=10**(int(math.log10(value))-2)
+      return value//scale*scale
+
+   def record(self, microseconds):
+      value=max(0, int(microseconds))
+      key=self.bucket(value)
+      self.counts[key]=self.counts.get(key, 0)+1
+      self.count+=1
+      self.total+=value
+      self.max=max(self.max, value)
+
+   def merge(self, other):
+      for key, count in other.counts.items():
+         self.counts[key]=self.counts.get(key, 0)+count
+      self.count+=other.count
+      self.total+=other.total
+      self.max=max(self.max, other.max)
+
+   def percentile(self, percent):
+      if not self.count:
+         return 0
+      rank=max(1, math.ceil(self.count*percent/100))
+      seen=0
+      for key in sorted(self.counts):
+         seen+=self.counts[key]
+         if seen >= rank:
+            return key
+      return self.max
+
+   def summary(self):
+      """Milliseconds of the usual percentiles"""
+      result={f"p{percent:g}": self.percentile(percent)/1000 for percent in (50, 90, 99, 99.9)}
+      result['max']=self.max/1000
+      result['mean']=round(self.total/self.count/1000, 3) if self.count else 0
+      return result
+
+class Zipf:
+   """Picks indexes 0..n-1, index k with a probability proportional to 1/(k+1)**s"""
+   def __init__(self, n, s, rng):
+      self.cumulative=list(itertools.accumulate(1/(k+1)**s for k in range(n)))
+      self.rng=rng
+
+   def __call__(self):
+      return bisect.bisect_left(self.cumulative, self.rng.random()*self.cumulative[-1])
+
+def parse_pairs(text, value_type=float):
+   pairs={}
+   for pair in text.split(','):
+      name, _, value=pair.partition('=')
+      pairs[name.strip()]=value_type(value)
+   return pairs
+
+def new_product(rng, categories):
+   return Product(
+      title=f"Load test product {uuid.uuid4().hex[:8]}",
+      description='Created by load_generator.py',
+      price=rng.randint(1, 500),
+      category=f"Load test category {rng.randrange(categories)}"
+   )
+
+def prepare_catalog(count, categories, executor, rng):
+   """Products to read: the existing ones, topped up to count with new ones"""
+   products=(get_all_products() or [])[:count]
+   missing=count-len(products)
+   if missing > 0:
+      print(f"Adding {missing} products")
+      added=list(executor.map(add_product, [new_product(rng, categories) for _ in range(missing)]))
+      products.extend(product for product in added if product)
+   if not products:
+      raise SystemExit('No products to read, is the API running?')
+   # the order is the popularity: shuffled, so popular products are spread over the table
+   rng.shuffle(products)
+   return products
+
+class LoadTest:
+   def __init__(self, products, mix, zipf, categories, rng):
+      self.products=products
+      self.operations=list(mix)
+      self.weights=list(itertools.accumulate(mix.values()))
+      self.pick=Zipf(len(products), zipf, rng)
+      self.categories=categories
+      self.rng=rng
+      self.latency={operation: Histogram() for operation in self.operations}
+      self.service={operation: Histogram() for operation in self.operations}
+      self.errors={operation: 0 for operation in self.operations}
+
+   def request(self):
+      """The operation to run and the call doing it"""
+      operation=self.operations[bisect.bisect_left(self.weights, self.rng.random()*self.weights[-1])]
+      product=self.products[self.pick()]
+      if operation=='get':
+         return operation, lambda: get_product(product['id'])
+      if operation=='category':
+         return operation, lambda: get_products_by_category(product['category'])
+      if operation=='add':
+         return operation, lambda p=new_product(self.rng, self.categories): add_product(p)
+      raise ValueError(f"unknown operation {operation}")
+
+   async def run(self, rps, duration, executor, concurrency):
+      loop=asyncio.get_running_loop()
+      pending=set()
+      slots=asyncio.Semaphore(concurrency)
+      async def send(operation, call, scheduled):
+         async with slots:
+            started=time.perf_counter()
+            result=await loop.run_in_executor(executor, call)
+            finished=time.perf_counter()
+         self.latency[operation].record((finished-scheduled)*1e6)
+         self.service[operation].record((finished-started)*1e6)
+         if result is None:
+            self.errors[operation]+=1
+      start=time.perf_counter()
+      for i in range(int(rps*duration)):
+         scheduled=start+i/rps
+         delay=scheduled-time.perf_counter()
+         if delay > 0:
+            await asyncio.sleep(delay)
+         operation, call=self.request()
+         task=asyncio.ensure_future(send(operation, call, scheduled))
+         pending.add(task)
+         task.add_done_callback(pending.discard)
+      await asyncio.gather(*pending)
+      return time.perf_counter()-start
+
+   def report(self, elapsed):
+      total=Histogram()
+      for histogram in self.latency.values():
+         total.merge(histogram)
+      errors=sum(self.errors.values())
+      return {
+         'requests': total.count,
+         'achieved_rps': round(total.count/elapsed, 1),
+         'error_ratio': round(errors/total.count, 4) if total.count else 0,
+         'latency_ms': total.summary(),
+         'operations': {
+            operation: {
+               'requests': self.latency[operation].count,
+               'errors': self.errors[operation],
+               'latency_ms': self.latency[operation].summary(),
+               'service_ms': self.service[operation].summary()
+            } for operation in self.operations
+         }
+      }
+
+def check_slos(report, slos):
+   failures=[]
+   for name, limit in slos.items():
+      if name=='errors':
+         value=report['error_ratio']
+      else:
+         value=report['latency_ms'].get(name)
+         if value is None:
+            raise SystemExit(f"unknown SLO {name}, use p50, p90, p99, p99.9, max or errors")
+      if value > limit:
+         failures.append(f"{name} is {value}, SLO {limit}")
+   return failures
+
+def print_report(report):
+   print(f"{report['requests']} requests, {report['achieved_rps']} req/s, error ratio {report['error_ratio']}")
+   print(f"{'operation':10} {'requests':>9} {'errors':>7} {'p50':>9} {'p90':>9} {'p99':>9} {'p99.9':>9} {'max':>9}  (ms)")
+   rows=[('all', report['requests'], round(report['error_ratio']*report['requests']), report['latency_ms'])]
+   rows+=[(name, values['requests'], values['errors'], values['latency_ms']) for name, values in report['operations'].items()]
+   for name, requests, errors, latency in rows:
+      print(f"{name:10} {requests:>9} {errors:>7} " + ' '.join(f"{latency[p]:>9.3f}" for p in ('p50', 'p90', 'p99', 'p99.9', 'max')))
+
+def main():
+   parser=argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+   parser.add_argument('--base-url', help='API URL, default BASE_URL or the STACK_NAME stack output')
+   parser.add_argument('--rps', type=float, default=50, help='requests per second to send')
+   parser.add_argument('--duration', type=float, default=30, help='seconds to send requests for')
+   parser.add_argument('--concurrency', type=int, default=64, help='connections, requests beyond wait for one')
+   parser.add_argument('--mix', default='get=0.9,category=0.05,add=0.05', help='weights of the get, category and add operations')
+   parser.add_argument('--products', type=int, default=1000, help='products to read, missing ones are added first')
+   parser.add_argument('--categories', type=int, default=20, help='categories of the added products')
+   parser.add_argument('--zipf', type=float, default=1.0, help='Zipf exponent of the product popularity, 0 for uniform')
+   parser.add_argument('--warmup', type=float, default=0, help='seconds of load before the measured run')
+   parser.add_argument('--seed', type=int, help='random seed, for repeatable runs')
+   parser.add_argument('--slo', help='e.g. p99=200,errors=0.001 (milliseconds, error ratio)')
+   parser.add_argument('--output', help='JSON file to write the report to')
+   args=parser.parse_args()
+
+   if args.base_url:
+      api_client.set_base_url(args.base_url)
+   api_client.verbose=False
+   rng=random.Random(args.seed)
+   mix=parse_pairs(args.mix)
+   slos=parse_pairs(args.slo) if args.slo else {}
+
+   with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+      products=prepare_catalog(args.products, args.categories, executor, rng)
+      if args.warmup:
+         asyncio.run(LoadTest(products, mix, args.zipf, args.categories, rng).run(args.rps, args.warmup, executor, args.concurrency))
+      print(f"Sending {args.rps:g} req/s for {args.duration:g}s to {api_client.get_api_url()}")
+      load_test=LoadTest(products, mix, args.zipf, args.categories, rng)
+      elapsed=asyncio.run(load_test.run(args.rps, args.duration, executor, args.concurrency))
+
+   report=load_test.report(elapsed)
+   report['settings']={name: value for name, value in vars(args).items() if name!='output'}
+   print_report(report)
+   if args.output:
+      with open(args.output, 'w') as f:
+         json.dump(report, f, indent=2)
+   failures=check_slos(report, slos)
+   if report['achieved_rps'] < args.rps*0.95:
+      print(f"\nOnly {report['achieved_rps']} of {args.rps:g} req/s were sent, the server (or this machine) could not keep up")
+   if failures:
+      print('\n'+'\n'.join(failures))
+      sys.exit(1)
+
+if __name__ == '__main__':
+   main()
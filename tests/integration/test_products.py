@@ -1,22 +1,7 @@
-import os
-import sys
-import boto3
-from dataclasses import dataclass,asdict
-import urllib.request
-import urllib.parse
-import json
-import traceback
 import unittest
 import copy
 import uuid
-
-@dataclass 
-class Product:
-   title: str
-   description: str
-   price: int
-   category: str
-   id: str = None
+from api_client import Product, add_product, update_product, delete_product, get_product, get_all_products, get_products_by_category
 
 sample_product = Product(
    title='Sample Product',
@@ -25,130 +10,6 @@ sample_product = Product(
    category='Sample Category'
 )
 
-headers = {"Content-Type": "application/json"}
-
-def get_boto_client(service):
-   if os.environ.get('ENDPOINT_URL'):
-      return boto3.client(service,endpoint_url=os.environ.get('ENDPOINT_URL'))
-   else:    
-      return boto3.client(service)
-   
-def get_base_url(stack_name):
-   try:
-      response = get_boto_client('cloudformation').describe_stacks(StackName=stack_name)
-      outputs = response['Stacks'][0]['Outputs']
-      api_output = next(output for output in outputs if output['OutputKey'] == 'ProductsApiUrl')
-      url = api_output['OutputValue']
-      assert url.startswith("https")
-      return url
-   except Exception as e:
-      print(f"Error retrieving API URL: {e}")
-      return None
-
-
-stack_name=os.getenv('STACK_NAME') or 'CoreApiStack'
-base_url=get_base_url(stack_name)
-
-
-def safely_open(request):
-   if request.type=="https":
-      return urllib.request.urlopen(request)
-
-def add_product(p):
-   url=base_url+'/products'
-   method='POST'
-   data=asdict(p)
-   if 'id' in data:
-      del data['id']
-   try:
-      encoded_data = json.dumps(data).encode('utf-8')
-      assert url.startswith('https')
-      req = urllib.request.Request(url, data=encoded_data,method=method, headers=headers)
-      with safely_open(req) as response:
-         response_body = response.read().decode('utf-8')
-         return json.loads(response_body)
-   except urllib.error.URLError as e:
-      print(f"Error: {e.reason}")
-      traceback.print_exc()
-      return None
-
-def update_product(p):
-   url=base_url+f'/products/{p.id}'
-   method='PUT'
-   data=asdict(p)
-   if 'id' in data:
-      del data['id']
-   try:
-      encoded_data = json.dumps(data).encode('utf-8')
-      assert url.startswith('https')
-      req = urllib.request.Request(url, data=encoded_data, method=method, headers=headers)
-      with safely_open(req) as response:
-         response_body = response.read().decode('utf-8')
-         return json.loads(response_body)
-   except urllib.error.URLError as e:
-      print(f"Error: {e.reason}")
-      traceback.print_exc()
-      return None
-
-def delete_product(id):
-   url=base_url+f'/products/{id}'
-   method='DELETE'
-   try:
-      req = urllib.request.Request(url, method=method, headers=headers)
-      assert req.type=='https'
-      with safely_open(req) as response:
-         response_body = response.read().decode('utf-8')
-         return json.loads(response_body)
-   except urllib.error.URLError as e:
-      print(f"Error: {e.reason}")
-      traceback.print_exc()
-      return None
-
-def get_product(id):
-   url=base_url+f'/products/{id}'
-   method='GET'
-   try:
-      req = urllib.request.Request(url,method='GET')
-      with safely_open(req) as response:
-         response_body = response.read().decode('utf-8')
-         return json.loads(response_body)
-   except urllib.error.URLError as e:
-      if e.code==404:
-         return None
-      print(f"Error: {e.reason}")
-      traceback.print_exc()
-      return None
-
-def get_all_products():
-   url=base_url+f'/products'
-   method='GET'
-   try:
-      req = urllib.request.Request(url,method='GET')
-      with safely_open(req) as response:
-         response_body = response.read().decode('utf-8')
-         return json.loads(response_body)
-   except urllib.error.URLError as e:
-      if e.code==404:
-         return None
-      print(f"Error: {e.reason}")
-      traceback.print_exc()
-      return None
-
-def get_products_by_category(cat):
-   url=base_url+f'/products?category={cat}'
-   method='GET'
-   try:
-      req = urllib.request.Request(url,method='GET')
-      with safely_open(req) as response:
-         response_body = response.read().decode('utf-8')
-         return json.loads(response_body)
-   except urllib.error.URLError as e:
-      if e.code==404:
-         return None
-      print(f"Error: {e.reason}")
-      traceback.print_exc()
-      return None
-
 class TestProducts(unittest.TestCase):
    def test_add_product(self):
       p=add_product(sample_product)
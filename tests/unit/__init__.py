@@ -0,0 +1,7 @@
+import os
+import sys
+
+# the common layer of the Lambda functions, on sys.path like /opt/python
+common_folder=os.path.abspath('aws_developer_sample_project/layers/common/python')
+if common_folder not in sys.path:
+   sys.path.append(common_folder)
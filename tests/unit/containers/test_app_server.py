@@ -0,0 +1,49 @@
+import os
+import sys
+import unittest
+from unittest.mock import patch, mock_open
+
+folder_to_add = os.path.abspath('aws_developer_sample_project/containers')
+sys.path.append(folder_to_add)
+
+class TestHealthz(unittest.TestCase):
+   def test_healthz(self):
+      import importlib.util
+      # the repository root has an app.py too (the CDK app)
+      spec=importlib.util.spec_from_file_location('containers_app', os.path.join(folder_to_add, 'app.py'))
+      app=importlib.util.module_from_spec(spec)
+      spec.loader.exec_module(app)
+      with patch.object(app, 'render_template', side_effect=AssertionError('template rendered')):
+         answer=app.app.test_client().get('/healthz')
+      self.assertEqual(answer.status_code, 200)
+      self.assertEqual(answer.get_data(as_text=True), 'ok')
+
+class TestGunicornConfig(unittest.TestCase):
+   def load_config(self, **environ):
+      import runpy
+      with patch.dict(os.environ, environ):
+         return runpy.run_path(os.path.join(folder_to_add, 'gunicorn.conf.py'))
+
+   def test_cpus_from_cgroup_quota(self):
+      with patch('builtins.open', mock_open(read_data='25000 100000\n')):
+         config=self.load_config(WEB_CONCURRENCY='', GUNICORN_THREADS='')
+      # 0.25 vCPU counts as one CPU
+      self.assertEqual(config['cpus'], 1)
+      self.assertEqual(config['workers'], 3)
+      self.assertEqual(config['threads'], 4)
+      self.assertEqual(config['worker_class'], 'gthread')
+
+   def test_async_workers(self):
+      with patch('builtins.open', mock_open(read_data='200000 100000\n')):
+         config=self.load_config(WEB_CONCURRENCY='', APP_MODULE='async_app:app', GUNICORN_WORKER_CLASS='uvicorn.workers.UvicornWorker')
+      # one event loop per CPU
+      self.assertEqual(config['workers'], 2)
+      self.assertEqual(config['wsgi_app'], 'async_app:app')
+
+   def test_overrides(self):
+      config=self.load_config(WEB_CONCURRENCY='2', GUNICORN_THREADS='8')
+      self.assertEqual(config['workers'], 2)
+      self.assertEqual(config['threads'], 8)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import asyncio
+import importlib.util
+import json
+import os
+import sys
+import unittest
+from unittest.mock import patch, AsyncMock
+
+folder_to_add = os.path.abspath('aws_developer_sample_project/containers')
+sys.path.append(folder_to_add)
+
+installed = all(importlib.util.find_spec(name) for name in ('quart', 'aioboto3'))
+
+@unittest.skipUnless(installed, 'quart and aioboto3 are not installed')
+class TestAsyncApp(unittest.TestCase):
+   def setUp(self):
+      import async_app
+      self.async_app=async_app
+      self.products_db=async_app.products_db
+      # no DynamoDB table to open
+      self.patchers=[
+         patch.object(self.products_db, 'open_table', AsyncMock()),
+         patch.object(self.products_db, 'close_table', AsyncMock())
+      ]
+      for patcher in self.patchers:
+         patcher.start()
+
+   def tearDown(self):
+      for patcher in self.patchers:
+         patcher.stop()
+
+   def get(self, path):
+      async def request():
+         async with self.async_app.app.test_app() as test_app:
+            response=await test_app.test_client().get(path)
+            return response.status_code, await response.get_data(as_text=True)
+      return asyncio.run(request())
+
+   def test_healthz(self):
+      self.assertEqual(self.get('/healthz'), (200, 'ok'))
+
+   def test_get_product(self):
+      with patch.object(self.products_db, 'get_product', AsyncMock(return_value={'id': '1'})):
+         status, body=self.get('/products/1')
+      self.assertEqual(status, 200)
+      self.assertEqual(json.loads(body), {'id': '1'})
+      with patch.object(self.products_db, 'get_product', AsyncMock(return_value=None)):
+         self.assertEqual(self.get('/products/2')[0], 404)
+
+   def test_get_products_concurrently(self):
+      in_flight=[0, 0] # current, highest
+      async def get_batch(keys):
+         in_flight[0]+=1
+         in_flight[1]=max(in_flight)
+         await asyncio.sleep(0.01)
+         in_flight[0]-=1
+         return [{'id': key['id']} for key in keys if key['id']!='missing']
+      ids=[str(i) for i in range(250)]+['missing']
+      with patch.object(self.products_db, 'get_batch', get_batch):
+         status, body=self.get('/products?ids='+','.join(ids))
+      self.assertEqual(status, 200)
+      self.assertEqual([p['id'] for p in json.loads(body)], ids[:-1])
+      # three batches of at most 100 keys, all in flight together
+      self.assertEqual(in_flight[1], 3)
+
+   def test_streaming(self):
+      async def pages():
+         yield [{'id': '1'}, {'id': '2'}], {'id': '2'}
+         yield [{'id': '3'}], None
+      with patch.object(self.products_db, 'scan_pages', lambda: pages()):
+         status, body=self.get('/products')
+      self.assertEqual(status, 200)
+      self.assertEqual([p['id'] for p in json.loads(body)], ['1', '2', '3'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,154 @@
+import asyncio
+import contextlib
+import importlib.util
+import os
+import sys
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch, AsyncMock, MagicMock
+
+folder_to_add = os.path.abspath('aws_developer_sample_project/containers')
+sys.path.append(folder_to_add)
+
+def stub_table(**operations):
+   """A stand-in for the aioboto3 Table, with the given async operations"""
+   table=SimpleNamespace(**operations)
+   table.meta=SimpleNamespace(client=SimpleNamespace(**operations))
+   return table
+
+@unittest.skipUnless(importlib.util.find_spec('aioboto3'), 'aioboto3 is not installed')
+class TestAsyncProductsDb(unittest.TestCase):
+   def setUp(self):
+      import async_products_db
+      self.products_db=async_products_db
+      self.table_name=async_products_db.table_name
+
+   def run_with_table(self, table, coroutine_function, *args):
+      async def run():
+         with patch.object(self.products_db, 'table', table):
+            return await coroutine_function(*args)
+      return asyncio.run(run())
+
+   def test_open_table(self):
+      table=stub_table()
+      resource=MagicMock()
+      resource.Table=AsyncMock(return_value=table)
+      opened=[]
+      @contextlib.asynccontextmanager
+      async def open_resource(service_name, config):
+         opened.append(service_name)
+         yield resource
+         opened.remove(service_name)
+      session=SimpleNamespace(resource=open_resource)
+      async def open_and_close():
+         await self.products_db.open_table()
+         self.assertIs(self.products_db.table, table)
+         self.assertEqual(opened, ['dynamodb'])
+         await self.products_db.close_table()
+      with patch.object(self.products_db, 'session', session):
+         asyncio.run(open_and_close())
+      resource.Table.assert_awaited_once_with(self.table_name)
+      self.assertEqual(opened, [])
+      self.assertIsNone(self.products_db.table)
+
+   def test_unprocessed_keys_retried(self):
+      keys=[{'id': '1'}, {'id': '2'}]
+      batch_get_item=AsyncMock(side_effect=[
+         {'Responses': {self.table_name: [{'id': '1'}]}, 'UnprocessedKeys': {self.table_name: {'Keys': keys[1:]}}},
+         {'Responses': {self.table_name: [{'id': '2'}]}, 'UnprocessedKeys': {}}
+      ])
+      sleep=AsyncMock()
+      with patch('asyncio.sleep', sleep):
+         items=self.run_with_table(stub_table(batch_get_item=batch_get_item), self.products_db.get_batch, keys)
+      self.assertEqual(items, [{'id': '1'}, {'id': '2'}])
+      self.assertEqual(batch_get_item.await_args_list[1].kwargs['RequestItems'], {self.table_name: {'Keys': keys[1:]}})
+      sleep.assert_awaited_once_with(0.05)
+
+   def test_unprocessed_keys_give_up(self):
+      keys=[{'id': '1'}, {'id': '2'}]
+      batch_get_item=AsyncMock(return_value={
+         'Responses': {},
+         'UnprocessedKeys': {self.table_name: {'Keys': keys}}
+      })
+      sleep=AsyncMock()
+      with patch('asyncio.sleep', sleep):
+         with self.assertRaisesRegex(RuntimeError, 'Could not get 2 products after 5 attempts'):
+            self.run_with_table(stub_table(batch_get_item=batch_get_item), self.products_db.get_batch, keys)
+      self.assertEqual(batch_get_item.await_count, 5)
+      self.assertEqual([c.args[0] for c in sleep.await_args_list], [0.05, 0.1, 0.2, 0.4, 0.8])
+
+   def test_get_products(self):
+      in_flight=[0, 0] # current, highest
+      async def batch_get_item(RequestItems):
+         in_flight[0]+=1
+         in_flight[1]=max(in_flight)
+         await asyncio.sleep(0.01)
+         in_flight[0]-=1
+         keys=RequestItems[self.table_name]['Keys']
+         self.assertLessEqual(len(keys), 100)
+         return {'Responses': {self.table_name: [key for key in keys if key['id']!='missing']}}
+      ids=[str(i) for i in range(250)]
+      products=self.run_with_table(stub_table(batch_get_item=batch_get_item), self.products_db.get_products, ['missing']+ids+ids[:5])
+      # in the order asked for, without duplicates or missing products
+      self.assertEqual([p['id'] for p in products], ids)
+      # three batches, all in flight together
+      self.assertEqual(in_flight[1], 3)
+
+   def test_next_page_requested_ahead(self):
+      calls=[]
+      async def scan(**kwargs):
+         calls.append(kwargs.get('ExclusiveStartKey'))
+         page=len(calls)
+         return {'Items': [{'id': str(page)}], **({'LastEvaluatedKey': {'id': str(page)}} if page < 3 else {})}
+      async def read_pages():
+         pages=[]
+         async for items, last_evaluated_key in self.products_db.iterate_pages(scan):
+            # the next page is on its way while the caller handles this one
+            await asyncio.sleep(0)
+            pages.append((len(calls), [item['id'] for item in items], last_evaluated_key))
+         return pages
+      pages=asyncio.run(read_pages())
+      self.assertEqual(pages, [(2, ['1'], {'id': '1'}), (3, ['2'], {'id': '2'}), (3, ['3'], None)])
+      self.assertEqual(calls, [None, {'id': '1'}, {'id': '2'}])
+
+   def test_pending_page_cancelled(self):
+      cancelled=[]
+      async def scan(**kwargs):
+         if 'ExclusiveStartKey' not in kwargs:
+            return {'Items': [{'id': '1'}], 'LastEvaluatedKey': {'id': '1'}}
+         try:
+            await asyncio.Event().wait()
+         except asyncio.CancelledError:
+            cancelled.append(kwargs['ExclusiveStartKey'])
+            raise
+      async def first_page():
+         async with contextlib.aclosing(self.products_db.iterate_pages(scan)) as pages:
+            async for items, _ in pages:
+               await asyncio.sleep(0)
+               return items
+      self.assertEqual(asyncio.run(first_page()), [{'id': '1'}])
+      self.assertEqual(cancelled, [{'id': '1'}])
+
+   def test_parallel_scan(self):
+      async def scan(Segment, TotalSegments, ExclusiveStartKey=None):
+         self.assertEqual(TotalSegments, 3)
+         if ExclusiveStartKey is None:
+            return {'Items': [{'id': f'{Segment}-a'}], 'LastEvaluatedKey': {'id': f'{Segment}-a'}}
+         return {'Items': [{'id': f'{Segment}-b'}]}
+      async def scan_all():
+         return [item['id'] async for item in self.products_db.parallel_scan(3)]
+      ids=self.run_with_table(stub_table(scan=scan), scan_all)
+      self.assertEqual(sorted(ids), sorted(f'{segment}-{page}' for segment in range(3) for page in 'ab'))
+
+   def test_parallel_scan_error(self):
+      async def scan(Segment, TotalSegments, ExclusiveStartKey=None):
+         if Segment==1:
+            raise RuntimeError('throttled')
+         return {'Items': [{'id': str(Segment)}]}
+      async def scan_all():
+         return [item async for item in self.products_db.parallel_scan(2)]
+      with self.assertRaisesRegex(RuntimeError, 'throttled'):
+         self.run_with_table(stub_table(scan=scan), scan_all)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import os
+import sys
+import json
+import importlib.util
+import unittest
+import boto3
+import fakeredis
+import moto
+from unittest.mock import patch
+
+folder_to_add = os.path.abspath('aws_developer_sample_project/containers')
+sys.path.append(folder_to_add)
+
+def load_app():
+   # the repository root has an app.py too (the CDK app)
+   spec=importlib.util.spec_from_file_location('containers_app', os.path.join(folder_to_add, 'app.py'))
+   app=importlib.util.module_from_spec(spec)
+   spec.loader.exec_module(app)
+   return app
+
+@moto.mock_aws
+class TestResponseCache(unittest.TestCase):
+   def setUp(self):
+      boto3.resource('dynamodb', region_name='us-east-1').create_table(
+         TableName='Products',
+         KeySchema=[{'AttributeName': 'id', 'KeyType': 'HASH'}],
+         AttributeDefinitions=[
+            {'AttributeName': 'id', 'AttributeType': 'S'},
+            {'AttributeName': 'category', 'AttributeType': 'S'}
+         ],
+         BillingMode='PAY_PER_REQUEST',
+         GlobalSecondaryIndexes=[{
+            'IndexName': 'category-index',
+            'KeySchema': [{'AttributeName': 'category', 'KeyType': 'HASH'}],
+            'Projection': {'ProjectionType': 'ALL'}
+         }]
+      )
+      self.app=load_app()
+      self.products_db=self.app.products_db
+      self.response_cache=self.app.response_cache
+      self.products_db.table=boto3.resource('dynamodb', region_name='us-east-1').Table('Products')
+      self.response_cache.clear()
+      self.client=self.app.app.test_client()
+      self.first=self.insert({'title': 'Product 1', 'price': 10, 'category': 'category1'})
+
+   def insert(self, product):
+      answer=self.client.post('/products', json=product)
+      self.assertEqual(answer.status_code, 201)
+      return answer.get_json()
+
+   def get(self, path):
+      answer=self.client.get(path)
+      self.assertEqual(answer.status_code, 200)
+      return json.loads(answer.get_data(as_text=True))
+
+   def test_listing_read_once(self):
+      with patch.object(self.products_db, 'scan_pages', wraps=self.products_db.scan_pages) as scan_pages:
+         self.assertEqual(len(self.get('/products')), 1)
+         self.assertEqual(len(self.get('/products')), 1)
+         self.assertEqual(scan_pages.call_count, 1)
+         # other query parameters, other response
+         self.get('/products?limit=10')
+         self.get('/products?limit=10')
+         self.assertEqual(scan_pages.call_count, 2)
+
+   def test_invalidated_on_writes(self):
+      self.assertEqual(len(self.get('/products?category=category1')), 1)
+      self.assertEqual(self.get(f"/products/{self.first['id']}")['title'], 'Product 1')
+      self.insert({'title': 'Product 2', 'price': 20, 'category': 'category1'})
+      self.assertEqual(len(self.get('/products?category=category1')), 2)
+      self.client.delete(f"/products/{self.first['id']}")
+      self.assertEqual(len(self.get('/products?category=category1')), 1)
+      self.assertEqual(self.client.get(f"/products/{self.first['id']}").status_code, 404)
+
+   def test_stale_load_not_cached(self):
+      generation=self.response_cache.generation('products')
+      self.response_cache.invalidate('products')
+      self.response_cache.store('products', '', '[]', generation)
+      self.assertIsNone(self.response_cache.get('products', ''))
+
+   def test_shared_cache(self):
+      shared=fakeredis.FakeRedis(decode_responses=True)
+      with patch.object(self.response_cache, 'shared', shared), patch.object(self.response_cache, 'shared_created', True):
+         self.get('/products?category=category1')
+         self.assertIsNotNone(shared.hget('response:category:category1', 'category=category1'))
+         self.assertGreater(shared.ttl('response:category:category1'), 0)
+         # another task: nothing in its local cache
+         self.response_cache.local.clear()
+         with patch.object(self.products_db, 'category_pages', side_effect=AssertionError('table read')):
+            self.assertEqual(len(self.get('/products?category=category1')), 1)
+         self.insert({'title': 'Product 2', 'price': 20, 'category': 'category1'})
+         self.assertIsNone(shared.hget('response:category:category1', 'category=category1'))
+
+   def test_shared_stale_load_not_cached(self):
+      shared=fakeredis.FakeRedis(decode_responses=True)
+      with patch.object(self.response_cache, 'shared', shared), patch.object(self.response_cache, 'shared_created', True):
+         generation=self.response_cache.generation('products')
+         # another task invalidates while this one loads
+         other_task=self.response_cache.local_generation('products')
+         shared.incr('generation:products')
+         self.response_cache.store('products', '', '[]', generation)
+         self.assertIsNone(shared.hget('response:products', ''))
+         self.assertIsNone(self.response_cache.get('products', ''))
+         self.assertEqual(self.response_cache.local_generation('products'), other_task)
+         # loaded after the invalidation
+         self.response_cache.store('products', '', '[]', self.response_cache.generation('products'))
+         self.assertEqual(shared.hget('response:products', ''), '[]')
+
+   def test_shared_errors_are_logged(self):
+      server=fakeredis.FakeServer()
+      server.connected=False
+      shared=fakeredis.FakeRedis(server=server, decode_responses=True)
+      with patch.object(self.response_cache, 'shared', shared), patch.object(self.response_cache, 'shared_created', True):
+         with self.assertLogs(self.response_cache.logger, 'WARNING') as logs:
+            self.assertEqual(len(self.get('/products?category=category1')), 1)
+         self.assertTrue(all('Valkey error' in line for line in logs.output))
+         # still cached in the task
+         self.assertIsNotNone(self.response_cache.get('category:category1', 'category=category1'))
+
+if __name__ == '__main__':
+    unittest.main()
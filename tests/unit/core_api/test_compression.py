@@ -0,0 +1,74 @@
+import unittest
+import moto
+import json
+import gzip
+import base64
+from unittest.mock import patch
+from .testing_utils import create_resources,sample_products,load_path
+
+@load_path
+class TestChooseEncoding(unittest.TestCase):
+   def setUp(self):
+      import aws_developer_sample_project.core_api.response_utils as response_utils
+      self.response_utils=response_utils
+
+   def test_choose_encoding(self):
+      with patch.object(self.response_utils, 'compressors', {'br': None, 'gzip': None}):
+         choose_encoding=self.response_utils.choose_encoding
+         self.assertIsNone(choose_encoding(None))
+         self.assertIsNone(choose_encoding('identity'))
+         self.assertEqual(choose_encoding('gzip, deflate'), 'gzip')
+         self.assertEqual(choose_encoding('gzip, deflate, br'), 'br')
+         self.assertEqual(choose_encoding('br;q=0.5, gzip;q=0.8'), 'gzip')
+         self.assertEqual(choose_encoding('br;q=0, *'), 'gzip')
+         self.assertIsNone(choose_encoding('gzip;q=0'))
+
+@moto.mock_aws
+@load_path
+class TestCompression(unittest.TestCase):
+   def setUp(self):
+      import aws_developer_sample_project.core_api.products_db as products_db
+      create_resources(products_db)
+      for i in range(3, 50):
+         products_db.upsert_product(str(i), {'title': f'Product {i}', 'description': 'A product description', 'category': 'category1'})
+
+      import aws_developer_sample_project.core_api.query_products as query_products
+      import aws_developer_sample_project.core_api.insert_product as insert_product
+      self.query_products=query_products
+      self.insert_product=insert_product
+
+   def test_gzip(self):
+      answer=self.query_products.handler({'queryStringParameters': None}, None)
+      self.assertNotIn('isBase64Encoded', answer)
+      self.assertEqual(answer['headers']['Vary'], 'Accept-Encoding')
+      compressed=self.query_products.handler({'queryStringParameters': None, 'headers': {'Accept-Encoding': 'gzip'}}, None)
+      self.assertTrue(compressed['isBase64Encoded'])
+      self.assertEqual(compressed['headers']['Content-Encoding'], 'gzip')
+      self.assertEqual(compressed['headers']['ETag'], 'W/'+answer['headers']['ETag'])
+      body=gzip.decompress(base64.b64decode(compressed['body'])).decode('utf-8')
+      self.assertEqual(body, answer['body'])
+      self.assertLess(len(base64.b64decode(compressed['body'])), len(answer['body'])/5)
+
+   def test_small_bodies_are_not_compressed(self):
+      answer=self.query_products.handler({'queryStringParameters': {'category': 'category2'}, 'headers': {'Accept-Encoding': 'gzip'}}, None)
+      self.assertEqual(json.loads(answer['body'])[0]['id'], '2')
+      self.assertNotIn('Content-Encoding', answer['headers'])
+
+   def test_base64_request_body(self):
+      body=base64.b64encode(json.dumps({'title': 'New', 'price': 5, 'category': 'category1'}).encode('utf-8')).decode('ascii')
+      answer=self.insert_product.handler({'body': body, 'isBase64Encoded': True}, None)
+      self.assertEqual(answer['statusCode'], 201)
+      self.assertEqual(json.loads(answer['body'])['title'], 'New')
+
+   def test_status_code_is_kept(self):
+      from aws_developer_sample_project.core_api.response_utils import create_success_response
+      products=[{'id': str(i), 'title': f'Product {i}', 'description': 'A product description'} for i in range(50)]
+      answer=create_success_response(201, products, {'headers': {'Accept-Encoding': 'gzip'}})
+      self.assertEqual(answer['statusCode'], 201)
+      self.assertEqual(answer['headers']['Content-Encoding'], 'gzip')
+      # a 201 is never turned into a 304
+      answer=create_success_response(201, products, {'headers': {'If-None-Match': answer['headers']['ETag']}})
+      self.assertEqual(answer['statusCode'], 201)
+
+if __name__ == '__main__':
+    unittest.main()
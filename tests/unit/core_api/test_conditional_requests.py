@@ -0,0 +1,50 @@
+import unittest
+import moto
+import json
+from .testing_utils import create_resources,sample_products,stored_products,load_path
+
+@moto.mock_aws
+@load_path
+class TestConditionalRequests(unittest.TestCase):
+   def setUp(self):
+      import aws_developer_sample_project.core_api.products_db as products_db
+      self.products_db = products_db
+
+      import aws_developer_sample_project.core_api.get_product as get_product
+      import aws_developer_sample_project.core_api.query_products as query_products
+      self.get_product=get_product
+      self.query_products=query_products
+      create_resources(self.products_db)
+
+   def get(self, headers=None):
+      return self.get_product.handler({'pathParameters': {'id': '1'}, 'headers': headers}, None)
+
+   def test_etag(self):
+      answer=self.get()
+      self.assertEqual(answer['statusCode'], 200)
+      self.assertEqual(json.loads(answer['body']), stored_products[0])
+      etag=answer['headers']['ETag']
+      self.assertEqual(answer['headers']['Cache-Control'], 'no-cache')
+      # same content, same ETag
+      self.assertEqual(self.get()['headers']['ETag'], etag)
+
+      answer=self.get({'if-none-match': etag})
+      self.assertEqual(answer['statusCode'], 304)
+      self.assertNotIn('body', answer)
+      self.assertEqual(answer['headers']['ETag'], etag)
+      self.assertEqual(self.get({'If-None-Match': f'"other", W/{etag}'})['statusCode'], 304)
+
+   def test_modified(self):
+      etag=self.get()['headers']['ETag']
+      self.products_db.upsert_product('1', {**sample_products[0], 'price': 11})
+      answer=self.get({'If-None-Match': etag})
+      self.assertEqual(answer['statusCode'], 200)
+      self.assertNotEqual(answer['headers']['ETag'], etag)
+
+   def test_query_products(self):
+      answer=self.query_products.handler({'queryStringParameters': None}, None)
+      answer=self.query_products.handler({'queryStringParameters': None, 'headers': {'If-None-Match': answer['headers']['ETag']}}, None)
+      self.assertEqual(answer['statusCode'], 304)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+import moto
+import json
+import threading
+from unittest.mock import patch
+from .testing_utils import create_resources,sample_products,load_path
+
+@moto.mock_aws
+@load_path
+class TestExportProducts(unittest.TestCase):
+   def setUp(self):
+      import aws_developer_sample_project.core_api.products_db as products_db
+      self.products_db = products_db
+
+      import aws_developer_sample_project.core_api.export_products as export_products
+      self.export_products=export_products
+      create_resources(self.products_db)
+      for i in range(3, 40):
+         self.products_db.upsert_product(str(i), {'title': f'Product {i}', 'category': 'category1'})
+
+   def test_export(self):
+      answer = self.export_products.handler({'queryStringParameters': {'segments': '3'}}, None)
+      self.assertEqual(answer['statusCode'], 200)
+      self.assertEqual(answer['headers']['Content-Type'], 'application/x-ndjson')
+      products=[json.loads(line) for line in answer['body'].splitlines()]
+      self.assertEqual(sorted(p['id'] for p in products), sorted(['1','2']+[str(i) for i in range(3, 40)]))
+
+   def export_all(self, query_parameters):
+      products=[]
+      pages=0
+      while True:
+         answer = self.export_products.handler({'queryStringParameters': query_parameters}, None)
+         self.assertEqual(answer['statusCode'], 200)
+         products+=[json.loads(line) for line in answer['body'].splitlines()]
+         pages+=1
+         next_token=answer['headers'].get('X-Next-Token')
+         if not next_token:
+            return products, pages
+         query_parameters={**query_parameters, 'next': next_token}
+
+   def test_pages(self):
+      all_ids=sorted(p['id'] for p in self.products_db.get_all_products())
+      for segments in ['1', '4']:
+         products, pages=self.export_all({'segments': segments, 'limit': '8'})
+         self.assertEqual(sorted(p['id'] for p in products), all_ids)
+         self.assertGreaterEqual(pages, 5)
+
+   def test_page_size(self):
+      products, next_token=self.products_db.export_page(4, 8)
+      self.assertLessEqual(len(products), 8)
+      self.assertIsNotNone(next_token)
+
+   def test_bad_parameters(self):
+      for query_parameters in [{'limit': '0'}, {'limit': '100000'}, {'next': 'abc'}, {'next': self.products_db.encode_page_token({'segments': 2, 'keys': {'5': {'id': '1'}}})}]:
+         answer = self.export_products.handler({'queryStringParameters': query_parameters}, None)
+         self.assertEqual(answer['statusCode'], 400, query_parameters)
+
+   def test_segments_run_together(self):
+      products_db=self.export_products.products_db
+      # every segment waits for all the others, a smaller pool would time out
+      barrier=threading.Barrier(products_db.max_segments, timeout=5)
+      def scan_segment(segment, total_segments, limit, start_key=None):
+         barrier.wait()
+         return [{'id': str(segment)}], None
+      with patch.object(products_db, 'scan_segment', scan_segment):
+         answer = self.export_products.handler({'queryStringParameters': {'segments': str(products_db.max_segments)}}, None)
+      self.assertEqual(answer['statusCode'], 200)
+      self.assertEqual(len(answer['body'].splitlines()), products_db.max_segments)
+
+   def test_bad_segments(self):
+      answer = self.export_products.handler({'queryStringParameters': {'segments': '100'}}, None)
+      self.assertEqual(answer['statusCode'], 400)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,7 +4,7 @@ import moto
 import os
 import json
 from unittest.mock import patch
-from .testing_utils import create_resources,sample_products,load_path
+from .testing_utils import create_resources,sample_products,stored_products,load_path
 
 @moto.mock_aws
 @load_path
@@ -27,7 +27,7 @@ class TestGetProducts(unittest.TestCase):
       answer = self.get_product.handler(event, None)
       self.assertEqual(answer['statusCode'], 200)
       product=json.loads(answer['body'])
-      self.assertEqual(product,sample_products[0])
+      self.assertEqual(product,stored_products[0])
       
    def test_get__non_existing_product(self):
       product_id = 'does not exist'
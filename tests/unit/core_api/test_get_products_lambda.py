@@ -0,0 +1,61 @@
+import unittest
+import moto
+import json
+from unittest.mock import patch
+from .testing_utils import create_resources,sample_products,stored_products,load_path
+
+@moto.mock_aws
+@load_path
+class TestGetProducts(unittest.TestCase):
+   def setUp(self):
+      import aws_developer_sample_project.core_api.products_db as products_db
+      self.products_db = products_db
+
+      import aws_developer_sample_project.core_api.get_products as get_products
+      self.get_products=get_products
+      create_resources(self.products_db)
+
+   def test_get_existing_products(self):
+      event={
+         'queryStringParameters': {
+            'ids': '2,does not exist,1,2'
+         }
+      }
+      answer = self.get_products.handler(event, None)
+      self.assertEqual(answer['statusCode'], 200)
+      products=json.loads(answer['body'])
+      self.assertEqual(products,[stored_products[1],stored_products[0]])
+
+   def test_many_products(self):
+      for i in range(150):
+         self.products_db.upsert_product(f'p{i}', {'title': f'Product {i}', 'category': 'many'})
+      products=self.products_db.get_products([f'p{i}' for i in range(150)])
+      self.assertEqual([p['id'] for p in products], [f'p{i}' for i in range(150)])
+
+   def test_no_params(self):
+      answer = self.get_products.handler({}, None)
+      self.assertEqual(answer['statusCode'], 400)
+      self.assertEqual(answer['body'], 'Product ids are required')
+
+   def test_too_many_ids(self):
+      event={
+         'queryStringParameters': {
+            'ids': ','.join(str(i) for i in range(101))
+         }
+      }
+      answer = self.get_products.handler(event, None)
+      self.assertEqual(answer['statusCode'], 400)
+
+   def test_query_products_with_ids(self):
+      import aws_developer_sample_project.core_api.query_products as query_products
+      event={
+         'queryStringParameters': {
+            'ids': '1'
+         }
+      }
+      answer = query_products.handler(event, None)
+      self.assertEqual(answer['statusCode'], 200)
+      self.assertEqual(json.loads(answer['body']),[stored_products[0]])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,31 @@
+import unittest
+import json
+from decimal import Decimal
+from .testing_utils import load_path
+
+@load_path
+class TestJsonEncoder(unittest.TestCase):
+   def setUp(self):
+      import json_encoder # from the common layer
+      self.json_encoder=json_encoder
+
+   def test_encoders_agree(self):
+      data=[{'id': '1', 'price': Decimal('10.25'), 'stock': Decimal(3), 'tags': ['a', 'b'], 'nested': {'value': None}}]
+      for name, dumps in self.json_encoder.encoders.items():
+         with self.subTest(encoder=name):
+            self.assertEqual(json.loads(dumps(data)), [{'id': '1', 'price': 10.25, 'stock': 3, 'tags': ['a', 'b'], 'nested': {'value': None}}])
+
+   def test_not_serializable(self):
+      for name, dumps in self.json_encoder.encoders.items():
+         with self.subTest(encoder=name):
+            with self.assertRaises(TypeError):
+               dumps({'value': object()})
+
+   def test_unknown_encoder(self):
+      with self.assertLogs('json_encoder', 'WARNING'):
+         self.assertEqual(self.json_encoder.choose_encoder('ujson'), 'json')
+      self.assertEqual(self.json_encoder.choose_encoder('json'), 'json')
+      self.assertIn(self.json_encoder.choose_encoder(None), self.json_encoder.encoders)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import unittest
+import moto
+import json
+from unittest.mock import patch
+from .testing_utils import create_resources,sample_products,stored_products,load_path
+
+@load_path
+class TestDynamodbJson(unittest.TestCase):
+   def setUp(self):
+      import aws_developer_sample_project.core_api.dynamodb_json as dynamodb_json
+      self.dynamodb_json=dynamodb_json
+
+   def test_item_to_json(self):
+      item={
+         'id': {'S': 'a "quoted" é'},
+         'price': {'N': '10.50'},
+         'active': {'BOOL': True},
+         'deleted': {'NULL': True},
+         'images': {'M': {'main': {'L': [{'S': 'small'}, {'N': '-1E+2'}]}}},
+         'tags': {'SS': ['x', 'y']},
+         'sizes': {'NS': ['1', '2']},
+         'data': {'B': b'\x00\x01'}
+      }
+      self.assertEqual(json.loads(self.dynamodb_json.item_to_json(item)), {
+         'id': 'a "quoted" é',
+         'price': 10.5,
+         'active': True,
+         'deleted': None,
+         'images': {'main': ['small', -100]},
+         'tags': ['x', 'y'],
+         'sizes': [1, 2],
+         'data': 'AAE='
+      })
+
+   def test_items_to_json(self):
+      self.assertEqual(self.dynamodb_json.items_to_json([]), '[]')
+      self.assertEqual(json.loads(self.dynamodb_json.items_to_json([{'id': {'S': '1'}}, {'id': {'S': '2'}}])), [{'id': '1'}, {'id': '2'}])
+
+@moto.mock_aws
+@load_path
+class TestLowLevelReads(unittest.TestCase):
+   def setUp(self):
+      import aws_developer_sample_project.core_api.products_db as products_db
+      create_resources(products_db)
+      for i in range(3, 8):
+         products_db.upsert_product(str(i), {'title': f'Product {i}', 'category': 'category1'})
+
+      import aws_developer_sample_project.core_api.get_product as get_product
+      import aws_developer_sample_project.core_api.query_products as query_products
+      self.get_product=get_product
+      self.query_products=query_products
+      # the handlers use the products_db module from the lambda folder
+      self.patcher=patch.object(get_product.products_db, 'low_level_reads', True)
+      self.patcher.start()
+
+   def tearDown(self):
+      self.patcher.stop()
+
+   def query(self, **query_parameters):
+      answer = self.query_products.handler({'queryStringParameters': query_parameters}, None)
+      self.assertEqual(answer['statusCode'], 200)
+      return json.loads(answer['body'])
+
+   def test_get_product(self):
+      answer = self.get_product.handler({'pathParameters': {'id': '1'}}, None)
+      self.assertEqual(answer['statusCode'], 200)
+      self.assertEqual(json.loads(answer['body']), stored_products[0])
+      answer = self.get_product.handler({'pathParameters': {'id': 'does not exist'}}, None)
+      self.assertEqual(answer['statusCode'], 404)
+
+   def test_query_products(self):
+      self.assertEqual(len(self.query()), 7)
+      products=self.query(category='category1')
+      self.assertEqual(len(products), 6)
+      for product in products:
+         self.assertEqual(product['category'], 'category1')
+
+   def test_client_created_on_first_use(self):
+      products_db=self.get_product.products_db
+      event={'pathParameters': {'id': '1'}}
+      with patch.object(products_db, 'client', None):
+         with patch.object(products_db, 'low_level_reads', False):
+            self.assertEqual(self.get_product.handler(event, None)['statusCode'], 200)
+            self.assertIsNone(products_db.client)
+         self.assertEqual(self.get_product.handler(event, None)['statusCode'], 200)
+         self.assertIsNotNone(products_db.client)
+
+   def test_pages_are_compatible(self):
+      page=self.query(limit='3')
+      ids=[p['id'] for p in page['items']]
+      # a token from the low-level path works with the resource path
+      with patch.object(self.get_product.products_db, 'low_level_reads', False):
+         page=self.query(limit='3', next=page['next'])
+      ids.extend(p['id'] for p in page['items'])
+      page=self.query(limit='3', next=page['next'])
+      ids.extend(p['id'] for p in page['items'])
+      self.assertIsNone(page['next'])
+      self.assertEqual(sorted(ids), sorted(['1', '2', '3', '4', '5', '6', '7']))
+
+if __name__ == '__main__':
+    unittest.main()
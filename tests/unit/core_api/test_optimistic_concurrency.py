@@ -0,0 +1,48 @@
+import unittest
+import moto
+import json
+from .testing_utils import create_resources,sample_products,load_path
+
+@moto.mock_aws
+@load_path
+class TestOptimisticConcurrency(unittest.TestCase):
+   def setUp(self):
+      import aws_developer_sample_project.core_api.products_db as products_db
+      import aws_developer_sample_project.core_api.get_product as get_product
+      import aws_developer_sample_project.core_api.update_product as update_product
+      self.products_db=products_db
+      self.get_product=get_product
+      self.update_product=update_product
+      create_resources(products_db)
+
+   def update(self, fields, headers=None):
+      event={'pathParameters': {'id': '1'}, 'body': json.dumps(fields), 'headers': headers}
+      return self.update_product.handler(event, None)
+
+   def test_version_increments(self):
+      # creating the product wrote version 1
+      self.assertEqual(self.products_db.update_product('1', {**sample_products[0], 'price': 11})['version'], 2)
+      self.assertEqual(self.products_db.update_product('1', {**sample_products[0], 'price': 12}, expected_version=2)['version'], 3)
+
+   def test_version_conflict(self):
+      self.products_db.update_product('1', {**sample_products[0], 'price': 11})
+      with self.assertRaises(self.products_db.VersionConflict):
+         self.products_db.update_product('1', {**sample_products[0], 'price': 12}, expected_version=1)
+      with self.assertRaises(self.products_db.VersionConflict):
+         self.products_db.update_product('does not exist', {**sample_products[0], 'price': 12}, expected_version=0)
+      self.assertEqual(self.products_db.get_product('1')['price'], 11)
+
+   def test_if_match(self):
+      etag=self.get_product.handler({'pathParameters': {'id': '1'}}, None)['headers']['ETag']
+      answer=self.update({**sample_products[0], 'price': 11}, {'If-Match': etag})
+      self.assertEqual(answer['statusCode'], 200)
+      # the first update changed the product, the same ETag is stale now
+      answer=self.update({**sample_products[0], 'price': 12}, {'if-match': etag})
+      self.assertEqual(answer['statusCode'], 412)
+      self.assertEqual(self.products_db.get_product('1')['price'], 11)
+      self.assertEqual(self.update({**sample_products[0], 'price': 12}, {'If-Match': '*'})['statusCode'], 200)
+      # without If-Match the last writer wins
+      self.assertEqual(self.update({**sample_products[0], 'price': 13})['statusCode'], 200)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,11 @@
 import unittest
 import moto
 import boto3
+from .testing_utils import load_path
 
 
 @moto.mock_aws
+@load_path
 class TestProductsDB(unittest.TestCase):
    table_name = "Products"
    sample_products = [
@@ -0,0 +1,68 @@
+import unittest
+import moto
+import json
+from unittest.mock import patch
+from .testing_utils import create_resources,sample_products,load_path
+
+@moto.mock_aws
+@load_path
+class TestQueryProductsPages(unittest.TestCase):
+   def setUp(self):
+      import aws_developer_sample_project.core_api.products_db as products_db
+      self.products_db = products_db
+
+      import aws_developer_sample_project.core_api.query_products as query_products
+      self.query_products=query_products
+      create_resources(self.products_db)
+      for i in range(3, 8):
+         self.products_db.upsert_product(str(i), {'title': f'Product {i}', 'category': 'category1'})
+
+   def get_page(self, **query_parameters):
+      answer = self.query_products.handler({'queryStringParameters': query_parameters}, None)
+      self.assertEqual(answer['statusCode'], 200)
+      return json.loads(answer['body'])
+
+   def test_pages(self):
+      ids=[]
+      page=self.get_page(limit='3')
+      while True:
+         self.assertLessEqual(len(page['items']), 3)
+         ids.extend(p['id'] for p in page['items'])
+         if not page['next']:
+            break
+         page=self.get_page(limit='3', next=page['next'])
+      self.assertEqual(sorted(ids), sorted(p['id'] for p in self.products_db.get_all_products()))
+      self.assertEqual(len(ids), 7)
+
+   def test_category_pages(self):
+      page=self.get_page(category='category1', limit='4')
+      self.assertEqual(len(page['items']), 4)
+      page=self.get_page(category='category1', limit='4', next=page['next'])
+      self.assertEqual(len(page['items']), 2)
+      for p in page['items']:
+         self.assertEqual(p['category'], 'category1')
+
+   def test_unpaginated_listing_is_bounded(self):
+      with patch.object(self.query_products, 'max_limit', 4):
+         answer = self.query_products.handler({'queryStringParameters': None}, None)
+         self.assertEqual(len(json.loads(answer['body'])), 4)
+         next_token=answer['headers']['X-Next-Token']
+         self.assertEqual(len(self.get_page(limit='4', next=next_token)['items']), 3)
+         answer = self.query_products.handler({'queryStringParameters': {'category': 'category1'}}, None)
+         self.assertEqual(len(json.loads(answer['body'])), 4)
+         self.assertIn('X-Next-Token', answer['headers'])
+      answer = self.query_products.handler({'queryStringParameters': None}, None)
+      self.assertEqual(len(json.loads(answer['body'])), 7)
+      self.assertNotIn('X-Next-Token', answer['headers'])
+
+   def test_follows_last_evaluated_key(self):
+      products=list(self.products_db.iterate_products(self.products_db.scan_pages(Limit=2)))
+      self.assertEqual(len(products), 7)
+
+   def test_bad_parameters(self):
+      for query_parameters in [{'limit': '0'}, {'limit': 'abc'}, {'next': 'not a token'}]:
+         answer = self.query_products.handler({'queryStringParameters': query_parameters}, None)
+         self.assertEqual(answer['statusCode'], 400)
+
+if __name__ == '__main__':
+    unittest.main()
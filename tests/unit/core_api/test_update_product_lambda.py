@@ -34,7 +34,8 @@ class TestUpdateProduct(unittest.TestCase):
          })
       }
       answer = self.update_product.handler(event, None)
-      self.assertEqual(answer.get('statusCode'), 500)
+      self.assertEqual(answer.get('statusCode'), 200)
+      self.assertEqual(json.loads(answer['body']), {'id': product_id, 'name': 'Product 1', 'price': 100})
 
 
 if __name__ == '__main__':
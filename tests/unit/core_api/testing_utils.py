@@ -39,6 +39,8 @@ sample_products = [
       'category': 'category2'
    }
 ]
+# as they are read back, every write increments the version
+stored_products = [{**product, 'version': 1} for product in sample_products]
 table_name = "Products"
 
 def create_resources(products_db):
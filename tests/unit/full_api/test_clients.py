@@ -0,0 +1,42 @@
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+folder_to_add = os.path.abspath('aws_developer_sample_project/full_api')
+sys.path.append(folder_to_add)
+
+import clients
+
+class TestClients(unittest.TestCase):
+   def setUp(self):
+      clients.reset()
+
+   def tearDown(self):
+      clients.reset()
+
+   def test_created_once(self):
+      with patch.dict(clients.factories, {'s3': object}):
+         s3_client=clients.s3()
+         self.assertIs(clients.s3(), s3_client)
+         clients.reset()
+         self.assertIsNot(clients.s3(), s3_client)
+
+   def test_register(self):
+      stand_in=object()
+      clients.register('s3', stand_in)
+      self.assertIs(clients.s3(), stand_in)
+
+   def test_no_cache_without_cluster(self):
+      with patch.dict(os.environ, {'CACHE_CLUSTER_URL': ''}):
+         self.assertIsNone(clients.cache())
+
+   def test_cache_is_lazy(self):
+      with patch.dict(os.environ, {'CACHE_CLUSTER_URL': 'localhost'}):
+         # creating the client does not connect yet
+         cache_client=clients.cache()
+         self.assertEqual(cache_client.connection_pool.connection_kwargs['host'], 'localhost')
+         self.assertIs(clients.cache(), cache_client)
+
+if __name__ == '__main__':
+    unittest.main()
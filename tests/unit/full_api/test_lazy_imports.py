@@ -0,0 +1,31 @@
+import os
+import subprocess
+import sys
+import unittest
+
+folder = os.path.abspath('aws_developer_sample_project/full_api')
+
+def imported_modules(module):
+   """Modules loaded by importing module in a fresh interpreter, like a cold start"""
+   environment={**os.environ, 'PYTHONPATH': os.pathsep.join([folder, os.path.abspath('aws_developer_sample_project/layers/common/python')]), 'CACHE_CLUSTER_URL': 'localhost', 'AWS_DEFAULT_REGION': 'us-east-1'}
+   result=subprocess.run(
+      [sys.executable, '-c', f'import sys, {module}; print(" ".join(sys.modules))'],
+      cwd=folder, env=environment, capture_output=True, text=True, check=True
+   )
+   return set(result.stdout.split())
+
+class TestLazyImports(unittest.TestCase):
+   def test_options(self):
+      for module in ('options', 'echo_lambda'):
+         modules=imported_modules(module)
+         self.assertNotIn('boto3', modules)
+         self.assertNotIn('products_db', modules)
+
+   def test_get_product(self):
+      # calls DynamoDB or Valkey on every request, the clients are created during init
+      modules=imported_modules('get_product')
+      self.assertIn('boto3', modules)
+      self.assertIn('redis', modules)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+import http.client
+import json
+import os
+import sys
+import threading
+import unittest
+import moto
+from http.server import ThreadingHTTPServer
+from .testing_utils import create_table
+
+sys.path.insert(0, os.path.abspath('benchmarks'))
+import local_api
+
+@moto.mock_aws
+class TestLocalApi(unittest.TestCase):
+   def setUp(self):
+      create_table()
+      self.api=local_api.create_api('full_api', local_api.routes['full_api'], setup=local_api.cache_setup(None), quiet=True)
+
+   def request(self, method, url, body=None):
+      status, headers, response_body=self.api.handle(method, url, {'Content-Type': 'application/json'}, body)
+      return status, dict(headers), response_body
+
+   def test_warm_environment_reused(self):
+      status, _, body=self.request('POST', '/products', b'{"title": "Lamp", "price": 10, "category": "home"}')
+      self.assertEqual(status, 200)
+      product_id=json.loads(body)['id']
+      for _ in range(3):
+         status, headers, body=self.request('GET', f'/products/{product_id}')
+         self.assertEqual(status, 200)
+         self.assertEqual(json.loads(body)['title'], 'Lamp')
+      stats=self.api.functions['get_product'].summary()
+      self.assertEqual(stats['invocations'], 3)
+      self.assertEqual(stats['cold_starts'], 1)
+
+   def test_cold_start_every_time(self):
+      function=local_api.Function(self.api.functions['options'].folder, 'options', keep_warm=0)
+      for _ in range(2):
+         self.assertEqual(function.invoke({}, quiet=True)['statusCode'], 200)
+      self.assertEqual(function.summary()['cold_starts'], 2)
+
+   def test_environments_have_their_own_modules(self):
+      function=self.api.functions['get_product']
+      first, second=local_api.Environment(function), local_api.Environment(function)
+      self.assertIsNot(first.modules['products_db'], second.modules['products_db'])
+      self.assertIsNot(first.modules['products_db'].product_cache, second.modules['products_db'].product_cache)
+
+   def test_routing(self):
+      self.assertEqual(self.request('GET', '/products/export')[0], 200)
+      route, path_parameters=self.api.find('GET', '/products/abc/images')
+      self.assertEqual((route.function, path_parameters), ('generate_download_url', {'id': 'abc'}))
+      # API Gateway answers 403 for what it does not know
+      self.assertEqual(self.request('GET', '/nothing')[0], 403)
+      self.assertEqual(self.request('PATCH', '/products')[0], 403)
+
+   def test_event(self):
+      route, path_parameters=self.api.find('GET', '/products/abc')
+      event=local_api.to_event('GET', '/products/abc?fields=a&fields=b', {'Accept': '*/*'}, None, route, path_parameters)
+      self.assertEqual(event['resource'], '/products/{id}')
+      self.assertEqual(event['pathParameters'], {'id': 'abc'})
+      self.assertEqual(event['queryStringParameters'], {'fields': 'b'})
+      self.assertEqual(event['multiValueQueryStringParameters'], {'fields': ['a', 'b']})
+      self.assertEqual(event['headers'], {'Accept': '*/*'})
+      self.assertIsNone(event['body'])
+
+   def test_throttled(self):
+      function=self.api.functions['delete_product']
+      function.max_environments=1
+      self.assertIsNone(function.acquire()) # one request running
+      self.assertEqual(self.request('DELETE', '/products/1')[0], 429)
+      self.assertEqual(self.request('GET', '/products/1')[0], 404) # other functions are not throttled
+      self.assertEqual(function.summary()['throttles'], 1)
+
+   def test_http(self):
+      server=ThreadingHTTPServer(('127.0.0.1', 0), local_api.request_handler(self.api))
+      threading.Thread(target=server.serve_forever, daemon=True).start()
+      try:
+         connection=http.client.HTTPConnection('127.0.0.1', server.server_port)
+         connection.request('POST', '/products', body=b'{"title": "Desk", "price": 80, "category": "office"}')
+         response=connection.getresponse()
+         self.assertEqual(response.status, 200)
+         product=json.loads(response.read())
+         # same connection, kept alive
+         connection.request('GET', f"/products/{product['id']}")
+         response=connection.getresponse()
+         self.assertEqual(response.status, 200)
+         self.assertEqual(json.loads(response.read())['title'], 'Desk')
+      finally:
+         server.shutdown()
+         server.server_close()
+
+class TestRoutesFromTemplate(unittest.TestCase):
+   def test_routes(self):
+      def method(http_method, resource, function):
+         uri={'Fn::Join': ['', ['arn:', {'Ref': 'AWS::Partition'}, ':lambda:path/2015-03-31/functions/', {'Fn::GetAtt': [function, 'Arn']}, '/invocations']]}
+         return {'Type': 'AWS::ApiGateway::Method', 'Properties': {'HttpMethod': http_method, 'ResourceId': {'Ref': resource}, 'Integration': {'Type': 'AWS_PROXY', 'Uri': uri}}}
+      template={'Resources': {
+         'Products': {'Type': 'AWS::ApiGateway::Resource', 'Properties': {'ParentId': {'Fn::GetAtt': ['Api', 'RootResourceId']}, 'PathPart': 'products'}},
+         'Product': {'Type': 'AWS::ApiGateway::Resource', 'Properties': {'ParentId': {'Ref': 'Products'}, 'PathPart': '{id}'}},
+         'ProductsGet': method('GET', 'Products', 'QueryProducts'),
+         'ProductGet': method('GET', 'Product', 'GetProduct'),
+         'QueryProducts': {'Type': 'AWS::Lambda::Function', 'Properties': {'Handler': 'query_products.handler'}},
+         'GetProduct': {'Type': 'AWS::Lambda::Function', 'Properties': {'Handler': 'get_product.handler'}},
+      }}
+      self.assertEqual(sorted(local_api.routes_from_template(template)), [
+         ('GET', '/products', 'query_products'),
+         ('GET', '/products/{id}', 'get_product')
+      ])
+
+if __name__ == '__main__':
+    unittest.main()
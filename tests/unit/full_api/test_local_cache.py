@@ -0,0 +1,52 @@
+import unittest
+
+from local_cache import LocalCache # from the common layer
+
+class FakeClock:
+   def __init__(self):
+      self.now=0
+   def __call__(self):
+      return self.now
+
+class TestLocalCache(unittest.TestCase):
+   def setUp(self):
+      self.clock=FakeClock()
+      self.cache=LocalCache(max_items=2, max_bytes=100, ttl=5, clock=self.clock)
+
+   def test_get_and_set(self):
+      self.assertIsNone(self.cache.get('product:1'))
+      self.cache.set('product:1', {'id': '1'}, 10)
+      self.assertEqual(self.cache.get('product:1'), {'id': '1'})
+
+   def test_expires(self):
+      self.cache.set('product:1', {'id': '1'}, 10)
+      self.clock.now=5
+      self.assertIsNone(self.cache.get('product:1'))
+      self.assertEqual(len(self.cache), 0)
+
+   def test_evicts_least_recently_used(self):
+      self.cache.set('product:1', {'id': '1'}, 10)
+      self.cache.set('product:2', {'id': '2'}, 10)
+      self.cache.get('product:1')
+      self.cache.set('product:3', {'id': '3'}, 10)
+      self.assertIsNone(self.cache.get('product:2'))
+      self.assertIsNotNone(self.cache.get('product:1'))
+      self.assertIsNotNone(self.cache.get('product:3'))
+
+   def test_evicts_by_size(self):
+      self.cache.set('product:1', {'id': '1'}, 60)
+      self.cache.set('product:2', {'id': '2'}, 60)
+      self.assertIsNone(self.cache.get('product:1'))
+      self.assertEqual(self.cache.size, 60)
+      self.cache.set('product:3', {'id': '3'}, 101) # too big, never stored
+      self.assertIsNone(self.cache.get('product:3'))
+
+   def test_invalidate(self):
+      self.cache.set('product:1', {'id': '1'}, 10)
+      self.cache.invalidate('product:1')
+      self.cache.invalidate('product:2') # no need for checking
+      self.assertIsNone(self.cache.get('product:1'))
+      self.assertEqual(self.cache.size, 0)
+
+if __name__ == '__main__':
+    unittest.main()
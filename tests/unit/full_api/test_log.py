@@ -0,0 +1,67 @@
+import io
+import json
+import unittest
+from contextlib import redirect_stdout
+from types import SimpleNamespace
+from unittest.mock import patch, MagicMock
+from . import testing_utils
+
+import log
+
+class TestLog(unittest.TestCase):
+   def test_structured_line(self):
+      output=io.StringIO()
+      with redirect_stdout(output):
+         log.info('Updating %s prices', 3, stream='prices')
+      record=json.loads(output.getvalue())
+      self.assertEqual(record['level'], 'INFO')
+      self.assertEqual(record['message'], 'Updating 3 prices')
+      self.assertEqual(record['stream'], 'prices')
+
+   def test_level_gating_is_lazy(self):
+      message=MagicMock()
+      field=MagicMock()
+      output=io.StringIO()
+      with patch.object(log, 'level', log.levels['INFO']), redirect_stdout(output):
+         log.debug(message, 'argument', product=field)
+      self.assertEqual(output.getvalue(), '')
+      message.__mod__.assert_not_called()
+      field.__str__.assert_not_called()
+
+   def test_large_payload_truncated(self):
+      output=io.StringIO()
+      with patch.object(log, 'max_length', 20), redirect_stdout(output):
+         log.warning('x'*50, product={'description': 'y'*100})
+      record=json.loads(output.getvalue())
+      self.assertEqual(record['message'], 'x'*20+'... (30 more characters)')
+      self.assertTrue(record['product'].startswith('{"description"'))
+      self.assertIn('more characters', record['product'])
+
+   def test_buffered_written_once(self):
+      @log.buffered
+      def handler(event, context):
+         log.info('first')
+         log.error('second')
+         self.assertEqual(output.getvalue(), '')
+         return 'done'
+      output=io.StringIO()
+      with redirect_stdout(output), patch.object(output, 'write', wraps=output.write) as write:
+         self.assertEqual(handler({}, SimpleNamespace(aws_request_id='request-1')), 'done')
+      self.assertEqual(write.call_count, 1)
+      records=[json.loads(line) for line in output.getvalue().splitlines()]
+      self.assertEqual([r['message'] for r in records], ['first', 'second'])
+      self.assertEqual({r['request_id'] for r in records}, {'request-1'})
+      self.assertIsNone(log.buffer)
+
+   def test_buffered_written_on_error(self):
+      @log.buffered
+      def handler(event, context):
+         log.error('failing')
+         raise ValueError('boom')
+      output=io.StringIO()
+      with redirect_stdout(output), self.assertRaises(ValueError):
+         handler({}, None)
+      self.assertEqual(json.loads(output.getvalue())['message'], 'failing')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import io
+import json
+import unittest
+import moto
+from contextlib import redirect_stdout
+from unittest.mock import patch
+from .testing_utils import create_resources
+
+import metrics
+
+def emf_lines(output):
+   return [json.loads(line) for line in output.splitlines() if line.startswith('{"_aws"')]
+
+class TestMetrics(unittest.TestCase):
+   def test_record_format(self):
+      @metrics.instrument
+      def handler(event, context):
+         with metrics.timer('DynamoDB'):
+            pass
+         metrics.count('CacheHit')
+         metrics.count('CacheHit', 2)
+         return 'done'
+      output=io.StringIO()
+      with redirect_stdout(output):
+         self.assertEqual(handler({}, None), 'done')
+      [record]=emf_lines(output.getvalue())
+      [directive]=record['_aws']['CloudWatchMetrics']
+      self.assertEqual(directive['Namespace'], metrics.namespace)
+      self.assertEqual(directive['Dimensions'], [['Function']])
+      self.assertEqual({m['Name']: m['Unit'] for m in directive['Metrics']},
+                       {'Duration': 'Milliseconds', 'DynamoDB': 'Milliseconds', 'CacheHit': 'Count'})
+      self.assertEqual(record['CacheHit'], 3)
+      self.assertGreaterEqual(record['Duration'], record['DynamoDB'])
+      self.assertIsNone(metrics.current)
+
+   def test_record_written_on_error(self):
+      @metrics.instrument
+      def handler(event, context):
+         raise ValueError('boom')
+      output=io.StringIO()
+      with redirect_stdout(output), self.assertRaises(ValueError):
+         handler({}, None)
+      self.assertEqual(len(emf_lines(output.getvalue())), 1)
+
+   def test_not_sampled(self):
+      @metrics.instrument
+      def handler(event, context):
+         self.assertIs(metrics.timer('DynamoDB'), metrics.null_timer)
+         metrics.count('CacheHit')
+         return 'done'
+      output=io.StringIO()
+      with patch.object(metrics, 'sample_rate', 0), redirect_stdout(output):
+         self.assertEqual(handler({}, None), 'done')
+      self.assertEqual(output.getvalue(), '')
+
+   def test_outside_invocation(self):
+      self.assertIs(metrics.timer('DynamoDB'), metrics.null_timer)
+      metrics.count('CacheHit')
+      self.assertIsNone(metrics.current)
+
+@moto.mock_aws
+class TestHandlerMetrics(unittest.TestCase):
+   def setUp(self):
+      import products_db
+      self.cache_client=create_resources(products_db)
+      self.cache_client.flushall()
+      products_db.product_cache.clear()
+
+   def test_get_product_cache_metrics(self):
+      import get_product
+      event={'pathParameters': {'id': '1'}}
+      output=io.StringIO()
+      with redirect_stdout(output):
+         for _ in range(3):
+            self.assertEqual(get_product.handler(event, None)['statusCode'], 200)
+      miss, local_hit, _=emf_lines(output.getvalue())
+      self.assertEqual(miss['CacheMiss'], 1)
+      self.assertIn('DynamoDB', miss)
+      self.assertIn('Valkey', miss)
+      self.assertIn('Serialization', miss)
+      self.assertEqual(local_hit['LocalCacheHit'], 1)
+      self.assertNotIn('DynamoDB', local_hit)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+import moto
+import json
+import base64
+from unittest.mock import patch
+from .testing_utils import create_resources,sample_products
+
+def make_record(sequence_number, data):
+   return {
+      'eventID': f'shardId-000000000000:{sequence_number}',
+      'kinesis': {
+         'sequenceNumber': str(sequence_number),
+         'data': base64.b64encode(json.dumps(data).encode('utf-8')).decode('ascii')
+      }
+   }
+
+@moto.mock_aws
+class TestProcessStreamPrices(unittest.TestCase):
+   def setUp(self):
+      import aws_developer_sample_project.full_api.process_stream_prices as the_lambda
+      self.the_lambda=the_lambda
+
+      import products_db # the same module the lambda uses
+      self.products_db=products_db
+      self.cache_client=create_resources(products_db)
+
+   def test_keeps_last_price(self):
+      event={'Records': [
+         make_record(3, {'product_id': '1', 'price': 13.5}),
+         make_record(1, {'product_id': '1', 'price': 11}),
+         make_record(2, {'product_id': '2', 'price': 22}),
+      ]}
+      with patch.object(self.products_db, 'update_price_dynamo', wraps=self.products_db.update_price_dynamo) as update_price_dynamo:
+         answer=self.the_lambda.handler(event, None)
+         self.assertEqual(update_price_dynamo.call_count, 2)
+      self.assertEqual(answer, {'batchItemFailures': []})
+      self.assertEqual(float(self.products_db.get_product_from_dynamodb('1')['price']), 13.5)
+      self.assertEqual(self.products_db.get_product_from_dynamodb('2')['price'], 22)
+      self.assertEqual(json.loads(self.cache_client.get('product:1'))['price'], 13.5)
+
+   def test_bad_record(self):
+      event={'Records': [
+         make_record(1, {'product_id': '1', 'price': 11}),
+         make_record(2, {'price': 22}),
+      ]}
+      event['Records'].append({**make_record(3, {}), 'kinesis': {'sequenceNumber': '3', 'data': 'not base64!'}})
+      answer=self.the_lambda.handler(event, None)
+      # retrying would not help, the bad records are skipped
+      self.assertEqual(answer, {'batchItemFailures': []})
+      self.assertEqual(self.products_db.get_product_from_dynamodb('1')['price'], 11)
+
+   def test_failed_update(self):
+      event={'Records': [
+         make_record(1, {'product_id': '1', 'price': 11}),
+         make_record(2, {'product_id': '2', 'price': 22}),
+         make_record(3, {'product_id': '1', 'price': 12}),
+      ]}
+      update_price_dynamo=self.products_db.update_price_dynamo
+      def fail_for_product_1(product_id, price):
+         if product_id=='1':
+            raise RuntimeError("Exception generated from test code")
+         return update_price_dynamo(product_id, price)
+      with patch.object(self.products_db, 'update_price_dynamo', side_effect=fail_for_product_1):
+         answer=self.the_lambda.handler(event, None)
+      self.assertEqual(answer, {'batchItemFailures': [{'itemIdentifier': '3'}]})
+      self.assertEqual(self.products_db.get_product_from_dynamodb('2')['price'], 22)
+
+   def test_clients_reused_across_invocations(self):
+      event={'Records': [make_record(n, {'product_id': str(n%2+1), 'price': n}) for n in range(1, 21)]}
+      self.the_lambda.handler(event, None)
+      executor=self.products_db.executor
+      # a warm container creates no boto3 session, client or thread
+      with patch('boto3.session.Session', side_effect=AssertionError('boto3 session created')) as session, \
+            patch('boto3.resource', side_effect=AssertionError('boto3 resource created')):
+         for _ in range(3):
+            self.assertEqual(self.the_lambda.handler(event, None), {'batchItemFailures': []})
+      self.assertEqual(session.call_count, 0)
+      self.assertIs(self.products_db.executor, executor)
+      self.assertEqual(self.products_db.get_product_from_dynamodb('2')['price'], 19)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+import boto3
+import moto
+import os
+import sys
+from io import BytesIO
+from PIL import Image
+
+folder_to_add = os.path.abspath('aws_developer_sample_project/full_api') 
+sys.path.append(folder_to_add) 
+
+@moto.mock_aws
+class TestProcessUploadedImages(unittest.TestCase):
+   def setUp(self):
+      import aws_developer_sample_project.full_api.process_uploaded_images as the_lambda
+      self.the_lambda=the_lambda
+
+      self.s3_client=boto3.client("s3", region_name="us-east-1")
+      self.s3_client.create_bucket(Bucket="mybucket")
+      original=BytesIO()
+      Image.new('RGB', (1920, 1080), (200, 100, 50)).save(original, format='JPEG')
+      self.s3_client.put_object(Bucket="mybucket", Key="incoming_product_images/1/main.jpg", Body=original.getvalue())
+
+   def test_from_key(self):
+      attrs=self.the_lambda.ImageAttributes.from_key("incoming_product_images/1/main.jpg")
+      self.assertEqual(attrs.product_id, '1')
+      self.assertEqual(attrs.type, 'main')
+
+   def test_process_image(self):
+      event={'Records': [{'s3': {'bucket': {'name': 'mybucket'}, 'object': {'key': 'incoming_product_images/1/main.jpg'}}}]}
+      self.the_lambda.handler(event, None)
+      for size in self.the_lambda.sizes:
+         response=self.s3_client.get_object(Bucket="mybucket", Key=f"product_images/1/main/{size.name}.jpg")
+         self.assertEqual(response['ContentType'], 'image/jpeg')
+         with Image.open(BytesIO(response['Body'].read())) as img:
+            self.assertEqual(img.format, 'JPEG')
+            self.assertEqual(img.size, (size.width, size.height))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+import moto
+from unittest.mock import patch
+from .testing_utils import create_resources,sample_products
+
+@moto.mock_aws
+class TestProductsCache(unittest.TestCase):
+   def setUp(self):
+      import aws_developer_sample_project.full_api.products_db as products_db
+      self.products_db=products_db
+      self.cache_client=create_resources(products_db)
+      self.cache_client.flushall()
+      products_db.product_cache.clear()
+
+   def test_miss_then_hit(self):
+      with patch.object(self.products_db, 'get_product_from_dynamodb', wraps=self.products_db.get_product_from_dynamodb) as from_dynamodb:
+         product=self.products_db.get_product('1')
+         self.assertEqual(product['id'], '1')
+         self.products_db.product_cache.clear()
+         product=self.products_db.get_product('1')
+         self.assertEqual(product['id'], '1')
+         self.assertEqual(from_dynamodb.call_count, 1)
+      self.assertIsNotNone(self.cache_client.get('product:1'))
+      self.assertIsNone(self.cache_client.get('lock:product:1'))
+
+   def test_local_cache_invalidated_on_update(self):
+      self.products_db.get_product('1')
+      self.products_db.update_price('1', 99)
+      product=self.products_db.get_product('1')
+      self.assertEqual(product['price'], 99)
+
+   def test_waits_for_refill_when_locked(self):
+      self.cache_client.set('lock:product:1', 'someone else', px=5000)
+      with patch.object(self.products_db, 'refill_attempts', 2), \
+           patch.object(self.products_db, 'refill_wait', 0), \
+           patch.object(self.products_db, 'get_product_from_dynamodb', wraps=self.products_db.get_product_from_dynamodb) as from_dynamodb:
+         product=self.products_db.get_product('1')
+         # nobody refilled in time, so we fall back to the table without caching
+         self.assertEqual(product['id'], '1')
+         self.assertEqual(from_dynamodb.call_count, 1)
+      self.assertIsNone(self.cache_client.get('product:1'))
+
+   def test_missing_product_stops_waiting(self):
+      self.cache_client.set('lock:product:missing', 'someone else', px=5000)
+      checks=[]
+      def refill_done(seconds):
+         checks.append(seconds)
+         # the lock holder found nothing and released the lock
+         self.cache_client.delete('lock:product:missing')
+      with patch('time.sleep', refill_done):
+         self.assertIsNone(self.products_db.get_product('missing'))
+      self.assertEqual(len(checks), 1)
+
+   def test_get_products(self):
+      self.products_db.get_product('1') # cached
+      self.products_db.product_cache.clear()
+      with patch.object(self.products_db, 'get_products_from_dynamodb', wraps=self.products_db.get_products_from_dynamodb) as from_dynamodb:
+         products=self.products_db.get_products(['2','does not exist','1'])
+         self.assertEqual([p['id'] for p in products], ['2','1'])
+         from_dynamodb.assert_called_once_with(['2','does not exist'])
+      self.assertIsNotNone(self.cache_client.get('product:2'))
+      self.assertIsNone(self.cache_client.get('product:does not exist'))
+
+   def test_not_modified_from_cached_etag(self):
+      import get_product # the handler uses the products_db of the lambda folder
+      get_product.products_db.product_cache.clear()
+      event={'pathParameters': {'id': '1'}}
+      answer=get_product.handler(event, None)
+      self.assertEqual(answer['statusCode'], 200)
+      etag=answer['headers']['ETag']
+      self.assertEqual(self.cache_client.get('etag:product:1'), etag)
+      with patch.object(get_product.products_db, 'get_product', side_effect=AssertionError('product loaded')):
+         answer=get_product.handler({**event, 'headers': {'If-None-Match': etag}}, None)
+      self.assertEqual(answer['statusCode'], 304)
+      get_product.products_db.update_price('1', 99)
+      answer=get_product.handler({**event, 'headers': {'If-None-Match': etag}}, None)
+      self.assertEqual(answer['statusCode'], 200)
+      self.assertEqual(answer['headers']['ETag'], self.cache_client.get('etag:product:1'))
+
+   def test_older_version_not_cached(self):
+      product=self.products_db.get_product('1')
+      self.products_db.update_price('1', 99)
+      # a refill that read the product before the update comes in late
+      self.products_db.cache_products({'product:1': product})
+      self.products_db.product_cache.clear()
+      self.assertEqual(self.products_db.get_product('1')['price'], 99)
+
+   def test_should_refresh_early(self):
+      self.assertFalse(self.products_db.should_refresh_early(3600*1000))
+      self.assertTrue(self.products_db.should_refresh_early(0))
+      self.assertFalse(self.products_db.should_refresh_early(-2)) # key does not exist
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import os
+import sys
+import boto3
+import fakeredis
+
+folder_to_add = os.path.abspath('aws_developer_sample_project/full_api') 
+if folder_to_add not in sys.path:
+   sys.path.append(folder_to_add)
+os.environ.setdefault('CACHE_CLUSTER_URL', 'localhost')
+
+import clients
+
+sample_products = [
+   {
+      'id': '1',
+      'title': 'Product 1',
+      'description': 'Product 1 description',
+      'price': 10,
+      'category': 'category1'
+   },
+   {
+      'id': '2',
+      'title': 'Product 2',
+      'description': 'Product 2 description',
+      'price': 20,
+      'category': 'category2'
+   }
+]
+table_name = "Products"
+
+def create_table():
+   dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+   return dynamodb.create_table(
+      TableName = table_name,
+      KeySchema=[{"AttributeName": "id", "KeyType": "HASH"}],
+      AttributeDefinitions=[
+         {"AttributeName": "id", "AttributeType": "S"},
+         {"AttributeName": "category", "AttributeType": "S"},
+      ],
+      BillingMode='PAY_PER_REQUEST',
+      GlobalSecondaryIndexes=[
+         {
+            'IndexName': 'category-index',
+            'KeySchema': [
+               {'AttributeName': 'category', 'KeyType': 'HASH'}
+            ],
+            'Projection': {
+               'ProjectionType': 'ALL'
+            }
+         }
+      ]
+   )
+
+def create_resources(products_db):
+   """Creates the table, swaps the Valkey client for an in-memory one and loads sample products"""
+   create_table()
+   cache_client = fakeredis.FakeRedis(decode_responses=True)
+   clients.register('cache', cache_client)
+   products_db.product_cache.clear()
+   for product in sample_products:
+      products_db.upsert_product(product['id'], product)
+   return cache_client
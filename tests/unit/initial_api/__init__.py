@@ -3,4 +3,5 @@ from .test_get_product_lambda import *
 from .test_options_lambda import *
 from .test_query_products_lambda import *
 from .test_insert_product_lambda import *
-from .test_update_product_lambda import *
\ No newline at end of file
+from .test_update_product_lambda import *
+from .test_products_db import *
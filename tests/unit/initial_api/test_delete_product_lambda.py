@@ -13,14 +13,17 @@ class TestDeleteProduct(unittest.TestCase):
       self.delete_product=delete_product
 
    def test_delete_product(self):
-      product_id = 'prod_001' 
+      import products_db
+      product_id = products_db.insert_product({'title': 'To delete', 'price': 5})['id']
       event={
          'pathParameters': {
             'id': product_id
          }
       }
       answer = self.delete_product.handler(event, None)
-      self.assertEqual(answer['statusCode'], 500)
+      self.assertEqual(answer['statusCode'], 200)
+      self.assertEqual(json.loads(answer['body'])['title'], 'To delete')
+      self.assertIsNone(products_db.get_product(product_id))
 
       
    def test_no_params(self):
@@ -21,7 +21,10 @@ class TestInsertProduct(unittest.TestCase):
          })
       }
       answer = self.insert_product.handler(event, None)
-      self.assertEqual(answer['statusCode'], 500)
+      self.assertEqual(answer['statusCode'], 201)
+      product=json.loads(answer['body'])
+      import products_db
+      self.assertEqual(products_db.get_product(product['id']), product)
 
    def test_with_id(self):
       product_id = 'does not exist'
@@ -36,6 +39,19 @@ class TestInsertProduct(unittest.TestCase):
       self.assertEqual(answer.get('statusCode'), 400)
       self.assertEqual(answer['body'], 'Product id is not allowed')
 
+   def test_invalid_values(self):
+      for product in ({'title': 'Product 1', 'price': 'abc'}, {'title': 'Product 1', 'category': ['a', 'b']}):
+         answer = self.insert_product.handler({'body': json.dumps(product)}, None)
+         self.assertEqual(answer['statusCode'], 400)
+
+   def test_form_values(self):
+      event={'body': json.dumps({'title': 'Product 1', 'price': '123', 'category': ''})}
+      answer = self.insert_product.handler(event, None)
+      self.assertEqual(answer['statusCode'], 201)
+      product=json.loads(answer['body'])
+      self.assertEqual(product['price'], 123)
+      self.assertNotIn('category', product)
+
 
 if __name__ == '__main__':
     unittest.main()
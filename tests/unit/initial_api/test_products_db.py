@@ -0,0 +1,87 @@
+import unittest
+import os
+import sys
+import tempfile
+folder_to_add = os.path.abspath('aws_developer_sample_project/initial_api') 
+sys.path.append(folder_to_add) 
+
+from decimal import Decimal
+from aws_developer_sample_project.initial_api.products_db import Catalog, Product, InvalidProduct
+
+class TestCatalog(unittest.TestCase):
+   def setUp(self):
+      self.catalog=Catalog([
+         {'id': '1', 'title': 'Headphones', 'price': 99.99, 'category': 'Electronics'},
+         {'id': '2', 'title': 'Coffee Maker', 'price': 149.99, 'category': 'Appliances'},
+         {'id': '3', 'title': 'Speaker', 'price': 45, 'category': 'Electronics', 'color': 'red'}
+      ])
+
+   def ids(self, products):
+      return [product['id'] for product in products]
+
+   def test_product_record(self):
+      product=Product({'id': '1', 'price': 10, 'color': 'red'})
+      self.assertFalse(hasattr(product, '__dict__'))
+      self.assertEqual(product.to_dict(), {'id': '1', 'price': 10, 'color': 'red'})
+
+   def test_category_index(self):
+      self.assertEqual(self.ids(self.catalog.by_category_name('Electronics')), ['1', '3'])
+      self.assertEqual(self.catalog.by_category_name('Toys'), [])
+      # moving a product to another category updates both entries
+      self.catalog.put({'id': '3', 'title': 'Speaker', 'price': 45, 'category': 'Appliances'})
+      self.assertEqual(self.ids(self.catalog.by_category_name('Electronics')), ['1'])
+      self.assertEqual(self.ids(self.catalog.by_category_name('Appliances')), ['2', '3'])
+      self.catalog.delete('1')
+      self.assertNotIn('Electronics', self.catalog.by_category)
+
+   def test_price_range(self):
+      self.assertEqual(self.ids(self.catalog.by_price_range(40, 100)), ['3', '1'])
+      self.assertEqual(self.ids(self.catalog.by_price_range(99.99, 99.99)), ['1'])
+      self.catalog.put({'id': '1', 'title': 'Headphones', 'price': 200})
+      self.assertEqual(self.ids(self.catalog.by_price_range(40, 100)), ['3'])
+      self.assertEqual(self.ids(self.catalog.by_price_range(150, 300)), ['1'])
+
+   def test_form_values(self):
+      # the UI sends prices as strings and "" for the missing fields
+      self.catalog.put({'id': '4', 'title': 'Lamp', 'price': '12', 'category': 'Electronics'})
+      self.catalog.put({'id': '5', 'title': 'Empty', 'price': '', 'category': ''})
+      self.assertEqual(self.catalog.get('4')['price'], Decimal('12'))
+      self.assertEqual(self.ids(self.catalog.by_price_range(10, 50)), ['4', '3'])
+      self.assertEqual(self.ids(self.catalog.by_price_range('10', '12.5')), ['4'])
+      self.assertEqual(self.catalog.get('5'), {'id': '5', 'title': 'Empty'})
+      self.catalog.put({'id': '6', 'title': 'Numbered', 'category': 7})
+      self.assertEqual(self.ids(self.catalog.by_category_name('7')), ['6'])
+
+   def test_invalid_values(self):
+      for item in ({'price': 'abc'}, {'price': 'NaN'}, {'price': [1]}, {'category': ['Electronics']}, {'category': {'name': 'x'}}):
+         with self.assertRaises(InvalidProduct):
+            self.catalog.put({'id': '1', 'title': 'Headphones', **item})
+      # the stored product is left as it was
+      self.assertEqual(self.catalog.get('1')['price'], Decimal('99.99'))
+      self.assertEqual(self.ids(self.catalog.by_category_name('Electronics')), ['1', '3'])
+
+   def test_wide_price_range(self):
+      # only the buckets holding products are looked at, not every bucket of the range
+      self.assertEqual(self.ids(self.catalog.by_price_range(0, 10**15)), ['3', '1', '2'])
+      self.assertEqual(Catalog().by_price_range(0, 10**15), [])
+      self.catalog.delete('3')
+      self.catalog.put({'id': '1', 'title': 'Headphones', 'price': 150})
+      self.assertEqual(self.catalog.price_buckets, [14, 15])
+
+   def test_delete(self):
+      self.assertEqual(self.catalog.delete('2')['title'], 'Coffee Maker')
+      self.assertIsNone(self.catalog.delete('2'))
+      self.assertIsNone(self.catalog.get('2'))
+      self.assertEqual(self.catalog.by_price_range(100, 200), [])
+
+   def test_snapshot(self):
+      with tempfile.TemporaryDirectory() as folder:
+         path=os.path.join(folder, 'catalog.json')
+         self.catalog.save(path)
+         loaded=Catalog()
+         loaded.load(path)
+      self.assertEqual(loaded.all(), self.catalog.all())
+      self.assertEqual(self.ids(loaded.by_category_name('Electronics')), ['1', '3'])
+
+if __name__ == '__main__':
+    unittest.main()
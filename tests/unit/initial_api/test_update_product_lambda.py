@@ -34,7 +34,19 @@ class TestUpdateProduct(unittest.TestCase):
          })
       }
       answer = self.update_product.handler(event, None)
-      self.assertEqual(answer.get('statusCode'), 500)
+      self.assertEqual(answer.get('statusCode'), 200)
+      self.assertEqual(json.loads(answer['body']), {'id': product_id, 'name': 'Product 1', 'price': 100})
+
+   def test_invalid_price(self):
+      event={
+         'pathParameters': {'id': 'prod1'},
+         'body': json.dumps({'name': 'Product 1', 'price': ''})
+      }
+      self.assertEqual(self.update_product.handler(event, None)['statusCode'], 200)
+      event['body']=json.dumps({'name': 'Product 1', 'price': '1,5'})
+      answer = self.update_product.handler(event, None)
+      self.assertEqual(answer['statusCode'], 400)
+      self.assertIn('price must be a number', answer['body'])
 
 
 if __name__ == '__main__':
@@ -0,0 +1,88 @@
+import os
+import unittest
+import aws_cdk as core
+import aws_cdk.assertions as assertions
+
+from aws_developer_sample_project.stacks.initial_api_stack import InitialApiStack
+from aws_developer_sample_project.stacks.core_api_stack import CoreApiStack
+from aws_developer_sample_project.stacks.full_api_stack import FullApiStack
+
+pil_layer=os.path.join('aws_developer_sample_project', 'layers', 'pil-layer-python.zip')
+
+def synth(stack_class, context=None):
+   app=core.App(context=context or {})
+   return assertions.Template.from_stack(stack_class(app, stack_class.__name__))
+
+def function(template, handler):
+   [(_, resource)]=template.find_resources('AWS::Lambda::Function', {'Properties': {'Handler': handler}}).items()
+   return resource['Properties']
+
+class TestCoreApiPerformance(unittest.TestCase):
+   @classmethod
+   def setUpClass(cls):
+      cls.template=synth(CoreApiStack)
+
+   def test_profiles(self):
+      get_product=function(self.template, 'get_product.handler')
+      self.assertEqual(get_product['MemorySize'], 1024)
+      # the clients are created on the first request, a snapshot saves little
+      self.assertNotIn('SnapStart', get_product)
+      insert_product=function(self.template, 'insert_product.handler')
+      self.assertEqual(insert_product['MemorySize'], 512)
+      self.assertNotIn('SnapStart', insert_product)
+      self.assertEqual(function(self.template, 'options.handler')['MemorySize'], 128)
+      # the stack default is kept
+      self.assertEqual(get_product['ReservedConcurrentExecutions'], 5)
+
+   def test_no_alias_by_default(self):
+      self.template.resource_count_is('AWS::Lambda::Alias', 0)
+
+   def test_read_routes_invoke_the_alias(self):
+      template=synth(CoreApiStack, {'performance': {'read': {'snap_start': True}}})
+      self.assertEqual(function(template, 'get_product.handler')['SnapStart'], {'ApplyOn': 'PublishedVersions'})
+      template.resource_count_is('AWS::Lambda::Alias', 2)
+      aliases=template.find_resources('AWS::Lambda::Alias', {'Properties': {'Name': 'live'}})
+      self.assertEqual(sorted(aliases), sorted(name for name in aliases if name.startswith(('GetProduct', 'QueryProducts'))))
+      for alias_name in aliases:
+         template.has_resource_properties('AWS::ApiGateway::Method', {
+            'Integration': {'Uri': {'Fn::Join': ['', assertions.Match.array_with([{'Ref': alias_name}])]}}
+         })
+
+   def test_provisioned_concurrency_from_context(self):
+      template=synth(CoreApiStack, {'performance': '{"read": {"provisioned_concurrency": 2}, "ExportProducts": {"memory_size": 2048}}'})
+      template.has_resource_properties('AWS::Lambda::Alias', {
+         'Name': 'live',
+         'ProvisionedConcurrencyConfig': {'ProvisionedConcurrentExecutions': 2}
+      })
+      # Lambda does not combine SnapStart and provisioned concurrency
+      self.assertNotIn('SnapStart', function(template, 'get_product.handler'))
+      self.assertEqual(function(template, 'export_products.handler')['MemorySize'], 2048)
+
+   def test_invalid_settings(self):
+      with self.assertRaisesRegex(ValueError, 'over the reserved concurrency'):
+         synth(CoreApiStack, {'performance': {'GetProduct': {'provisioned_concurrency': 10}}})
+      with self.assertRaisesRegex(ValueError, 'Unknown performance settings'):
+         synth(CoreApiStack, {'performance': {'read': {'memory': 2048}}})
+
+class TestInitialApiPerformance(unittest.TestCase):
+   def test_profiles(self):
+      template=synth(InitialApiStack, {'performance': {'static': {'memory_size': 256}}})
+      self.assertEqual(function(template, 'query_products.handler')['MemorySize'], 1024)
+      self.assertEqual(function(template, 'update_product.handler')['MemorySize'], 512)
+      self.assertEqual(function(template, 'main_ui.handler')['MemorySize'], 256)
+      template.resource_count_is('AWS::Lambda::Alias', 0)
+
+@unittest.skipUnless(os.path.exists(pil_layer), 'build the Pillow layer first (layers/build-pil-layer.sh)')
+class TestFullApiPerformance(unittest.TestCase):
+   def test_profiles(self):
+      template=synth(FullApiStack)
+      self.assertEqual(function(template, 'get_product.handler')['MemorySize'], 1024)
+      self.assertEqual(function(template, 'update_product.handler')['MemorySize'], 512)
+      self.assertEqual(function(template, 'process_uploaded_images.handler')['MemorySize'], 1769)
+      template.resource_count_is('AWS::Lambda::Alias', 0)
+      # get_product, query_products and generate_download_url
+      template=synth(FullApiStack, {'performance': {'read': {'provisioned_concurrency': 1}}})
+      template.resource_count_is('AWS::Lambda::Alias', 3)
+
+if __name__ == '__main__':
+    unittest.main()